@@ -0,0 +1,125 @@
+"""
+Кэш извлеченного контента файлов Telegram.
+
+Одно и то же фото, PDF или голосовое приходит повторно: при пересылке,
+репосте, при чтении исходного поста в цепочке ответов. У файла в Telegram
+постоянный file_unique_id, поэтому результат обработки (описание Vision,
+текст документа, транскрипция Whisper) сохраняется в SQLite по этому id
+и версии обработчика и при повторе берется из кэша — без скачивания и
+без запроса к AI.
+
+Версия обработчика (CONTENT_PROCESSOR_VERSIONS) увеличивается при изменении
+извлечения: старые записи перестают совпадать и вытесняются по TTL.
+Записи старше CONTENT_CACHE_TTL_DAYS не используются; когда кэш больше
+CONTENT_CACHE_MAX_MB, удаляются давно не использованные записи. Очистка
+(сумма размеров и обход по времени обращения) идет не при каждой записи,
+а раз в PRUNE_EVERY_WRITES записей или PRUNE_INTERVAL секунд: между
+очистками кэш превышает лимит не больше чем на несколько текстов.
+"""
+import datetime
+import logging
+import time
+from typing import Optional
+
+from app.config.settings import settings
+from app.infrastructure.db.session import get_async_session
+from app.infrastructure.db.repositories import ContentCacheRepository
+
+logger = logging.getLogger(__name__)
+
+# Виды контента и версии их обработчиков (увеличить при изменении извлечения или модели)
+CONTENT_PHOTO = "photo"
+CONTENT_PDF = "pdf"
+CONTENT_DOCUMENT = "document"
+CONTENT_AUDIO = "audio"
+CONTENT_PROCESSOR_VERSIONS = {
+    CONTENT_PHOTO: "gpt-4o-mini.1",  # Описание через Vision API
+    CONTENT_PDF: "pypdf.2",  # Текст PDF (бюджет MAX_TEXT_LENGTH по страницам, сканы пропускаются)
+    CONTENT_DOCUMENT: "documents.2",  # Текст txt/docx/xlsx/pptx/odt (MAX_TEXT_LENGTH, потоковый XML)
+    CONTENT_AUDIO: "whisper-1.1",  # Транскрипция Whisper
+}
+
+PRUNE_EVERY_WRITES = 20  # Очистка кэша после стольких записей...
+PRUNE_INTERVAL = 600  # ...или если с прошлой очистки прошло столько секунд
+
+_writes_since_prune = 0
+_last_prune = 0.0  # time.monotonic() прошлой очистки (0 — еще не было, первая запись чистит кэш)
+
+
+def is_enabled() -> bool:
+    """Включен ли кэш (CONTENT_CACHE_MAX_MB > 0)."""
+    return settings.CONTENT_CACHE_MAX_MB > 0
+
+
+def cache_key(kind: str, file_unique_id: str) -> str:
+    """
+    Ключ записи кэша.
+
+    :param kind: Вид контента (CONTENT_PHOTO, CONTENT_PDF, ...)
+    :param file_unique_id: file_unique_id файла Telegram
+    :return: "<вид>:<версия обработчика>:<file_unique_id>"
+    """
+    return f"{kind}:{CONTENT_PROCESSOR_VERSIONS[kind]}:{file_unique_id}"
+
+
+def _ttl_border() -> datetime.datetime:
+    return datetime.datetime.utcnow() - datetime.timedelta(days=settings.CONTENT_CACHE_TTL_DAYS)
+
+
+def _prune_due() -> bool:
+    """Учитывает запись и решает, пора ли чистить кэш (см. PRUNE_EVERY_WRITES, PRUNE_INTERVAL)."""
+    global _writes_since_prune, _last_prune
+    _writes_since_prune += 1
+    now = time.monotonic()
+    if _last_prune and _writes_since_prune < PRUNE_EVERY_WRITES and now - _last_prune < PRUNE_INTERVAL:
+        return False
+    _writes_since_prune = 0
+    _last_prune = now
+    return True
+
+
+async def get_cached_content(kind: str, file_unique_id: Optional[str]) -> Optional[str]:
+    """
+    Контент файла из кэша.
+
+    :param kind: Вид контента
+    :param file_unique_id: file_unique_id файла Telegram
+    :return: Сохраненный текст или None (нет в кэше, устарел, кэш выключен или ошибка БД)
+    """
+    if not file_unique_id or not is_enabled():
+        return None
+    try:
+        async with get_async_session() as session:
+            content = await ContentCacheRepository.get(session, cache_key(kind, file_unique_id), _ttl_border())
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось прочитать кэш контента ({kind}): {e}")
+        return None
+    if content is not None:
+        logger.info(f"💾 Контент {kind} {file_unique_id} взят из кэша ({len(content)} символов)")
+    return content
+
+
+async def store_content(kind: str, file_unique_id: Optional[str], content: Optional[str]):
+    """
+    Сохраняет контент файла в кэш; время от времени (_prune_due) удаляет
+    устаревшие записи и записи сверх лимита.
+    Ошибки БД только пишутся в лог: кэш не должен мешать обработке сообщения.
+
+    :param kind: Вид контента
+    :param file_unique_id: file_unique_id файла Telegram
+    :param content: Извлеченный текст (пустой не сохраняется)
+    """
+    if not file_unique_id or not content or not is_enabled():
+        return
+    try:
+        pruned = 0
+        async with get_async_session() as session:
+            await ContentCacheRepository.put(session, cache_key(kind, file_unique_id), content)
+            if _prune_due():
+                pruned = await ContentCacheRepository.prune(
+                    session, _ttl_border(), settings.CONTENT_CACHE_MAX_MB * 1024 * 1024
+                )
+        if pruned:
+            logger.info(f"🧹 Из кэша контента удалено записей: {pruned}")
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось сохранить контент {kind} в кэш: {e}")
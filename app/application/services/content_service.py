@@ -3,85 +3,152 @@
 
 Извлекает текст из URL, обрабатывает изображения, PDF, аудио и другие типы медиа.
 """
-import io
+import codecs
 import logging
 import re
 import http.client
 import asyncio
 from urllib.parse import urlparse
-from typing import Optional
+from typing import Awaitable, Dict, Iterable, List, Optional, Tuple
 
 import aiohttp
-from bs4 import BeautifulSoup
-from pypdf import PdfReader
 from aiogram import Bot, types
 
-# Импорты для обработки документов (опциональные, чтобы не падать если библиотеки не установлены)
-try:
-    from docx import Document as DocxDocument
-except ImportError:
-    DocxDocument = None
-
-try:
-    from openpyxl import load_workbook
-except ImportError:
-    load_workbook = None
-
-try:
-    from pptx import Presentation
-except ImportError:
-    Presentation = None
+from app.application.services.moderation_matcher import IncrementalScanner
+from app.application.services.moderation_service import describe_hit, moderation_executor
+from app.application.services.content_cache import (
+    CONTENT_PHOTO, CONTENT_PDF, CONTENT_DOCUMENT, CONTENT_AUDIO, get_cached_content, store_content
+)
+from app.application.services.document_parsers import DOCUMENT_PARSERS
+from app.application.services.downloads import download_bounded, read_capped
+from app.application.services.html_extractor import extract_page_text
+from app.application.services.parser_pool import parser_pool
+from app.application.services.url_cache import UrlCacheEntry, url_cache
+from app.application.services.url_limits import url_domain, url_fetch_limits
+from app.config.settings import settings
+from app.infrastructure.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
-# Предупреждения о недоступных библиотеках (после определения logger)
-if DocxDocument is None:
-    logger.warning("python-docx не установлен, обработка Word документов будет недоступна")
-if load_workbook is None:
-    logger.warning("openpyxl не установлен, обработка Excel файлов будет недоступна")
-if Presentation is None:
-    logger.warning("python-pptx не установлен, обработка PowerPoint файлов будет недоступна")
-
 # Ограничения для работы на ограниченных ресурсах (768 MB RAM)
 MAX_FILE_SIZE_MB = 10  # Максимальный размер файла для обработки (в MB)
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024  # 10 MB в байтах
 MAX_TEXT_LENGTH = 8000  # Максимальная длина извлеченного текста (уменьшено с 12000 для экономии памяти)
+PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")  # Ссылки, из которых извлекается текст
+URL_TRAILING_PUNCTUATION = ".,;:!?)]}»\"'"  # Знаки после ссылки, не входящие в нее
+CONTENT_BRANCHES = ("url", "photo", "pdf", "document", "voice", "audio")  # Порядок частей в тексте для AI
 
 
 async def extract_text_from_url(url: str) -> Optional[str]:
     """
-    Извлекает текст с веб-страницы по URL.
+    Извлекает текст с веб-страницы по URL (через общий кэш страниц url_cache).
 
     :param url: URL веб-страницы
     :return: Извлеченный текст или None при ошибке
     """
-    try:
-        parsed_url = urlparse(url)
-        if not parsed_url.netloc:
-            logger.warning(f"Некорректный URL: {url}")
-            return None
+    parsed_url = urlparse(url)
+    if not parsed_url.netloc:
+        logger.warning(f"Некорректный URL: {url}")
+        return None
 
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    text_content = soup.get_text()
-                    cleaned_text = "\n".join(
-                        line.strip() for line in text_content.splitlines() if line.strip()
-                    )
-                    return cleaned_text
-                else:
-                    logger.warning(f"Ошибка при получении страницы {url}: статус {response.status}")
+    entry, fresh = url_cache.lookup(url)
+    if fresh:
+        if entry.text is None:
+            logger.info(f"💾 Страница {url[:100]} недавно не загрузилась, повторно не запрашиваем")
+        else:
+            logger.info(f"💾 Текст страницы {url[:100]} взят из кэша ({len(entry.text)} символов)")
+        return entry.text
+    domain = url_domain(url)
+    if not url_fetch_limits.allows(domain):
+        logger.info(f"Домен {domain} временно не отвечает, ссылка {url[:100]} пропущена")
+        return None
+    return await url_cache.load(url, lambda: _fetch_url_text(url, entry))
+
+
+async def _fetch_url_text(url: str, cached: Optional[UrlCacheEntry]) -> Optional[str]:
+    """
+    Скачивает страницу и сохраняет ее текст в кэш.
+    Загрузка ждет места в общей очереди и очереди домена (url_fetch_limits);
+    таймауты и ошибки соединения учитываются circuit breaker'ом домена.
+    Если в кэше есть устаревший текст с ETag/Last-Modified, запрос условный:
+    ответ 304 продлевает запись без скачивания и разбора.
+
+    :param url: URL веб-страницы
+    :param cached: Устаревшая запись кэша для перепроверки или None
+    :return: Извлеченный текст или None при ошибке
+    """
+    domain = url_domain(url)
+    try:
+        session = await get_http_session()
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        async with url_fetch_limits.slot(domain), session.get(
+            url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            url_fetch_limits.record_success(domain)  # Сервер ответил (статус не важен)
+            if response.status == 304 and cached is not None:
+                logger.info(f"💾 Страница {url[:100]} не изменилась (304), текст взят из кэша")
+                url_cache.revalidated(url, cached)
+                return cached.text
+            if response.status == 200:
+                if response.content_type not in PAGE_CONTENT_TYPES:
+                    logger.info(f"Ссылка {url[:100]} ведет не на страницу ({response.content_type}), текст не извлекается")
+                    url_cache.store_failure(url)
                     return None
+                content, truncated = await read_capped(response, settings.URL_PAGE_MAX_KB * 1024)
+                if truncated:
+                    logger.info(f"Страница {url[:100]} больше {settings.URL_PAGE_MAX_KB} KB, разбирается начало")
+                # Декодирование и разбор HTML — в потоке, чтобы не останавливать event loop
+                cleaned_text = await asyncio.to_thread(
+                    extract_page_text, content, response.charset, response.content_type, MAX_TEXT_LENGTH
+                )
+                url_cache.store(
+                    url, cleaned_text,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+                return cleaned_text
+            else:
+                logger.warning(f"Ошибка при получении страницы {url}: статус {response.status}")
+                url_cache.store_failure(url)
+                return None
+    except asyncio.CancelledError:
+        raise
+    except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+        logger.warning(f"Страница {url[:100]} не загрузилась: {type(e).__name__} {e}")
+        url_fetch_limits.record_failure(domain)
+        url_cache.store_failure(url)
+        return None
     except Exception as e:
         logger.error(f"Ошибка при извлечении текста из URL {url}: {e}")
+        url_cache.store_failure(url)
         return None
 
 
+def find_urls_in_text(text: str) -> List[str]:
+    """
+    Находит все URL в тексте (без повторов, в порядке появления).
+    Знаки препинания в конце ссылки ("см. https://site.ru/page.") отбрасываются.
+
+    :param text: Текст для поиска
+    :return: Список URL
+    """
+    if not text:
+        return []
+    urls = []
+    for url_match in re.finditer(r'(http[s]?://[^\s]+)', text):
+        url = url_match.group(0).rstrip(URL_TRAILING_PUNCTUATION)
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
 def find_url_in_text(text: str) -> Optional[str]:
     """
     Находит первую URL в тексте.
@@ -89,25 +156,99 @@ def find_url_in_text(text: str) -> Optional[str]:
     :param text: Текст для поиска
     :return: Найденный URL или None
     """
-    if not text:
-        return None
-    url_match = re.search(r'(http[s]?://[^\s]+)', text)
-    return url_match.group(0) if url_match else None
+    urls = find_urls_in_text(text)
+    return urls[0] if urls else None
+
+
+def message_links(message: types.Message) -> List[Tuple[str, str]]:
+    """
+    Ссылки сообщения с текстом, под которым они даны.
 
+    Bot API не передает ботам содержимое превью (заголовок, описание сайта) —
+    только link_preview_options.url. Поэтому ссылки берутся из разметки
+    сообщения: entity "url" (видимая ссылка) и "text_link" (ссылка под текстом,
+    ее текст — заголовок, который дал автор). Ссылка превью идет первой.
 
-async def process_url_in_text(text: str) -> str:
+    :param message: Сообщение Telegram
+    :return: Список (URL, текст ссылки или ""), без повторов
     """
-    Обрабатывает текст, извлекая контент из найденных URL.
+    text = message.text or message.caption or ""
+    entities = (message.entities if message.text else message.caption_entities) or []
+    links = {}
+    for entity in entities:
+        if entity.type == "url":
+            url, title = entity.extract_from(text), ""
+            if not re.match(r'https?://', url, re.IGNORECASE):
+                url = f"http://{url}"  # Telegram размечает и ссылки без схемы (site.ru/page)
+        elif entity.type == "text_link" and entity.url:
+            url, title = entity.url, entity.extract_from(text).strip()
+        else:
+            continue
+        if re.match(r'https?://', url, re.IGNORECASE) and url not in links:
+            links[url] = title
+    if not entities:
+        links = {url: "" for url in find_urls_in_text(text)}
+
+    preview = message.link_preview_options
+    # is_disabled у входящих сообщений бывает не bool, а aiogram Default (истинный объект)
+    if preview is not None and preview.url and preview.is_disabled is not True:
+        links = {preview.url: links.get(preview.url, ""), **links}
+    return list(links.items())
+
+
+async def process_url_in_text(text: str, links: Optional[List[Tuple[str, str]]] = None) -> str:
+    """
+    Обрабатывает текст, извлекая контент из всех найденных URL (до URL_MAX_PER_MESSAGE).
+
+    Ссылка, данная под развернутым текстом (text_link длиной от URL_PREVIEW_MIN_CHARS,
+    например заголовок статьи), не скачивается: ее описание уже есть в сообщении.
+    Остальные страницы скачиваются параллельно (с лимитами url_fetch_limits) в пределах
+    URL_MESSAGE_BUDGET секунд на сообщение: не успевшие страницы пропускаются
+    (их загрузка продолжается в фоне и попадет в кэш), медленный домен не
+    задерживает остальные. Тексты добавляются в порядке ссылок в сообщении,
+    общий объем — не больше MAX_TEXT_LENGTH.
 
     :param text: Исходный текст
-    :return: Объединенный текст (исходный + текст с веб-страницы)
+    :param links: Ссылки сообщения (message_links); None — искать URL в тексте
+    :return: Объединенный текст (исходный + тексты с веб-страниц)
     """
-    url = find_url_in_text(text)
-    if url:
-        extracted_text = await extract_text_from_url(url)
-        if extracted_text:
-            return f"{text}\n\n{extracted_text}"
-    return text
+    if links is None:
+        links = [(url, "") for url in find_urls_in_text(text)]
+    urls = []
+    for url, title in links[:settings.URL_MAX_PER_MESSAGE]:
+        if settings.URL_PREVIEW_MIN_CHARS > 0 and len(title) >= settings.URL_PREVIEW_MIN_CHARS:
+            logger.info(f"Ссылка {url[:100]} описана в сообщении (\"{title[:60]}\"), страница не скачивается")
+            continue
+        urls.append(url)
+    if not urls:
+        return text
+
+    tasks = [asyncio.ensure_future(extract_text_from_url(url)) for url in urls]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=settings.URL_MESSAGE_BUDGET)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    if pending:
+        logger.warning(
+            f"⏱️ Не уложились в {settings.URL_MESSAGE_BUDGET:g} с: "
+            f"{len(pending)} из {len(urls)} ссылок пропущено"
+        )
+
+    extracted = []
+    for url, task in zip(urls, tasks):
+        if task not in done or task.exception() is not None:
+            continue
+        if task.result():
+            extracted.append((url, task.result()))
+    if not extracted:
+        return text
+    if len(urls) == 1:
+        return f"{text}\n\n{extracted[0][1][:MAX_TEXT_LENGTH]}"
+    share = MAX_TEXT_LENGTH // len(extracted)
+    pages = "\n\n".join(f"--- {url} ---\n{page_text[:share]}" for url, page_text in extracted)
+    return f"{text}\n\n{pages}"
 
 
 async def get_image_description(image_url: str, openai_client) -> Optional[str]:
@@ -164,56 +305,157 @@ async def get_photo_url(bot: Bot, message: types.Message) -> Optional[str]:
     return None
 
 
-async def extract_pdf_text(pdf_url: str) -> Optional[str]:
+async def _collect_text(chunks: Iterable[str], scanner: Optional[IncrementalScanner] = None) -> str:
+    """
+    Собирает текст из частей (страниц, абзацев, слайдов) не длиннее MAX_TEXT_LENGTH.
+    Сбор останавливается, как только текст набран или сканер blacklist нашел
+    нарушение: следующие части не обрабатываются. Длинные части проверяются
+    в потоке (moderation_executor.feed), чтобы не останавливать event loop.
+
+    :param chunks: Части текста (список или генератор — тогда разбор идет по мере чтения)
+    :param scanner: Сканер blacklist (опционально)
+    :return: Собранный текст (с пометкой, если он обрезан)
+    """
+    parts = []
+    length = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        piece = chunk[:MAX_TEXT_LENGTH - length]
+        parts.append(piece)
+        length += len(piece)
+        if scanner is not None and await moderation_executor.feed(scanner, piece):
+            break
+        if len(piece) < len(chunk):
+            parts.append("\n... (текст обрезан из-за ограничений)")
+            break
+    return "".join(parts)
+
+
+def _log_violation(scanner: Optional[IncrementalScanner], source: str):
+    """Пишет в лог нарушение, из-за которого извлечение остановлено."""
+    if scanner is not None and scanner.hit:
+        logger.warning(
+            f"⛔ Нарушение blacklist в {source}: {describe_hit(scanner.hit, scanner.fragment)}. "
+            f"Извлечение остановлено после {scanner.consumed} символов"
+        )
+
+
+async def _scan_cached(text: str, scanner: Optional[IncrementalScanner], source: str):
+    """Передает текст из кэша контента в сканер blacklist, как при извлечении."""
+    if scanner is not None:
+        await moderation_executor.feed(scanner, text)
+        _log_violation(scanner, source)
+
+
+TEXT_ENCODINGS = ['utf-8', 'cp1251', 'windows-1251', 'latin-1']  # Кодировки .txt в порядке попыток
+STREAM_BLOCK_SIZE = 64 * 1024  # Размер блока при потоковом скачивании .txt
+
+
+def _decode_text(content: bytes) -> Optional[str]:
+    """Декодирует текстовый файл, перебирая TEXT_ENCODINGS."""
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+async def _read_text_stream(
+    response: aiohttp.ClientResponse,
+    scanner: Optional[IncrementalScanner] = None
+) -> Tuple[Optional[str], bool]:
+    """
+    Читает .txt потоком: UTF-8 декодируется по мере скачивания, и скачивание
+    прекращается, когда набран MAX_TEXT_LENGTH или сканер нашел нарушение.
+    Файлы не в UTF-8 дочитываются и декодируются целиком (TEXT_ENCODINGS).
+
+    :param response: Ответ aiohttp
+    :param scanner: Сканер blacklist (опционально)
+    :return: (текст, не обрезанный до MAX_TEXT_LENGTH, или None; проверен ли текст сканером)
+    """
+    raw = bytearray()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    length = 0
+    finished = True
+    async for block in response.content.iter_chunked(STREAM_BLOCK_SIZE):
+        raw += block
+        if len(raw) > MAX_FILE_SIZE_BYTES:
+            logger.warning(f"Документ слишком большой (больше {MAX_FILE_SIZE_MB} MB), скачивание прервано")
+            return None, False
+        if decoder is None:
+            continue
+        try:
+            piece = decoder.decode(block)
+        except UnicodeDecodeError:
+            decoder = None  # Не UTF-8: дочитываем файл и декодируем целиком
+            continue
+        # Сканер видит ровно тот текст, который останется после обрезки до MAX_TEXT_LENGTH
+        if scanner is not None and await moderation_executor.feed(scanner, piece[:max(MAX_TEXT_LENGTH - length, 0)]):
+            finished = False
+            parts.append(piece)
+            break
+        parts.append(piece)
+        length += len(piece)
+        if length > MAX_TEXT_LENGTH:
+            finished = False
+            break
+
+    if decoder is not None:
+        if finished:
+            try:
+                parts.append(decoder.decode(b"", final=True))
+            except UnicodeDecodeError:
+                decoder = None
+        if decoder is not None:
+            logger.info(f"Текстовый файл прочитан потоком: {len(raw)} байт{'' if finished else ' (скачивание остановлено досрочно)'}")
+            return "".join(parts), scanner is not None
+
+    logger.info(f"Текстовый файл скачан, размер: {len(raw)} байт")
+    return _decode_text(bytes(raw)), False
+
+
+async def extract_pdf_text(pdf_url: str, scanner: Optional[IncrementalScanner] = None) -> Optional[str]:
     """
     Извлекает текст из PDF файла по URL.
 
+    Страницы разбираются в процессе-воркере (parser_pool) только до MAX_TEXT_LENGTH,
+    страницы без текстового слоя (сканы) пропускаются без разбора; в лог пишется,
+    сколько страниц из общего числа пришлось разобрать. Текст передается в сканер
+    blacklist по страницам: после найденного нарушения остальные не проверяются.
+
     :param pdf_url: URL PDF файла
+    :param scanner: Сканер blacklist (опционально)
     :return: Извлеченный текст или None при ошибке
     """
     logger.info(f"Начинаем извлечение текста из PDF по URL: {pdf_url[:100]}...")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(pdf_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                response.raise_for_status()
-                
-                # Проверяем размер файла перед загрузкой
-                content_length = response.headers.get('Content-Length')
-                if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"PDF файл слишком большой ({int(content_length) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
-                    return None
-                
-                pdf_content = await response.read()
-                
-                # Дополнительная проверка после загрузки
-                if len(pdf_content) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"PDF файл слишком большой ({len(pdf_content) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
-                    return None
-                
-                logger.info(f"PDF файл скачан, размер: {len(pdf_content)} байт")
-                pdf_file = io.BytesIO(pdf_content)
-                pdf_reader = PdfReader(pdf_file)
-
-                pdf_text = ""
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text.strip():
-                            pdf_text += f"\n--- Страница {page_num} ---\n{page_text}"
-                    except Exception as e:
-                        logger.warning(f"Не удалось извлечь текст со страницы {page_num}: {e}")
-                        continue
-
-                if not pdf_text.strip():
-                    logger.warning(f"Из PDF {pdf_url[:100]}... не удалось извлечь текст.")
-                    return None
+        session = await get_http_session()
+        async with session.get(pdf_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            response.raise_for_status()
+            # Скачивание прерывается, как только превышен MAX_FILE_SIZE_BYTES
+            download = await download_bounded(response, MAX_FILE_SIZE_BYTES, "PDF файл")
+            if download is None:
+                return None
+
+        # Разбор — в процессе-воркере (CPU не блокирует event loop), сканер — по готовым страницам
+        with download:
+            chunks, stats = await parser_pool.parse('.pdf', download.source(), MAX_TEXT_LENGTH)
+        logger.info(
+            f"PDF: разобрано страниц {stats.pages_parsed} из {stats.pages_total}"
+            f"{f', без текстового слоя пропущено {stats.pages_skipped}' if stats.pages_skipped else ''}"
+        )
+        pdf_text = await _collect_text(chunks, scanner)
+        _log_violation(scanner, f"PDF {pdf_url[:100]}...")
 
-                # Ограничиваем размер текста для экономии памяти
-                if len(pdf_text) > MAX_TEXT_LENGTH:
-                    pdf_text = pdf_text[:MAX_TEXT_LENGTH] + "\n... (текст обрезан из-за ограничений)"
-                
-                logger.info(f"Текст из PDF {pdf_url[:100]}... успешно извлечен ({len(pdf_text)} символов).")
-                return pdf_text
+        if not pdf_text.strip():
+            logger.warning(f"Из PDF {pdf_url[:100]}... не удалось извлечь текст.")
+            return None
+
+        logger.info(f"Текст из PDF {pdf_url[:100]}... успешно извлечен ({len(pdf_text)} символов).")
+        return pdf_text
     except asyncio.TimeoutError:
         logger.error(f"Таймаут при скачивании или обработке PDF по URL: {pdf_url[:100]}...")
         return None
@@ -222,7 +464,11 @@ async def extract_pdf_text(pdf_url: str) -> Optional[str]:
         return None
 
 
-async def extract_document_text(document_url: str, file_extension: str) -> Optional[str]:
+async def extract_document_text(
+    document_url: str,
+    file_extension: str,
+    scanner: Optional[IncrementalScanner] = None
+) -> Optional[str]:
     """
     Извлекает текст из различных типов документов по URL.
 
@@ -233,147 +479,70 @@ async def extract_document_text(document_url: str, file_extension: str) -> Optio
     - .pptx - PowerPoint презентации
     - .odt - OpenDocument Text
 
+    Текст извлекается частями (абзацы, строки, слайды) в процессе-воркере
+    (parser_pool) и передается в сканер blacklist; после найденного нарушения
+    остальные части не проверяются, а .txt перестает скачиваться.
+
     :param document_url: URL документа
     :param file_extension: Расширение файла (например, '.docx', '.xlsx')
+    :param scanner: Сканер blacklist (опционально)
     :return: Извлеченный текст или None при ошибке
     """
     logger.info(f"Начинаем извлечение текста из документа {file_extension} по URL: {document_url[:100]}...")
+    file_ext_lower = file_extension.lower()
+    if file_ext_lower != '.txt':
+        if file_ext_lower not in DOCUMENT_PARSERS:
+            logger.warning(f"Неподдерживаемый формат документа: {file_extension}")
+            return None
+        _, library, library_name, document_kind = DOCUMENT_PARSERS[file_ext_lower]
+        if library is None:
+            logger.error(f"Библиотека {library_name} не установлена")
+            return None
     try:
         # Скачиваем файл
-        async with aiohttp.ClientSession() as session:
-            async with session.get(document_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                response.raise_for_status()
-                
-                # Проверяем размер файла перед загрузкой
-                content_length = response.headers.get('Content-Length')
-                if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"Документ слишком большой ({int(content_length) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
-                    return None
-                
-                document_content = await response.read()
-                
-                # Дополнительная проверка после загрузки
-                if len(document_content) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"Документ слишком большой ({len(document_content) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
+        session = await get_http_session()
+        async with session.get(document_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            response.raise_for_status()
+            
+            # Проверяем размер файла перед загрузкой
+            content_length = response.headers.get('Content-Length')
+            if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
+                logger.warning(f"Документ слишком большой ({int(content_length) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
+                return None
+
+            if file_ext_lower == '.txt':
+                # Текстовый файл проверяется во время скачивания
+                text, scanned = await _read_text_stream(response, scanner)
+                if text is None:
+                    logger.warning("Не удалось декодировать текстовый файл")
                     return None
-                
-                logger.info(f"Документ скачан, размер: {len(document_content)} байт")
-                document_file = io.BytesIO(document_content)
-                
-                document_text = ""
-                file_ext_lower = file_extension.lower()
-                
-                # Обработка текстовых файлов
-                if file_ext_lower == '.txt':
-                    try:
-                        document_file.seek(0)
-                        # Пробуем разные кодировки
-                        for encoding in ['utf-8', 'cp1251', 'windows-1251', 'latin-1']:
-                            try:
-                                document_file.seek(0)
-                                document_text = document_file.read().decode(encoding)
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                        if not document_text:
-                            logger.warning("Не удалось декодировать текстовый файл")
-                            return None
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке текстового файла: {e}", exc_info=True)
-                        return None
-                
-                # Обработка Word документов (.docx)
-                elif file_ext_lower == '.docx':
-                    try:
-                        from docx import Document
-                        document_file.seek(0)
-                        doc = Document(document_file)
-                        for paragraph in doc.paragraphs:
-                            if paragraph.text.strip():
-                                document_text += paragraph.text + "\n"
-                        # Также извлекаем текст из таблиц
-                        for table in doc.tables:
-                            for row in table.rows:
-                                for cell in row.cells:
-                                    if cell.text.strip():
-                                        document_text += cell.text + " "
-                                document_text += "\n"
-                    except ImportError:
-                        logger.error("Библиотека python-docx не установлена")
-                        return None
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке Word документа: {e}", exc_info=True)
-                        return None
-                
-                # Обработка Excel файлов (.xlsx)
-                elif file_ext_lower == '.xlsx':
-                    try:
-                        from openpyxl import load_workbook
-                        document_file.seek(0)
-                        workbook = load_workbook(document_file, data_only=True)
-                        for sheet_name in workbook.sheetnames:
-                            sheet = workbook[sheet_name]
-                            document_text += f"\n--- Лист: {sheet_name} ---\n"
-                            for row in sheet.iter_rows(values_only=True):
-                                row_text = " | ".join(str(cell) if cell is not None else "" for cell in row)
-                                if row_text.strip():
-                                    document_text += row_text + "\n"
-                    except ImportError:
-                        logger.error("Библиотека openpyxl не установлена")
-                        return None
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке Excel файла: {e}", exc_info=True)
-                        return None
-                
-                # Обработка PowerPoint презентаций (.pptx)
-                elif file_ext_lower == '.pptx':
-                    try:
-                        from pptx import Presentation
-                        document_file.seek(0)
-                        prs = Presentation(document_file)
-                        for slide_num, slide in enumerate(prs.slides, 1):
-                            document_text += f"\n--- Слайд {slide_num} ---\n"
-                            for shape in slide.shapes:
-                                if hasattr(shape, "text") and shape.text.strip():
-                                    document_text += shape.text + "\n"
-                    except ImportError:
-                        logger.error("Библиотека python-pptx не установлена")
-                        return None
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке PowerPoint презентации: {e}", exc_info=True)
-                        return None
-                
-                # Обработка OpenDocument Text (.odt)
-                elif file_ext_lower == '.odt':
-                    try:
-                        from zipfile import ZipFile
-                        import xml.etree.ElementTree as ET
-                        document_file.seek(0)
-                        with ZipFile(document_file, 'r') as odt_file:
-                            content_xml = odt_file.read('content.xml')
-                            root = ET.fromstring(content_xml)
-                            # Простое извлечение текста из XML
-                            for elem in root.iter():
-                                if elem.text and elem.text.strip():
-                                    document_text += elem.text.strip() + " "
-                    except Exception as e:
-                        logger.error(f"Ошибка при обработке ODT файла: {e}", exc_info=True)
-                        return None
-                
-                else:
-                    logger.warning(f"Неподдерживаемый формат документа: {file_extension}")
-                    return None
-                
-                if not document_text.strip():
-                    logger.warning(f"Из документа {file_extension} не удалось извлечь текст.")
+            else:
+                download = await download_bounded(response, MAX_FILE_SIZE_BYTES, "Документ")
+                if download is None:
                     return None
-                
-                # Ограничиваем размер текста для экономии памяти
-                if len(document_text) > MAX_TEXT_LENGTH:
-                    document_text = document_text[:MAX_TEXT_LENGTH] + "\n... (текст обрезан из-за ограничений)"
-                
-                logger.info(f"Текст из документа {file_extension} успешно извлечен ({len(document_text)} символов).")
-                return document_text
+
+        if file_ext_lower == '.txt':
+            document_text = await _collect_text([text], None if scanned else scanner)
+        else:
+            try:
+                with download:
+                    chunks, stats = await parser_pool.parse(file_ext_lower, download.source(), MAX_TEXT_LENGTH)
+                if stats.pages_total:
+                    logger.info(f"Разбор {document_kind}: слайдов {stats.pages_parsed} из {stats.pages_total}")
+                document_text = await _collect_text(chunks, scanner)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при обработке {document_kind}: {e}", exc_info=True)
+                return None
+        _log_violation(scanner, f"документе {file_extension}")
+
+        if not document_text.strip():
+            logger.warning(f"Из документа {file_extension} не удалось извлечь текст.")
+            return None
+
+        logger.info(f"Текст из документа {file_extension} успешно извлечен ({len(document_text)} символов).")
+        return document_text
                 
     except asyncio.TimeoutError:
         logger.error(f"Таймаут при скачивании или обработке документа {file_extension} по URL: {document_url[:100]}...")
@@ -443,33 +612,27 @@ async def transcribe_audio(bot: Bot, message: types.Message, openai_client) -> O
             logger.warning("Сообщение не содержит голосового или аудио контента")
             return None
 
+        # Тот же файл уже транскрибировался — без скачивания и Whisper API
+        file_unique_id = (message.voice or message.audio).file_unique_id
+        cached = await get_cached_content(CONTENT_AUDIO, file_unique_id)
+        if cached is not None:
+            return cached
+
         file_info = await bot.get_file(file_id)
         file_url = f'https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}'
         logger.info(f"Скачиваем аудио файл: {file_url}")
 
         # Скачиваем файл
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                response.raise_for_status()
-                
-                # Проверяем размер файла перед загрузкой
-                content_length = response.headers.get('Content-Length')
-                if content_length and int(content_length) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"Аудио файл слишком большой ({int(content_length) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
-                    return None
-                
-                audio_content = await response.read()
-                
-                # Дополнительная проверка после загрузки
-                if len(audio_content) > MAX_FILE_SIZE_BYTES:
-                    logger.warning(f"Аудио файл слишком большой ({len(audio_content) / 1024 / 1024:.2f} MB), максимум {MAX_FILE_SIZE_MB} MB")
-                    return None
-                
-                logger.info(f"Аудио файл скачан, размер: {len(audio_content)} байт")
+        session = await get_http_session()
+        async with session.get(file_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            response.raise_for_status()
+            download = await download_bounded(response, MAX_FILE_SIZE_BYTES, "Аудио файл")
+            if download is None:
+                return None
 
         # Транскрибируем через OpenAI Whisper
         # OpenAI API требует файл в формате (filename, file_object) или (filename, file_object, content_type)
-        audio_file = io.BytesIO(audio_content)
+        # (файл из памяти или временный файл на диске — download.open())
         filename = file_info.file_path.split('/')[-1] if file_info.file_path else "audio.ogg"
         
         # Убеждаемся, что файл имеет правильное расширение
@@ -480,39 +643,218 @@ async def transcribe_audio(bot: Bot, message: types.Message, openai_client) -> O
             else:
                 filename = "audio.ogg"
         
-        logger.info(f"Отправляем файл в Whisper API: {filename}, размер: {len(audio_content)} байт")
-        
-        # Перематываем файл в начало
-        audio_file.seek(0)
+        with download, download.open() as audio_file:
+            logger.info(f"Отправляем файл в Whisper API: {filename}, размер: {download.size} байт")
         
-        # OpenAI SDK принимает файл как tuple (filename, file_object)
-        # SDK автоматически определит content_type по расширению файла
-        try:
-            transcription = openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=(filename, audio_file)
-            )
-        except Exception as api_error:
-            logger.error(f"Ошибка при вызове Whisper API: {api_error}")
-            # Пробуем без указания имени файла
+            # Перематываем файл в начало
             audio_file.seek(0)
-            transcription = openai_client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
+        
+            # OpenAI SDK принимает файл как tuple (filename, file_object)
+            # SDK автоматически определит content_type по расширению файла
+            try:
+                transcription = openai_client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(filename, audio_file)
+                )
+            except Exception as api_error:
+                logger.error(f"Ошибка при вызове Whisper API: {api_error}")
+                # Пробуем без указания имени файла
+                audio_file.seek(0)
+                transcription = openai_client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file
+                )
 
         transcribed_text = transcription.text
         logger.info(f"Транскрибация успешна: {transcribed_text[:100]}...")
+        await store_content(CONTENT_AUDIO, file_unique_id, transcribed_text)
         return transcribed_text
     except Exception as e:
         logger.error(f"Ошибка при транскрибации аудио: {e}", exc_info=True)
         return None
 
 
+async def _url_part(message: types.Message, base_text: str) -> str:
+    """Базовый текст с текстом страниц по ссылкам (при ошибке — исходный текст)."""
+    try:
+        # Обрабатываем URL в тексте (бюджет URL_MESSAGE_BUDGET внутри, таймаут — страховка)
+        return await asyncio.wait_for(
+            process_url_in_text(base_text, message_links(message)),
+            timeout=settings.URL_MESSAGE_BUDGET + 2.0
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Таймаут при обработке URL в тексте, используем исходный текст")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке URL в тексте: {e}, используем исходный текст")
+    return base_text  # Используем исходный текст без URL
+
+
+async def _photo_part(bot: Bot, message: types.Message, openai_client) -> Optional[str]:
+    """Описание фото через Vision API (или из кэша)."""
+    logger.info("Обнаружено фото в сообщении, начинаем обработку")
+    try:
+        # Тот же файл (пересылка, репост) уже описывался — без скачивания и Vision API
+        photo_unique_id = message.photo[-1].file_unique_id
+        description = await get_cached_content(CONTENT_PHOTO, photo_unique_id)
+        if description is None:
+            image_url = await asyncio.wait_for(get_photo_url(bot, message), timeout=10.0)
+            if image_url:
+                logger.info(f"URL изображения получен: {image_url[:100]}...")
+                description = await asyncio.wait_for(
+                    get_image_description(image_url, openai_client), 
+                    timeout=30.0
+                )
+                if description:
+                    await store_content(CONTENT_PHOTO, photo_unique_id, description)
+                else:
+                    logger.warning("Не удалось получить описание изображения")
+            else:
+                logger.warning("Не удалось получить URL изображения")
+        if description:
+            logger.info(f"Описание изображения получено: {description[:100]}...")
+            return f"\nОписание изображения: {description}"
+    except asyncio.TimeoutError:
+        logger.warning("Таймаут при обработке фото, пропускаем описание")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке фото: {e}", exc_info=True)
+    return None
+
+
+async def _pdf_part(bot: Bot, message: types.Message, blacklist_scanner: Optional[IncrementalScanner]) -> Optional[str]:
+    """Текст PDF документа (без анализа через OpenAI)."""
+    logger.info("Обнаружен PDF документ в сообщении, начинаем извлечение текста")
+    try:
+        pdf_text = await get_cached_content(CONTENT_PDF, message.document.file_unique_id)
+        if pdf_text is not None:
+            await _scan_cached(pdf_text, blacklist_scanner, "PDF из кэша")
+        else:
+            file_info = await asyncio.wait_for(bot.get_file(message.document.file_id), timeout=10.0)
+            pdf_url = f'https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}'
+            pdf_text = await asyncio.wait_for(extract_pdf_text(pdf_url, blacklist_scanner), timeout=60.0)
+            # Текст, на котором извлечение остановилось из-за нарушения, неполный — его не кэшируем
+            if blacklist_scanner is None or not blacklist_scanner.hit:
+                await store_content(CONTENT_PDF, message.document.file_unique_id, pdf_text)
+        if pdf_text:
+            logger.info(f"Текст из PDF извлечен: {len(pdf_text)} символов")
+            return f"\n\nТекст из PDF документа:\n{pdf_text}"
+        logger.warning("Не удалось извлечь текст из PDF документа")
+    except asyncio.TimeoutError:
+        logger.warning("Таймаут при обработке PDF, пропускаем извлечение текста")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке PDF: {e}", exc_info=True)
+    return None
+
+
+async def _document_part(
+    bot: Bot,
+    message: types.Message,
+    file_extension: str,
+    blacklist_scanner: Optional[IncrementalScanner]
+) -> Optional[str]:
+    """Текст документа txt/docx/xlsx/pptx/odt (без анализа через OpenAI)."""
+    logger.info(f"Обнаружен документ {file_extension} в сообщении, начинаем извлечение текста")
+    try:
+        document_text = await get_cached_content(CONTENT_DOCUMENT, message.document.file_unique_id)
+        if document_text is not None:
+            await _scan_cached(document_text, blacklist_scanner, f"документе {file_extension} из кэша")
+        else:
+            file_info = await asyncio.wait_for(bot.get_file(message.document.file_id), timeout=10.0)
+            document_url = f'https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}'
+            document_text = await asyncio.wait_for(
+                extract_document_text(document_url, file_extension, blacklist_scanner), 
+                timeout=60.0
+            )
+            if blacklist_scanner is None or not blacklist_scanner.hit:
+                await store_content(CONTENT_DOCUMENT, message.document.file_unique_id, document_text)
+        if document_text:
+            logger.info(f"Текст из документа {file_extension} извлечен: {len(document_text)} символов")
+            return f"\n\nТекст из документа {file_extension}:\n{document_text}"
+        logger.warning(f"Не удалось извлечь текст из документа {file_extension}")
+    except asyncio.TimeoutError:
+        logger.warning(f"Таймаут при обработке документа {file_extension}, пропускаем извлечение текста")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке документа {file_extension}: {e}", exc_info=True)
+    return None
+
+
+async def _audio_part(bot: Bot, message: types.Message, openai_client, kind: str, kind_genitive: str) -> Optional[str]:
+    """
+    Транскрипция голосового сообщения или аудио файла.
+
+    :param kind: Название для логов ("голосовое сообщение", "аудио файл")
+    :param kind_genitive: То же в родительном падеже ("голосового сообщения", "аудио файла")
+    """
+    try:
+        transcription = await asyncio.wait_for(
+            transcribe_audio(bot, message, openai_client), 
+            timeout=60.0
+        )
+        if transcription:
+            logger.info(f"Транскрибация {kind_genitive} успешна: {transcription[:100]}...")
+            return f"\nТранскрипция аудио: {transcription}"
+        logger.warning(f"Не удалось транскрибировать {kind}")
+    except asyncio.TimeoutError:
+        logger.warning(f"Таймаут при транскрибации {kind_genitive}, пропускаем")
+    except Exception as e:
+        logger.error(f"Ошибка при транскрибации {kind_genitive}: {e}", exc_info=True)
+    return None
+
+
+async def _run_content_branches(
+    branches: List[Tuple[str, Awaitable[Optional[str]]]],
+    blacklist_scanner: Optional[IncrementalScanner],
+    timeout: float
+) -> Dict[str, Optional[str]]:
+    """
+    Выполняет ветки подготовки контента параллельно с общим сроком.
+
+    Ветки, не успевшие за timeout, отменяются. Если в документе найдено нарушение
+    blacklist, остальные ветки (запросы к AI, загрузка URL) тоже отменяются.
+    Ветка, завершившаяся ошибкой или отменой, пропускается, остальные продолжаются.
+
+    :param branches: Список (название ветки, корутина)
+    :param blacklist_scanner: Сканер blacklist или None
+    :param timeout: Общий срок в секундах
+    :return: Результаты завершившихся веток по названию
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    tasks = {asyncio.ensure_future(branch): name for name, branch in branches}
+    pending = set(tasks)
+    results = {}
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(
+                    f"⏱️ Подготовка контента не уложилась в {timeout:g} с, "
+                    f"пропущено: {', '.join(sorted(tasks[task] for task in pending))}"
+                )
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    # Отмена изнутри ветки (например, отмененная задача пула разбора) — не ошибка сообщения
+                    logger.warning(f"Шаг подготовки контента ({tasks[task]}) отменен, пропускаем")
+                elif task.exception() is not None:
+                    logger.error(f"Ошибка при подготовке контента ({tasks[task]}): {task.exception()}")
+                else:
+                    results[tasks[task]] = task.result()
+            if blacklist_scanner is not None and blacklist_scanner.hit:
+                if pending:
+                    logger.info("Нарушение blacklist найдено в документе, остальные шаги подготовки контента остановлены")
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+    return results
+
+
 async def prepare_message_content(
     bot: Bot,
     message: types.Message,
-    openai_client
+    openai_client,
+    blacklist_scanner: Optional[IncrementalScanner] = None
 ) -> str:
     """
     Подготавливает полный контент сообщения для обработки AI.
@@ -520,141 +862,70 @@ async def prepare_message_content(
     Обрабатывает различные типы контента: текст, фото, PDF, документы (txt, docx, xlsx, pptx, odt), 
     аудио, голосовые сообщения.
 
+    Ссылки, фото, документ и аудио обрабатываются параллельно с общим сроком
+    CONTENT_PREPARE_TIMEOUT (сообщение готово за время самой долгой ветки, а не
+    за их сумму); части текста собираются в постоянном порядке CONTENT_BRANCHES.
+
+    Если передан blacklist_scanner, текст/подпись и текст документов проверяются
+    по мере извлечения: после найденного нарушения скачивание и разбор документа
+    останавливаются, а остальные шаги (запросы к AI, загрузка URL) отменяются.
+    Возвращается текст, собранный до нарушения, — его проверяет вызывающий код.
+
     :param bot: Экземпляр бота
     :param message: Сообщение для обработки
     :param openai_client: Клиент OpenAI
+    :param blacklist_scanner: Сканер blacklist (create_blacklist_scanner), опционально
     :return: Полный текст для обработки AI
     """
     logger.info(f"Начинаем подготовку контента сообщения {message.message_id}")
-    content_parts = []
 
     # Базовый текст (текст сообщения или подпись) - ВСЕГДА обрабатываем первым
     base_text = message.text or message.caption or ""
+    if blacklist_scanner is not None and await moderation_executor.feed(blacklist_scanner, base_text + "\n"):
+        logger.warning(
+            f"⛔ Нарушение blacklist в тексте/подписи: {describe_hit(blacklist_scanner.hit, blacklist_scanner.fragment)}. "
+            f"Медиа и URL не обрабатываются"
+        )
+        return base_text
+
+    # Независимые ветки (URL, фото, документ, аудио) выполняются параллельно;
+    # результат собирается в порядке CONTENT_BRANCHES, а не в порядке завершения
+    branches = []
     if base_text:
         logger.info(f"Найден базовый текст: {base_text[:100]}...")
-        try:
-            # Обрабатываем URL в тексте (с таймаутом, чтобы не блокировать)
-            base_text = await asyncio.wait_for(
-                process_url_in_text(base_text),
-                timeout=10.0
-            )
-            content_parts.append(base_text)
-        except asyncio.TimeoutError:
-            logger.warning("Таймаут при обработке URL в тексте, используем исходный текст")
-            content_parts.append(base_text)  # Используем исходный текст без URL
-        except Exception as e:
-            logger.error(f"Ошибка при обработке URL в тексте: {e}, используем исходный текст")
-            content_parts.append(base_text)  # Используем исходный текст без URL
+        branches.append(("url", _url_part(message, base_text)))
     else:
         logger.info("Базовый текст отсутствует")
 
-    # Обработка фотографий (неблокирующая, с таймаутом)
     if message.photo:
-        logger.info("Обнаружено фото в сообщении, начинаем обработку")
-        try:
-            image_url = await asyncio.wait_for(get_photo_url(bot, message), timeout=10.0)
-            if image_url:
-                logger.info(f"URL изображения получен: {image_url[:100]}...")
-                description = await asyncio.wait_for(
-                    get_image_description(image_url, openai_client), 
-                    timeout=30.0
-                )
-                if description:
-                    logger.info(f"Описание изображения получено: {description[:100]}...")
-                    content_parts.append(f"\nОписание изображения: {description}")
-                else:
-                    logger.warning("Не удалось получить описание изображения")
-            else:
-                logger.warning("Не удалось получить URL изображения")
-        except asyncio.TimeoutError:
-            logger.warning("Таймаут при обработке фото, пропускаем описание")
-        except Exception as e:
-            logger.error(f"Ошибка при обработке фото: {e}", exc_info=True)
-
-    # Обработка PDF документов (неблокирующая, с таймаутом)
-    # Извлекаем только текст из PDF, без анализа через OpenAI
-    if message.document and message.document.file_name and message.document.file_name.lower().endswith('.pdf'):
-        logger.info("Обнаружен PDF документ в сообщении, начинаем извлечение текста")
-        try:
-            file_info = await asyncio.wait_for(bot.get_file(message.document.file_id), timeout=10.0)
-            pdf_url = f'https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}'
-            pdf_text = await asyncio.wait_for(extract_pdf_text(pdf_url), timeout=60.0)
-            if pdf_text:
-                logger.info(f"Текст из PDF извлечен: {len(pdf_text)} символов")
-                content_parts.append(f"\n\nТекст из PDF документа:\n{pdf_text}")
-            else:
-                logger.warning("Не удалось извлечь текст из PDF документа")
-        except asyncio.TimeoutError:
-            logger.warning("Таймаут при обработке PDF, пропускаем извлечение текста")
-        except Exception as e:
-            logger.error(f"Ошибка при обработке PDF: {e}", exc_info=True)
-
-    # Обработка других документов (txt, docx, xlsx, pptx, odt) - неблокирующая, с таймаутом
-    # Извлекаем только текст из документов, без анализа через OpenAI
+        branches.append(("photo", _photo_part(bot, message, openai_client)))
+
     if message.document and message.document.file_name:
         file_name_lower = message.document.file_name.lower()
-        # Поддерживаемые форматы документов
-        supported_extensions = ['.txt', '.docx', '.xlsx', '.pptx', '.odt']
-        file_extension = None
-        for ext in supported_extensions:
-            if file_name_lower.endswith(ext):
-                file_extension = ext
-                break
-        
-        if file_extension:
-            logger.info(f"Обнаружен документ {file_extension} в сообщении, начинаем извлечение текста")
-            try:
-                file_info = await asyncio.wait_for(bot.get_file(message.document.file_id), timeout=10.0)
-                document_url = f'https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}'
-                document_text = await asyncio.wait_for(
-                    extract_document_text(document_url, file_extension), 
-                    timeout=60.0
-                )
-                if document_text:
-                    logger.info(f"Текст из документа {file_extension} извлечен: {len(document_text)} символов")
-                    content_parts.append(f"\n\nТекст из документа {file_extension}:\n{document_text}")
-                else:
-                    logger.warning(f"Не удалось извлечь текст из документа {file_extension}")
-            except asyncio.TimeoutError:
-                logger.warning(f"Таймаут при обработке документа {file_extension}, пропускаем извлечение текста")
-            except Exception as e:
-                logger.error(f"Ошибка при обработке документа {file_extension}: {e}", exc_info=True)
+        if file_name_lower.endswith('.pdf'):
+            branches.append(("pdf", _pdf_part(bot, message, blacklist_scanner)))
+        else:
+            # Поддерживаемые форматы документов
+            for ext in ['.txt', '.docx', '.xlsx', '.pptx', '.odt']:
+                if file_name_lower.endswith(ext):
+                    branches.append(("document", _document_part(bot, message, ext, blacklist_scanner)))
+                    break
 
-    # Обработка голосовых сообщений (неблокирующая, с таймаутом)
     if message.voice:
         logger.info("Обнаружено голосовое сообщение, начинаем транскрибацию")
-        try:
-            transcription = await asyncio.wait_for(
-                transcribe_audio(bot, message, openai_client), 
-                timeout=60.0
-            )
-            if transcription:
-                logger.info(f"Транскрибация голосового сообщения успешна: {transcription[:100]}...")
-                content_parts.append(f"\nТранскрипция аудио: {transcription}")
-            else:
-                logger.warning("Не удалось транскрибировать голосовое сообщение")
-        except asyncio.TimeoutError:
-            logger.warning("Таймаут при транскрибации голосового сообщения, пропускаем")
-        except Exception as e:
-            logger.error(f"Ошибка при транскрибации голосового сообщения: {e}", exc_info=True)
-
-    # Обработка аудио файлов (неблокирующая, с таймаутом)
+        branches.append(("voice", _audio_part(bot, message, openai_client, "голосовое сообщение", "голосового сообщения")))
     if message.audio:
         logger.info("Обнаружено аудио сообщение, начинаем транскрибацию")
-        try:
-            transcription = await asyncio.wait_for(
-                transcribe_audio(bot, message, openai_client), 
-                timeout=60.0
-            )
-            if transcription:
-                logger.info(f"Транскрибация аудио файла успешна: {transcription[:100]}...")
-                content_parts.append(f"\nТранскрипция аудио: {transcription}")
-            else:
-                logger.warning("Не удалось транскрибировать аудио файл")
-        except asyncio.TimeoutError:
-            logger.warning("Таймаут при транскрибации аудио файла, пропускаем")
-        except Exception as e:
-            logger.error(f"Ошибка при транскрибации аудио файла: {e}", exc_info=True)
+        branches.append(("audio", _audio_part(bot, message, openai_client, "аудио файл", "аудио файла")))
+
+    results = await _run_content_branches(branches, blacklist_scanner, settings.CONTENT_PREPARE_TIMEOUT)
+    if base_text:
+        results.setdefault("url", base_text)  # Ссылки не успели обработаться — исходный текст
+    content_parts = [results[name] for name in CONTENT_BRANCHES if results.get(name)]
+
+    if blacklist_scanner is not None and blacklist_scanner.hit:
+        logger.info("Нарушение blacklist найдено в документе, остальные шаги подготовки контента пропущены")
+        return "\n".join(content_parts)
 
     # Обработка опросов
     if message.poll:
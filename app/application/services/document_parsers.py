@@ -0,0 +1,441 @@
+"""
+Разбор файлов документов в текст: PDF, Word, Excel, PowerPoint, OpenDocument.
+
+Функции модуля выполняются в процессах-воркерах ParserPool (parser_pool.py):
+байты файла на входе, части текста на выходе. Модуль не зависит от aiogram,
+БД и настроек бота.
+"""
+import io
+import logging
+import os
+import posixpath
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from zipfile import ZipFile
+
+from pypdf import PdfReader
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParseStats:
+    """Статистика разбора одного файла (возвращается из воркера вместе с текстом)"""
+    pages_total: int = 0  # Страниц (слайдов) в файле
+    pages_parsed: int = 0  # Страниц, с которых извлекался текст
+    pages_skipped: int = 0  # Страниц без текстового слоя (сканы), пропущенных без разбора
+    rss_mb: float = 0.0  # Рост пикового RSS воркера с момента запуска
+
+
+def _page_has_text_layer(page) -> bool:
+    """
+    Может ли на странице PDF быть текст: для вывода текста нужен шрифт в ресурсах
+    страницы (или во вложенной форме). Страница-скан (только изображения) шрифтов
+    не содержит — ее content stream не разбирается.
+    """
+    try:
+        resources = page.get("/Resources")
+        if resources is None:
+            return True
+        resources = resources.get_object()
+        if "/Font" in resources:
+            return True
+        xobjects = resources.get("/XObject")
+        if xobjects is None:
+            return False
+        xobjects = xobjects.get_object()
+        return any(xobjects[name].get_object().get("/Subtype") == "/Form" for name in xobjects)
+    except Exception:
+        return True  # Непонятная структура — пусть решает extract_text()
+
+
+def _iter_pdf_pages(document_file: BinaryIO, stats: ParseStats) -> Iterator[str]:
+    """
+    Текст PDF постранично: страница разбирается только когда до нее дошла очередь
+    (после набранного бюджета символов остальные страницы не трогаются),
+    страницы без текстового слоя пропускаются без extract_text().
+    """
+    pdf_reader = PdfReader(document_file)
+    stats.pages_total = len(pdf_reader.pages)
+    for page_num, page in enumerate(pdf_reader.pages, 1):
+        if not _page_has_text_layer(page):
+            stats.pages_skipped += 1
+            continue
+        stats.pages_parsed += 1
+        try:
+            page_text = page.extract_text()
+            if page_text.strip():
+                yield f"\n--- Страница {page_num} ---\n{page_text}"
+        except Exception as e:
+            logger.warning(f"Не удалось извлечь текст со страницы {page_num}: {e}")
+            continue
+
+
+# Office-форматы (docx, xlsx, pptx, odt) — zip-архивы с XML. Текст читается из нужных
+# частей архива потоково (ET.iterparse) без построения объектной модели документа:
+# обработанные элементы сразу очищаются, а после набранного бюджета символов
+# чтение XML прекращается (генератор дальше не вызывается).
+_OFFICE_TEXT_TAGS = frozenset({"t"})  # Элементы с текстом в OOXML (w:t, a:t, t в Excel)
+_OFFICE_BREAKS = {"tab": "\t", "br": "\n", "cr": "\n"}  # w:tab, w:br, a:br
+_ODF_BREAKS = {"tab": "\t", "s": " ", "line-break": "\n"}  # text:tab, text:s, text:line-break
+_PACKAGE_RELATIONSHIP = "Relationship"
+
+
+def _local_name(tag: str) -> str:
+    """Имя элемента без пространства имен ('{...}p' → 'p'); одинаково для Transitional и Strict OOXML."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _relationship_id(elem: ET.Element) -> str:
+    """Значение r:id элемента (у sldId есть еще и собственный атрибут id без пространства имен)."""
+    for key, value in elem.attrib.items():
+        if key.startswith("{") and _local_name(key) == "id":
+            return value
+    return ""
+
+
+def _element_text(elem: ET.Element, text_tags: Optional[frozenset], breaks: dict) -> str:
+    """
+    Текст элемента со всеми вложенными.
+
+    :param elem: Элемент XML (абзац, ячейка, ...)
+    :param text_tags: Элементы, из которых берется текст (OOXML); None — весь текст вместе с хвостами (ODF)
+    :param breaks: Элементы-разделители → символ (табуляция, перенос строки)
+    :return: Текст
+    """
+    parts = []
+
+    def walk(node: ET.Element):
+        name = _local_name(node.tag)
+        if name in breaks:
+            parts.append(breaks[name])
+        if node.text and (text_tags is None or name in text_tags):
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if text_tags is None and child.tail:
+                parts.append(child.tail)
+
+    walk(elem)
+    return "".join(parts)
+
+
+def _relationship_targets(archive: ZipFile, part: str) -> Dict[str, str]:
+    """
+    Связи части OOXML-пакета: r:id → путь в архиве.
+
+    :param archive: Открытый архив документа
+    :param part: Часть пакета ('xl/workbook.xml', 'ppt/presentation.xml')
+    :return: Словарь id → путь к связанной части (пустой, если связей нет)
+    """
+    base_dir, file_name = posixpath.split(part)
+    rels_path = posixpath.join(base_dir, "_rels", file_name + ".rels")
+    if rels_path not in archive.NameToInfo:
+        return {}
+    targets = {}
+    root = ET.fromstring(archive.read(rels_path))
+    for rel in root:
+        if _local_name(rel.tag) != _PACKAGE_RELATIONSHIP or rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join(base_dir, target))
+    return targets
+
+
+def _iter_docx(archive: ZipFile, stats: ParseStats) -> Iterator[str]:
+    """Текст Word документа в порядке следования: абзацы и строки таблиц (ячейки через пробел)."""
+    cell_depth = 0
+    row_text = []
+    with archive.open("word/document.xml") as xml:
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            name = _local_name(elem.tag)
+            if event == "start":
+                if name == "tc":
+                    cell_depth += 1
+                continue
+            if name == "p":
+                text = _element_text(elem, _OFFICE_TEXT_TAGS, _OFFICE_BREAKS)
+                elem.clear()  # Вложенные абзацы (надписи) не попадут в текст внешнего повторно
+                if not text.strip():
+                    continue
+                if cell_depth:
+                    row_text.append(text + " ")
+                else:
+                    yield text + "\n"
+            elif name == "tc":
+                cell_depth -= 1
+            elif name == "tr":
+                if row_text:
+                    yield "".join(row_text) + "\n"
+                row_text = []
+                elem.clear()
+
+
+class _SharedStrings:
+    """
+    Таблица общих строк книги Excel (ячейки с t="s" ссылаются на нее по номеру).
+    Читается лениво, до нужного номера: строки нумеруются по первому появлению
+    в листах, поэтому для первых строк листа хватает начала таблицы.
+    """
+
+    def __init__(self, archive: ZipFile):
+        self._strings: List[str] = []
+        self._items = self._iter_items(archive) if "xl/sharedStrings.xml" in archive.NameToInfo else iter(())
+
+    @staticmethod
+    def _iter_items(archive: ZipFile) -> Iterator[str]:
+        with archive.open("xl/sharedStrings.xml") as xml:
+            for _, elem in ET.iterparse(xml):
+                if _local_name(elem.tag) == "si":
+                    # Фонетические подсказки (rPh) — не текст ячейки
+                    yield "".join(
+                        _element_text(child, _OFFICE_TEXT_TAGS, {})
+                        for child in elem if _local_name(child.tag) != "rPh"
+                    )
+                    elem.clear()
+
+    def get(self, index: int) -> str:
+        """Строка по номеру ('' — нет такой строки)."""
+        while len(self._strings) <= index:
+            item = next(self._items, None)
+            if item is None:
+                return ""
+            self._strings.append(item)
+        return self._strings[index]
+
+
+def _xlsx_sheets(archive: ZipFile) -> List[Tuple[str, str]]:
+    """Листы книги Excel по порядку: (название, путь к XML листа)."""
+    targets = _relationship_targets(archive, "xl/workbook.xml")
+    root = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheets = []
+    for elem in root.iter():
+        if _local_name(elem.tag) == "sheet":
+            path = targets.get(_relationship_id(elem))
+            if path and path in archive.NameToInfo:
+                sheets.append((elem.get("name", ""), path))
+    return sheets
+
+
+def _xlsx_column(reference: str) -> int:
+    """Номер столбца по адресу ячейки ('C7' → 3; 0 — адреса нет)."""
+    column = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        column = column * 26 + ord(char.upper()) - ord("A") + 1
+    return column
+
+
+def _xlsx_number(value: str) -> str:
+    """Число ячейки в том виде, в котором его показывал openpyxl (1, 2.5, 1e-05)."""
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return str(int(number)) if number.is_integer() and "." not in value and "E" not in value.upper() else str(number)
+
+
+def _xlsx_cell_value(cell: ET.Element, shared_strings: _SharedStrings) -> str:
+    """Значение ячейки (сохраненное значение формулы, как openpyxl с data_only=True)."""
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        return "".join(
+            _element_text(child, _OFFICE_TEXT_TAGS, {}) for child in cell if _local_name(child.tag) == "is"
+        )
+    value = None
+    for child in cell:
+        if _local_name(child.tag) == "v":
+            value = child.text
+            break
+    if value is None:
+        return ""
+    if cell_type == "s":
+        return shared_strings.get(int(value)) if value.isdigit() else ""
+    if cell_type == "b":
+        return "True" if value == "1" else "False"
+    if cell_type == "n":
+        return _xlsx_number(value)
+    return value  # str (формула), e (ошибка)
+
+
+def _iter_xlsx(archive: ZipFile, stats: ParseStats) -> Iterator[str]:
+    """Текст Excel файла: заголовок листа и строки (ячейки через " | ")."""
+    shared_strings = _SharedStrings(archive)
+    for sheet_name, path in _xlsx_sheets(archive):
+        yield f"\n--- Лист: {sheet_name} ---\n"
+        first_column = 1
+        with archive.open(path) as xml:
+            for _, elem in ET.iterparse(xml):
+                name = _local_name(elem.tag)
+                if name == "dimension":
+                    # Строки начинаются с первого занятого столбца листа ("C1:F20" → 3)
+                    first_column = _xlsx_column(elem.get("ref", "")) or 1
+                elif name == "row":
+                    cells = []
+                    for cell in elem:
+                        if _local_name(cell.tag) != "c":
+                            continue
+                        column = _xlsx_column(cell.get("r", ""))
+                        if column:
+                            cells.extend([""] * (column - first_column - len(cells)))
+                        cells.append(_xlsx_cell_value(cell, shared_strings))
+                    elem.clear()
+                    row_text = " | ".join(cells)
+                    if row_text.strip():
+                        yield row_text + "\n"
+
+
+def _pptx_slides(archive: ZipFile) -> List[str]:
+    """Пути к XML слайдов в порядке показа (по списку слайдов презентации)."""
+    targets = _relationship_targets(archive, "ppt/presentation.xml")
+    root = ET.fromstring(archive.read("ppt/presentation.xml"))
+    slides = []
+    for elem in root.iter():
+        if _local_name(elem.tag) == "sldId":
+            path = targets.get(_relationship_id(elem))
+            if path and path in archive.NameToInfo:
+                slides.append(path)
+    return slides
+
+
+def _iter_pptx(archive: ZipFile, stats: ParseStats) -> Iterator[str]:
+    """Текст PowerPoint презентации по слайдам."""
+    slides = _pptx_slides(archive)
+    stats.pages_total = len(slides)
+    for slide_num, path in enumerate(slides, 1):
+        stats.pages_parsed += 1
+        slide_text = [f"\n--- Слайд {slide_num} ---\n"]
+        with archive.open(path) as xml:
+            for _, elem in ET.iterparse(xml):
+                if _local_name(elem.tag) == "p":
+                    text = _element_text(elem, _OFFICE_TEXT_TAGS, _OFFICE_BREAKS)
+                    elem.clear()
+                    if text.strip():
+                        slide_text.append(text + "\n")
+        yield "".join(slide_text)
+
+
+def _iter_odt(archive: ZipFile, stats: ParseStats) -> Iterator[str]:
+    """Текст OpenDocument Text: абзацы и заголовки content.xml."""
+    with archive.open("content.xml") as xml:
+        for _, elem in ET.iterparse(xml):
+            if _local_name(elem.tag) in ("p", "h"):
+                text = _element_text(elem, None, _ODF_BREAKS)
+                elem.clear()
+                if text.strip():
+                    yield text.strip() + "\n"
+
+
+def _office_parser(iter_parts: Callable[[ZipFile, ParseStats], Iterator[str]]) -> Callable[[BinaryIO, ParseStats], Iterator[str]]:
+    """Генератор частей текста office-файла: открывает zip-архив и передает его разбору формата."""
+    def iter_document(document_file: BinaryIO, stats: ParseStats) -> Iterator[str]:
+        with ZipFile(document_file) as archive:
+            yield from iter_parts(archive, stats)
+    return iter_document
+
+
+# Разбор документов: расширение → (генератор частей текста, библиотека, название для логов)
+DOCUMENT_PARSERS = {
+    '.pdf': (_iter_pdf_pages, PdfReader, "pypdf", "PDF файла"),
+    '.docx': (_office_parser(_iter_docx), ZipFile, "zipfile", "Word документа"),
+    '.xlsx': (_office_parser(_iter_xlsx), ZipFile, "zipfile", "Excel файла"),
+    '.pptx': (_office_parser(_iter_pptx), ZipFile, "zipfile", "PowerPoint презентации"),
+    '.odt': (_office_parser(_iter_odt), ZipFile, "zipfile", "ODT файла"),
+}
+
+
+def _take_chunks(chunks: Iterable[str], max_chars: int) -> List[str]:
+    """Части текста, пока их суммарная длина не превысит max_chars (дальше файл не разбирается)."""
+    taken = []
+    length = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        taken.append(chunk)
+        length += len(chunk)
+        if length > max_chars:
+            break
+    return taken
+
+
+_baseline_rss_mb = 0.0  # Пиковый RSS воркера до первой задачи (память, унаследованная при запуске)
+_started = None  # Очередь ParserPool: воркер сообщает в нее (номер задачи, pid) перед разбором
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса в MB (0 — неизвестен)."""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _address_space_bytes() -> int:
+    """Текущий размер адресного пространства процесса (0 — неизвестен, не Linux)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def init_worker(memory_limit_mb: int, started=None):
+    """
+    Инициализация процесса-воркера: ограничение адресного пространства.
+    Воркеру разрешено занять memory_limit_mb сверх того, что он занимал
+    при запуске; разбор, которому не хватило памяти, завершается
+    MemoryError (или падением воркера), а не OOM-killer'ом всего контейнера.
+
+    :param memory_limit_mb: Лимит дополнительной виртуальной памяти воркера (0 — без лимита)
+    :param started: Очередь (multiprocessing.SimpleQueue) для сообщений run_task или None
+    """
+    global _baseline_rss_mb, _started
+    _baseline_rss_mb = peak_rss_mb()
+    _started = started
+    if resource is None or memory_limit_mb <= 0:
+        return
+    current = _address_space_bytes()
+    if current:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = current + memory_limit_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def parse_document(extension: str, source: Union[bytes, str], max_chars: int) -> Tuple[List[str], ParseStats]:
+    """
+    Разбирает файл в части текста (задача процесса-воркера: байты на входе, текст на выходе).
+
+    :param extension: Расширение файла ('.pdf', '.docx', ...)
+    :param source: Содержимое файла или путь к временному файлу (downloads.Download.source())
+    :param max_chars: Сколько символов достаточно (разбор останавливается после них)
+    :return: (части текста, статистика разбора)
+    """
+    parse_chunks = DOCUMENT_PARSERS[extension][0]
+    stats = ParseStats()
+    with (open(source, "rb") if isinstance(source, str) else io.BytesIO(source)) as document_file:
+        chunks = _take_chunks(parse_chunks(document_file, stats), max_chars)
+    stats.rss_mb = peak_rss_mb() - _baseline_rss_mb
+    return chunks, stats
+
+
+def run_task(task_id: int, extension: str, source: Union[bytes, str], max_chars: int) -> Tuple[List[str], ParseStats]:
+    """
+    Задача ParserPool: сообщает pid воркера (зависший разбор убивается по pid), затем parse_document.
+
+    :param task_id: Номер задачи в ParserPool
+    :return: Результат parse_document
+    """
+    if _started is not None:
+        _started.put((task_id, os.getpid()))
+    return parse_document(extension, source, max_chars)
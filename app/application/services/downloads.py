@@ -0,0 +1,132 @@
+"""
+Потоковое скачивание файлов с ограничением размера.
+
+Файл читается блоками: скачивание прерывается, как только превышен лимит
+(даже если сервер не прислал Content-Length). Небольшие файлы остаются
+в памяти, большие сразу пишутся во временный файл на диске, поэтому в памяти
+бота не бывает двух копий файла (буфера скачивания и BytesIO для разбора):
+парсеры и процессы разбора открывают файл сами (Download.source()/open()).
+"""
+import io
+import logging
+import os
+import tempfile
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_BLOCK_SIZE = 64 * 1024  # Размер блока при скачивании
+SPOOL_MAX_MEMORY_BYTES = 1024 * 1024  # Файлы больше этого размера скачиваются во временный файл
+
+
+class Download:
+    """Скачанный файл: в памяти или во временном файле (удаляется при close())"""
+
+    def __init__(self, spool_max_memory: int = SPOOL_MAX_MEMORY_BYTES):
+        self.size = 0
+        self.path: Optional[str] = None  # Временный файл на диске (None — файл в памяти)
+        self._spool_max_memory = spool_max_memory
+        self._blocks: List[bytes] = []
+        self._content: Optional[bytes] = None
+        self._file: Optional[BinaryIO] = None
+
+    def write(self, block: bytes):
+        """Добавляет блок; при превышении порога данные переносятся на диск."""
+        self.size += len(block)
+        if self._file is None and self.size > self._spool_max_memory:
+            fd, self.path = tempfile.mkstemp(prefix="download-")
+            self._file = os.fdopen(fd, "wb")
+            for previous in self._blocks:
+                self._file.write(previous)
+            self._blocks = []
+        if self._file is not None:
+            self._file.write(block)
+        else:
+            self._blocks.append(block)
+
+    def finish(self):
+        """Завершает запись (после последнего блока)."""
+        if self._file is not None:
+            self._file.close()
+        elif self._content is None:
+            self._content = b"".join(self._blocks)
+            self._blocks = []
+
+    def source(self) -> Union[bytes, str]:
+        """Содержимое для разбора: bytes (файл в памяти) или путь к временному файлу."""
+        return self.path if self.path is not None else self._content
+
+    def open(self) -> BinaryIO:
+        """Файловый объект для чтения (BytesIO над bytes не копирует данные)."""
+        if self.path is not None:
+            return open(self.path, "rb")
+        return io.BytesIO(self._content)
+
+    def close(self):
+        """Удаляет временный файл."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError as e:
+                logger.warning(f"Не удалось удалить временный файл {self.path}: {e}")
+            self.path = None
+        self._blocks = []
+        self._content = None
+
+    def __enter__(self) -> "Download":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def download_bounded(response: aiohttp.ClientResponse, max_bytes: int, label: str) -> Optional[Download]:
+    """
+    Скачивает тело ответа блоками, прерывая скачивание при превышении max_bytes.
+
+    :param response: Ответ aiohttp (статус уже проверен)
+    :param max_bytes: Максимальный размер файла
+    :param label: Название файла для логов ("PDF файл", "Документ", ...)
+    :return: Download (закрыть после использования) или None, если файл больше max_bytes
+    """
+    max_mb = max_bytes / 1024 / 1024
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        logger.warning(f"{label} слишком большой ({int(content_length) / 1024 / 1024:.2f} MB), максимум {max_mb:.0f} MB")
+        return None
+
+    download = Download()
+    try:
+        async for block in response.content.iter_chunked(DOWNLOAD_BLOCK_SIZE):
+            download.write(block)
+            if download.size > max_bytes:
+                logger.warning(f"{label} слишком большой (больше {max_mb:.0f} MB), скачивание прервано")
+                download.close()
+                return None
+        download.finish()
+    except BaseException:
+        download.close()
+        raise
+    logger.info(f"{label} скачан, размер: {download.size} байт{' (временный файл)' if download.path else ''}")
+    return download
+
+
+async def read_capped(response: aiohttp.ClientResponse, max_bytes: int) -> Tuple[bytes, bool]:
+    """
+    Читает начало тела ответа, не больше max_bytes (для страниц, где нужен только текст).
+
+    :param response: Ответ aiohttp (статус уже проверен)
+    :param max_bytes: Сколько байт прочитать максимум
+    :return: (прочитанные байты, было ли тело обрезано)
+    """
+    body = bytearray()
+    async for block in response.content.iter_chunked(DOWNLOAD_BLOCK_SIZE):
+        body += block
+        if len(body) >= max_bytes:
+            # Остаток не читается: соединение закрывается вместо возврата в пул
+            return bytes(body[:max_bytes]), True
+    return bytes(body), False
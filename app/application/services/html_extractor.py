@@ -0,0 +1,292 @@
+"""
+Извлечение основного текста веб-страницы.
+
+HTML разбирается самым быстрым из установленных парсеров: selectolax (lexbor),
+lxml, иначе BeautifulSoup со встроенным html.parser. Из страницы удаляются
+скрипты, стили, меню, шапка, подвал и формы, затем упрощенная эвристика
+в духе Readability выбирает блок с основным текстом: абзацы начисляют баллы
+родителю и деду, баллы корректируются по class/id ("article", "content" —
+плюс, "comment", "sidebar", "share" — минус) и доле текста в ссылках.
+Если основной блок не найден или в нем мало текста, берется текст всей
+страницы, как раньше. Модуль не обращается к сети и event loop: функции
+вызываются в потоке (asyncio.to_thread).
+"""
+import logging
+import re
+from typing import Dict, Iterable, List, Optional
+
+from bs4 import BeautifulSoup
+
+# Быстрые парсеры HTML (опциональные)
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Элементы, которые не бывают основным текстом страницы
+BOILERPLATE_TAGS = (
+    "script", "style", "noscript", "template", "svg", "iframe", "form", "button",
+    "select", "textarea", "nav", "header", "footer", "aside",
+)
+PARAGRAPH_TAGS = ("p", "pre", "blockquote")  # Абзацы, начисляющие баллы контейнерам
+MIN_PARAGRAPH_CHARS = 25  # Более короткие абзацы (подписи, кнопки) не учитываются
+MIN_MAIN_TEXT_CHARS = 250  # Если в основном блоке меньше текста — берется вся страница
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|news|page|post|story|text", re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(
+    r"ad-|banner|comment|footer|menu|meta|nav|promo|related|share|sidebar|social|sponsor|subscribe|widget",
+    re.IGNORECASE,
+)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _SelectolaxTree:
+    """Доступ к дереву selectolax (lexbor)"""
+    name = "selectolax"
+
+    def __init__(self, html: str):
+        self.tree = LexborHTMLParser(html)
+        self.tree.strip_tags(list(BOILERPLATE_TAGS))
+
+    def title(self) -> str:
+        node = self.tree.css_first("title")
+        return node.text() if node is not None else ""
+
+    def body(self):
+        return self.tree.body
+
+    def paragraphs(self) -> Iterable:
+        return self.tree.css(", ".join(PARAGRAPH_TAGS))
+
+    @staticmethod
+    def key(node) -> int:
+        return node.mem_id  # Обертки узлов создаются заново при каждом обращении
+
+    @staticmethod
+    def text(node) -> str:
+        return node.text(deep=True)
+
+    @staticmethod
+    def parent(node):
+        parent = node.parent
+        return parent if parent is not None and parent.tag not in ("-document", "html") else None
+
+    @staticmethod
+    def tag(node) -> str:
+        return node.tag
+
+    @staticmethod
+    def hints(node) -> str:
+        attributes = node.attributes
+        return f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+
+    @staticmethod
+    def link_chars(node) -> int:
+        return sum(len(link.text(deep=True)) for link in node.css("a"))
+
+
+class _LxmlTree:
+    """Доступ к дереву lxml.html"""
+    name = "lxml"
+
+    def __init__(self, html: str):
+        # lxml не принимает str с XML-декларацией кодировки
+        self.root = lxml.html.document_fromstring(_XML_DECLARATION.sub("", html, count=1))
+        etree.strip_elements(self.root, etree.Comment, *BOILERPLATE_TAGS, with_tail=False)
+
+    def title(self) -> str:
+        title = self.root.find(".//title")
+        return title.text_content() if title is not None else ""
+
+    def body(self):
+        body = self.root.find("body")
+        return body if body is not None else self.root
+
+    def paragraphs(self) -> Iterable:
+        return self.root.iter(*PARAGRAPH_TAGS)
+
+    @staticmethod
+    def key(node) -> int:
+        return id(node)  # Прокси-объект живет, пока узел хранится в таблице баллов
+
+    @staticmethod
+    def text(node) -> str:
+        return node.text_content()
+
+    @staticmethod
+    def parent(node):
+        parent = node.getparent()
+        return parent if parent is not None and parent.tag != "html" else None
+
+    @staticmethod
+    def tag(node) -> str:
+        return node.tag
+
+    @staticmethod
+    def hints(node) -> str:
+        return f"{node.get('class', '')} {node.get('id', '')}"
+
+    @staticmethod
+    def link_chars(node) -> int:
+        return sum(len(link.text_content()) for link in node.iter("a"))
+
+
+class _SoupTree:
+    """Доступ к дереву BeautifulSoup (html.parser — без дополнительных библиотек)"""
+    name = "html.parser"
+
+    def __init__(self, html: str):
+        self.soup = BeautifulSoup(html, "html.parser")
+        for elem in self.soup.find_all(BOILERPLATE_TAGS):
+            elem.decompose()
+
+    def title(self) -> str:
+        return self.soup.title.get_text() if self.soup.title is not None else ""
+
+    def body(self):
+        return self.soup.body or self.soup
+
+    def paragraphs(self) -> Iterable:
+        return self.soup.find_all(PARAGRAPH_TAGS)
+
+    @staticmethod
+    def key(node) -> int:
+        return id(node)
+
+    @staticmethod
+    def text(node) -> str:
+        return node.get_text()
+
+    @staticmethod
+    def parent(node):
+        parent = node.parent
+        return parent if parent is not None and parent.name not in ("[document]", "html") else None
+
+    @staticmethod
+    def tag(node) -> str:
+        return node.name
+
+    @staticmethod
+    def hints(node) -> str:
+        return f"{' '.join(node.get('class') or [])} {node.get('id') or ''}"
+
+    @staticmethod
+    def link_chars(node) -> int:
+        return sum(len(link.get_text()) for link in node.find_all("a"))
+
+
+def html_parser_name() -> str:
+    """Название используемого парсера HTML (selectolax, lxml или html.parser)."""
+    return _tree_class().name
+
+
+def _tree_class():
+    if LexborHTMLParser is not None:
+        return _SelectolaxTree
+    if lxml is not None:
+        return _LxmlTree
+    return _SoupTree
+
+
+def decode_html(content: bytes, charset: Optional[str]) -> str:
+    """
+    Декодирует HTML: кодировка из заголовка Content-Type, иначе из <meta charset>, иначе UTF-8.
+
+    :param content: Тело ответа
+    :param charset: Кодировка из заголовка ответа (response.charset) или None
+    :return: Текст HTML (нераспознанные байты заменяются)
+    """
+    if not charset:
+        match = _META_CHARSET.search(content[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return content.decode(charset, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _clean_lines(text: str) -> str:
+    """Непустые строки текста без отступов."""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _main_node(tree):
+    """
+    Блок с основным текстом страницы (или None).
+
+    Каждый абзац дает баллы (1 + запятые + длина/100, до 3) родителю и половину — деду.
+    Баллы контейнера умножаются на (1 - доля текста в ссылках) и сдвигаются по class/id.
+    """
+    candidates: Dict[int, List] = {}  # ключ узла → [узел, баллы]
+    for paragraph in tree.paragraphs():
+        text = _WHITESPACE.sub(" ", tree.text(paragraph)).strip()
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) / 100, 3)
+        parent = tree.parent(paragraph)
+        for node, share in ((parent, 1.0), (tree.parent(parent) if parent is not None else None, 0.5)):
+            if node is None:
+                continue
+            candidate = candidates.setdefault(tree.key(node), [node, 0.0])
+            candidate[1] += score * share
+
+    best, best_score = None, 0.0
+    for node, score in candidates.values():
+        hints = tree.hints(node)
+        if POSITIVE_HINTS.search(hints):
+            score += 25
+        if NEGATIVE_HINTS.search(hints):
+            score -= 25
+        if tree.tag(node) in ("article", "main"):
+            score += 10
+        text_chars = len(tree.text(node)) or 1
+        score *= 1 - min(tree.link_chars(node) / text_chars, 1)
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+def extract_main_text(html: str, max_chars: int = 0) -> str:
+    """
+    Основной текст HTML-страницы: заголовок и текст блока статьи.
+
+    :param html: HTML страницы
+    :param max_chars: Максимальная длина результата (0 — без ограничения)
+    :return: Текст (непустые строки без отступов); пустая строка, если текста нет
+    """
+    tree = _tree_class()(html)
+    main = _main_node(tree)
+    text = _clean_lines(tree.text(main)) if main is not None else ""
+    if len(text) < MIN_MAIN_TEXT_CHARS:
+        body = tree.body()
+        text = _clean_lines(tree.text(body)) if body is not None else ""
+    title = _WHITESPACE.sub(" ", tree.title()).strip()
+    if title and not text.startswith(title):
+        text = f"{title}\n{text}" if text else title
+    return text[:max_chars] if max_chars else text
+
+
+def extract_page_text(content: bytes, charset: Optional[str], content_type: str, max_chars: int = 0) -> str:
+    """
+    Текст страницы из тела ответа (вызывается в потоке: декодирование и разбор HTML — работа CPU).
+
+    :param content: Тело ответа (возможно, обрезанное по лимиту размера)
+    :param charset: Кодировка из заголовка ответа или None
+    :param content_type: MIME-тип ответа ('text/html', 'text/plain', ...)
+    :param max_chars: Максимальная длина результата (0 — без ограничения)
+    :return: Текст страницы
+    """
+    text = decode_html(content, charset)
+    if content_type == "text/plain":
+        text = _clean_lines(text)
+        return text[:max_chars] if max_chars else text
+    return extract_main_text(text, max_chars)
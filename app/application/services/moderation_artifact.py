@@ -0,0 +1,148 @@
+"""
+Предкомпилированный артефакт матчера черного списка.
+
+Самая долгая часть сборки BlacklistMatcher — разбор паттернов: перевод
+в канонический вид, анализ риска, перебор префиксов и n-грамм префильтра
+(~1 с на полтораста паттернов). Результат разбора (планы записей) сохраняется
+в файл, по умолчанию data/moderation_matcher.pkl в корне проекта (/app/data
+в Docker, каталог в .gitignore), и при следующем старте загружается за доли секунды.
+
+В файле хранятся:
+- версия формата и хэш кода матчера (moderation_matcher, text_normalizer,
+  версия Python) — если код изменился, планы не используются;
+- хэш словаря (встроенные паттерны и фразы из БД) — если он отличается
+  от текущего, файл пересобирается. Планы записей, которые не изменились,
+  при этом переиспользуются.
+
+Артефакт пишет только основной процесс бота, атомарной заменой файла:
+второй экземпляр бота не увидит его наполовину записанным. Процессы проверки
+(ModerationExecutor) файл только читают.
+
+Файл не подписан, а pickle.load выполняет код из файла. Поэтому артефакт
+не загружается, если он или его каталог принадлежат другому пользователю
+или доступны на запись группе/всем: подменить его должен быть в состоянии
+только тот, кто и так может менять код бота.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config.settings import settings
+from app.application.services import moderation_matcher, text_normalizer
+from app.application.services.moderation_matcher import BlacklistEntry
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1  # Увеличивается при изменении структуры файла
+ARTIFACT_FILE_NAME = "moderation_matcher.pkl"
+PROJECT_ROOT = Path(__file__).resolve().parents[3]  # В Docker — /app
+
+_code_hash: Optional[str] = None
+
+
+def artifact_path() -> Path:
+    """Путь к файлу артефакта (settings.MODERATION_ARTIFACT_PATH или data/ в корне проекта, рядом с БД)."""
+    if settings.MODERATION_ARTIFACT_PATH:
+        return Path(settings.MODERATION_ARTIFACT_PATH)
+    # Не зависит от текущего каталога: скрипты из app/scripts пишут туда же, куда бот
+    return PROJECT_ROOT / "data" / ARTIFACT_FILE_NAME
+
+
+def _untrusted_reason(path: Path) -> Optional[str]:
+    """
+    Почему файлу артефакта нельзя доверять (None — можно).
+    Проверяются владелец и права файла и каталога (только POSIX).
+    """
+    if os.name != "posix":
+        return None
+    for item in (path, path.parent):
+        info = item.stat()
+        if info.st_uid not in (os.getuid(), 0):
+            return f"{item} принадлежит другому пользователю (uid {info.st_uid})"
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return f"{item} доступен на запись группе или всем ({stat.filemode(info.st_mode)})"
+    return None
+
+
+def code_hash() -> str:
+    """Хэш кода, от которого зависят планы: исходники матчера и нормализатора, версия Python (sre_parse)."""
+    global _code_hash
+    if _code_hash is None:
+        digest = hashlib.sha256(f"{ARTIFACT_FORMAT}:{sys.version_info[:2]}".encode())
+        for module in (moderation_matcher, text_normalizer):
+            digest.update(Path(module.__file__).read_bytes())
+        _code_hash = digest.hexdigest()
+    return _code_hash
+
+
+def vocabulary_hash(entries: Iterable[BlacklistEntry]) -> str:
+    """
+    Хэш словаря матчера.
+
+    :param entries: Записи в порядке сборки матчера
+    :return: sha256 в hex
+    """
+    digest = hashlib.sha256()
+    for entry in entries:
+        digest.update(f"{entry.source}\0{entry.key}\0{entry.pattern.pattern}\0{entry.pattern.flags}\n".encode())
+    return digest.hexdigest()
+
+
+def load_artifact(path: Optional[Path] = None) -> Tuple[Optional[str], Dict]:
+    """
+    Загружает планы записей из артефакта.
+
+    :param path: Путь к файлу (по умолчанию artifact_path())
+    :return: (хэш словаря, планы по записям); (None, {}) — файла нет, он поврежден или собран другим кодом
+    """
+    path = path or artifact_path()
+    if not path.exists():
+        return None, {}
+    reason = _untrusted_reason(path)
+    if reason:
+        logger.warning(f"⚠️ Артефакт матчера {path} не загружается: {reason}")
+        return None, {}
+    try:
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось прочитать артефакт матчера {path}: {e}")
+        return None, {}
+    if not isinstance(data, dict) or data.get("format") != ARTIFACT_FORMAT or data.get("code") != code_hash():
+        logger.info(f"🔧 Артефакт матчера {path} собран другой версией кода, будет пересобран")
+        return None, {}
+    return data.get("vocabulary"), data.get("plans") or {}
+
+
+def save_artifact(plans: Dict, vocabulary: str, path: Optional[Path] = None) -> bool:
+    """
+    Сохраняет планы записей (атомарно: временный файл и замена).
+
+    :param plans: BlacklistMatcher.plans
+    :param vocabulary: vocabulary_hash() записей матчера
+    :param path: Путь к файлу (по умолчанию artifact_path())
+    :return: True, если файл записан
+    """
+    path = path or artifact_path()
+    data = {"format": ARTIFACT_FORMAT, "code": code_hash(), "vocabulary": vocabulary, "plans": plans}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось сохранить артефакт матчера {path}: {e}")
+        return False
+    logger.info(f"💾 Артефакт матчера сохранен: {path} ({len(plans)} паттернов)")
+    return True
@@ -0,0 +1,1235 @@
+"""
+Скомпилированный матчер черного списка.
+
+Все паттерны (русские, английские и фразы из БД) собираются в индекс
+по первым символам совпадения. Текст просматривается один раз: в каждой
+позиции пробуются только те паттерны, которые могут начаться с текущих
+символов. Паттерны, для которых префикс вычислить не удалось, проверяются
+обычным search().
+
+Паттерны, которые сводятся к последовательности букв (классы вида [иi1l],
+повторы f+u+c+k+, \\s*), переводятся в канонический вид (см. text_normalizer)
+и ищутся по нормализованному тексту: замены букв, повторы и разделители
+уже убраны нормализацией, поэтому канонический паттерн — почти обычная строка.
+Остальные паттерны проверяются по исходному тексту как раньше.
+
+Короткие тексты сначала проверяются префильтром: если в них нет обязательных
+n-грамм ни одного паттерна, полный поиск не запускается.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+from app.application.services.regex_backends import RegexBackend
+from app.application.services.text_normalizer import CANONICAL_CHARS, fold_char, normalize_text
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+logger = logging.getLogger(__name__)
+
+# Источники паттернов
+SOURCE_RU = "ru"  # RUSSIAN_PROFANITY_PATTERNS
+SOURCE_EN = "en"  # ENGLISH_PROFANITY_PATTERNS
+SOURCE_DB = "db"  # Фразы из таблицы blacklist
+
+PREFIX_LENGTH = 2  # Длина префикса для индекса (биграммы)
+CANONICAL_PREFIX_LENGTH = 3  # Для канонических паттернов (не короче MIN_CANONICAL_LENGTH) — триграммы
+MAX_PREFIXES_PER_PATTERN = 4096  # Если вариантов больше — паттерн уходит в fallback
+# Минимальная длина канонического совпадения. Более короткие паттерны ("еб")
+# после свертки двойников и повторов дают слишком много случайных совпадений,
+# поэтому проверяются по исходному тексту.
+MIN_CANONICAL_LENGTH = 3
+
+# Рискованные паттерны (см. analyze_pattern) проверяются окнами такого размера
+# с перекрытием: один вызов re ограничен окном, а не всем текстом документа
+GUARDED_WINDOW_SIZE = 1000
+GUARDED_WINDOW_OVERLAP = 200  # Минимальное перекрытие окон
+# Неограниченные повторы рискованных паттернов (.*, [а-я]+) ограничиваются этой длиной
+# (bounded_pattern): у совпадения появляется максимальная длина, перекрытие окон
+# берется не меньше нее, и совпадение на стыке окон целиком попадает в одно из них
+GUARDED_MAX_REPEAT = 100
+DEFAULT_TIME_BUDGET = 0.1  # Бюджет времени на рискованные паттерны для одного текста, секунды
+
+# Сколько символов конца предыдущей части текста проверяется вместе со следующей
+# (IncrementalScanner): совпадения на стыке страниц короче этого находятся
+STREAM_OVERLAP = 256
+
+# Длины n-грамм префильтра (required_ngrams). Канонические паттерны не короче
+# MIN_CANONICAL_LENGTH, поэтому для них биграммы не нужны
+PREFILTER_NGRAM_LENGTHS = (4, 3, 2)
+CANONICAL_PREFILTER_NGRAM_LENGTHS = (4, 3)
+# Тексты длиннее (документы) почти всегда содержат n-граммы какого-нибудь паттерна —
+# префильтр для них только добавляет работу, они сразу идут в полный поиск
+PREFILTER_MAX_TEXT_LENGTH = 2000
+# Сколько самых редких групп обязательных n-грамм хранить на паттерн (все должны встретиться в тексте)
+PREFILTER_MAX_GROUPS = 4
+# Частота букв в русских и английских текстах, % — для оценки редкости n-грамм префильтра
+_CHAR_FREQUENCY: Dict[str, float] = {
+    **dict(zip("оеаинтсрвлкмдпуяыьгзбчйхжшюцщэфъё", (
+        10.97, 8.45, 8.01, 7.35, 6.70, 6.26, 5.47, 4.73, 4.54, 4.40, 3.49, 3.21, 2.98, 2.81, 2.62, 2.01, 1.90,
+        1.74, 1.70, 1.65, 1.59, 1.44, 1.21, 0.97, 0.94, 0.73, 0.64, 0.48, 0.36, 0.32, 0.26, 0.04, 0.04,
+    ))),
+    **dict(zip("etaoinshrdlcumwfgypbvkjxqz", (
+        12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8, 2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5,
+        1.0, 0.8, 0.15, 0.15, 0.1, 0.07,
+    ))),
+    " ": 15.0,
+}
+_DEFAULT_CHAR_FREQUENCY = 1.0  # Цифры, знаки препинания и прочие символы
+_WORD_START_FREQUENCY = 0.2  # Доля позиций текста, с которых начинается слово
+
+# Все пробельные символы, которые матчит \s (максимальный пробельный символ — U+3000)
+_SPACE_CHARS = frozenset(chr(code) for code in range(0x3001) if chr(code).isspace())
+_SPACE_RE = re.compile(r'\s')
+
+# Письменности для маршрутизации паттернов (text_scripts, required_scripts)
+SCRIPT_CYRILLIC = "cyrillic"
+SCRIPT_LATIN = "latin"
+ALL_SCRIPTS = frozenset((SCRIPT_CYRILLIC, SCRIPT_LATIN))
+# С IGNORECASE классы ловят и те символы, которые паттерны считают регистровыми
+# вариантами букв ('K' — знак Кельвина для k, 'ᲀ' для в), поэтому маршрутизация не теряет совпадений
+_CYRILLIC_RE = re.compile('[\u0400-\u04ff]', re.IGNORECASE)
+_LATIN_RE = re.compile('[a-z]', re.IGNORECASE)
+# В нормализованном тексте кириллические а, с, е, о, ... получаются и из латиницы и цифр
+# (CANONICAL_CHARS), поэтому письменность определяют только остальные буквы.
+# Канонические паттерны и нормализованный текст — в нижнем регистре, IGNORECASE не нужен
+_NEUTRAL_CANONICAL_CHARS = frozenset(CANONICAL_CHARS.values())
+_CANONICAL_CYRILLIC_RE = re.compile('[' + ''.join(
+    re.escape(chr(code)) for code in range(0x400, 0x500) if chr(code) not in _NEUTRAL_CANONICAL_CHARS
+) + ']')
+_CANONICAL_LATIN_RE = re.compile('[a-z]')
+
+
+@dataclass(frozen=True)
+class BlacklistEntry:
+    """Запись черного списка: ключ, источник и скомпилированный паттерн"""
+    key: str  # Слово/фраза, по которой паттерн показывается в логах
+    source: str  # SOURCE_RU, SOURCE_EN или SOURCE_DB
+    pattern: Pattern
+
+
+@dataclass(frozen=True)
+class BlacklistHit:
+    """Найденное нарушение: запись и диапазон совпадения в исходном тексте"""
+    entry: BlacklistEntry
+    start: int  # Начало совпадения в исходном тексте
+    end: int  # Конец совпадения (не включая)
+
+
+@dataclass
+class PatternStats:
+    """Счетчики одного паттерна черного списка"""
+    hits: int = 0  # Сколько проверенных текстов нарушили этот паттерн
+    calls: int = 0  # Сколько раз паттерн запускался (кандидаты из индекса, fallback, окна)
+    time: float = 0.0  # Суммарное время запусков паттерна, секунды
+
+
+class MatchStats:
+    """
+    Процессные счетчики проверки blacklist: срабатывания и время по каждому паттерну,
+    число и суммарное время проверок. Нужны, чтобы найти паттерны, которые никогда
+    не срабатывают или стоят слишком дорого.
+
+    Время паттерна — только его собственные вызовы re; общие шаги (нормализация,
+    поиск кандидатов по индексу) входят в общее время проверок.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Обнуляет счетчики."""
+        self.patterns: Dict[Tuple[str, str], PatternStats] = {}
+        self.checks = 0  # Проверенных текстов (включая ответы из кэша вердиктов)
+        self.violations = 0  # Текстов с нарушением
+        self.total_time = 0.0  # Суммарное время проверок, секунды
+        self.max_time = 0.0  # Самая долгая проверка, секунды
+        self.unchecked = 0  # Текстов без вердикта: исчерпан бюджет времени рискованных паттернов
+        self.since = time.time()  # Когда счетчики начали собираться (unix time)
+
+    def pattern(self, entry: "BlacklistEntry") -> PatternStats:
+        """Счетчики паттерна (создаются при первом обращении)."""
+        key = (entry.source, entry.key)
+        stats = self.patterns.get(key)
+        if stats is None:
+            stats = self.patterns[key] = PatternStats()
+        return stats
+
+    def record_call(self, entry: "BlacklistEntry", elapsed: float):
+        """Учитывает один запуск паттерна."""
+        stats = self.pattern(entry)
+        stats.calls += 1
+        stats.time += elapsed
+
+    def record_check(self, elapsed: float, hit: Optional["BlacklistHit"] = None, unchecked: bool = False):
+        """Учитывает одну проверку текста и ее результат (unchecked — проверка не завершена, см. CheckIncomplete)."""
+        self.checks += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if unchecked:
+            self.unchecked += 1
+        if hit is not None:
+            self.violations += 1
+            self.pattern(hit.entry).hits += 1
+
+
+@dataclass(frozen=True)
+class NgramGroup:
+    """Группа n-грамм префильтра: хотя бы одна из них обязательно есть в совпадении"""
+    grams: FrozenSet[str]  # n-граммы в нижнем регистре
+    at_boundary: bool = False  # n-грамма начинается на границе слова (\b перед узлом)
+
+
+class CheckIncomplete(Exception):
+    """
+    Бюджет времени исчерпан: рискованные паттерны проверены не по всему тексту.
+    Остальные паттерны к этому моменту проверены и не совпали, но вердикта нет —
+    вызывающий код должен учесть текст как непроверенный, а не как чистый.
+    """
+
+    def __init__(self, checked: int, length: int):
+        super().__init__(checked, length)
+        self.checked = checked  # До какой позиции текста проверены рискованные паттерны
+        self.length = length  # Длина текста
+
+    def __str__(self) -> str:
+        return f"рискованные паттерны проверены до позиции {self.checked} из {self.length}"
+
+
+class _NotIndexable(Exception):
+    """Префиксы паттерна невозможно (или слишком дорого) перечислить"""
+
+
+class _NotCanonical(Exception):
+    """Паттерн нельзя перевести в канонический вид"""
+
+
+def _class_chars(items) -> Set[str]:
+    """Раскрывает символьный класс [...] в множество символов."""
+    chars = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_constants.RANGE:
+            low, high = av
+            if high - low > 256:
+                raise _NotIndexable()
+            chars.update(chr(code) for code in range(low, high + 1))
+        elif op is sre_constants.CATEGORY and av is sre_constants.CATEGORY_SPACE:
+            chars.update(_SPACE_CHARS)
+        else:
+            raise _NotIndexable()
+    return chars
+
+
+def _prefixes(items: list, length: int) -> Set[str]:
+    """
+    Перечисляет все возможные префиксы заданной длины для разобранного паттерна.
+
+    :param items: Последовательность узлов sre_parse
+    :param length: Сколько символов префикса осталось перечислить
+    :return: Множество префиксов (в нижнем регистре)
+    """
+    if length == 0 or not items:
+        return {""}
+
+    op, av = items[0]
+    rest = items[1:]
+
+    if op is sre_constants.LITERAL:
+        chars = {chr(av)}
+    elif op is sre_constants.IN:
+        chars = _class_chars(av)
+    elif op is sre_constants.AT:
+        # \b, ^, $ не потребляют символов
+        return _prefixes(rest, length)
+    elif op is sre_constants.SUBPATTERN:
+        return _prefixes(list(av[-1]) + rest, length)
+    elif op is sre_constants.BRANCH:
+        result = set()
+        for branch in av[1]:
+            result |= _prefixes(list(branch) + rest, length)
+        return result
+    elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        min_count, max_count, sub = av
+        if max_count == 0:
+            return _prefixes(rest, length)
+        next_max = max_count if max_count is sre_constants.MAXREPEAT else max_count - 1
+        repeat_tail = (op, (max(min_count - 1, 0), next_max, sub))
+        result = _prefixes(list(sub) + [repeat_tail] + rest, length)
+        if min_count == 0:
+            result |= _prefixes(rest, length)
+        return result
+    else:
+        # ., [^...], группы с обратными ссылками и т.п. — слишком широкие
+        raise _NotIndexable()
+
+    tails = _prefixes(rest, length - 1)
+    result = {char.lower() + tail for char in chars for tail in tails}
+    if len(result) > MAX_PREFIXES_PER_PATTERN:
+        raise _NotIndexable()
+    return result
+
+
+def pattern_prefixes(pattern: Pattern, length: int = PREFIX_LENGTH) -> Optional[Set[str]]:
+    """
+    Возвращает множество префиксов, с которых может начинаться совпадение паттерна.
+
+    :param pattern: Скомпилированное регулярное выражение
+    :param length: Длина префикса
+    :return: Множество префиксов или None, если паттерн нельзя проиндексировать
+    """
+    try:
+        prefixes = _prefixes(list(sre_parse.parse(pattern.pattern, pattern.flags)), length)
+    except (_NotIndexable, RecursionError):
+        return None
+    # Совпадение короче префикса не попадет в индекс — такой паттерн индексировать нельзя
+    if not prefixes or any(len(prefix) < length for prefix in prefixes):
+        return None
+    return prefixes
+
+
+def required_ngrams(pattern: Pattern, lengths: Iterable[int] = PREFILTER_NGRAM_LENGTHS) -> Optional[Tuple[NgramGroup, ...]]:
+    """
+    Группы n-грамм, обязательные для любого совпадения паттерна.
+
+    Для каждого узла верхнего уровня перечисляются начала совпадения остатка
+    паттерна (как в pattern_prefixes): в совпадении обязательно есть хотя бы
+    одна n-грамма группы. Группы разных узлов обязательны одновременно, поэтому
+    для "пош[еє]л.*нах[ую][йи]" текст должен содержать и "пош", и "нах".
+    Если узлу предшествует \\b, n-грамма должна начинаться на границе слова.
+
+    :param pattern: Скомпилированное регулярное выражение
+    :param lengths: Длины n-грамм, из которых выбираются группы
+    :return: До PREFILTER_MAX_GROUPS самых редких групп (по частоте букв) или None, если их вычислить нельзя
+    """
+    try:
+        items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    except (re.error, RecursionError):
+        return None
+    groups: Set[NgramGroup] = set()
+    for start in range(len(items)):
+        at_boundary = items[start] == (sre_constants.AT, sre_constants.AT_BOUNDARY)
+        for length in lengths:
+            try:
+                grams = _prefixes(items[start:], length)
+            except (_NotIndexable, RecursionError):
+                continue
+            if grams and all(len(gram) == length for gram in grams):
+                groups.add(NgramGroup(frozenset(grams), at_boundary))
+    if not groups:
+        return None
+    # Самые редкие группы отсекают больше всего текстов: первой идет та, по которой ищутся кандидаты
+    ordered = sorted(groups, key=lambda group: (_group_frequency(group), sorted(group.grams)))
+    return tuple(ordered[:PREFILTER_MAX_GROUPS])
+
+
+def _group_frequency(group: NgramGroup) -> float:
+    """Оценка вероятности встретить n-грамму группы в случайной позиции текста."""
+    total = 0.0
+    for gram in group.grams:
+        frequency = 1.0
+        for char in gram:
+            frequency *= _CHAR_FREQUENCY.get(char, _DEFAULT_CHAR_FREQUENCY) / 100
+        total += frequency
+    return total * _WORD_START_FREQUENCY if group.at_boundary else total
+
+
+def _char_script(char: str, canonical: bool = False) -> Optional[str]:
+    if canonical and char in _NEUTRAL_CANONICAL_CHARS:
+        return None
+    if '\u0400' <= char <= '\u04ff':
+        return SCRIPT_CYRILLIC
+    if 'a' <= char <= 'z':
+        return SCRIPT_LATIN
+    return None
+
+
+def required_scripts(pattern: Pattern, canonical: bool = False) -> FrozenSet[str]:
+    """
+    Письменности, буквы которых есть в любом совпадении паттерна.
+
+    Для каждого узла верхнего уровня перечисляются символы, с которых может
+    начаться остаток паттерна: если все они кириллические, без кириллицы
+    в тексте паттерн совпасть не может. "[иi1l][дd]..." ничего не требует
+    (совпадает и с "idiot"), "fuck" после нормализации — латиницы.
+
+    :param pattern: Скомпилированное регулярное выражение
+    :param canonical: Канонический паттерн (буквы-двойники не определяют письменность, см. text_scripts)
+    :return: Подмножество ALL_SCRIPTS (пустое — паттерн проверяется на любом тексте)
+    """
+    try:
+        items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    except (re.error, RecursionError):
+        return frozenset()
+    scripts = set()
+    for start in range(len(items)):
+        try:
+            chars = _prefixes(items[start:], 1)
+        except (_NotIndexable, RecursionError):
+            continue
+        if not chars or "" in chars:
+            continue
+        found = {_char_script(char, canonical) for char in chars}
+        if len(found) == 1 and None not in found:
+            scripts |= found
+    return frozenset(scripts)
+
+
+def text_scripts(text: str, canonical: bool = False) -> FrozenSet[str]:
+    """
+    Письменности букв текста — по одному проходу re на письменность.
+
+    :param text: Текст (исходный или нормализованный)
+    :param canonical: Текст нормализован (normalize_text): "fuсk" с кириллической с — только латиница
+    :return: Подмножество ALL_SCRIPTS; смешанный текст — ALL_SCRIPTS
+    """
+    cyrillic, latin = (_CANONICAL_CYRILLIC_RE, _CANONICAL_LATIN_RE) if canonical else (_CYRILLIC_RE, _LATIN_RE)
+    if cyrillic.search(text):
+        return ALL_SCRIPTS if latin.search(text) else _CYRILLIC_ONLY
+    return _LATIN_ONLY if latin.search(text) else _NO_SCRIPTS
+
+
+_CYRILLIC_ONLY = frozenset((SCRIPT_CYRILLIC,))
+_LATIN_ONLY = frozenset((SCRIPT_LATIN,))
+_NO_SCRIPTS: FrozenSet[str] = frozenset()
+
+
+def _repeat_chars(items) -> Optional[Set[str]]:
+    """Символы, которые может съесть повтор одного символа/класса (None — любые)."""
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    if op is sre_constants.LITERAL:
+        return {chr(av).lower()}
+    if op is sre_constants.IN:
+        try:
+            return {char.lower() for char in _class_chars(av)}
+        except _NotIndexable:
+            return None
+    return None
+
+
+def _is_unbounded(op, av) -> bool:
+    return op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[1] is sre_constants.MAXREPEAT
+
+
+def _analyze(items: list, inside_repeat: bool, reasons: Set[str]):
+    """Рекурсивно обходит паттерн и собирает причины риска в reasons."""
+    items = list(items)
+    for position, (op, av) in enumerate(items):
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            sub = list(av[2])
+            unbounded = av[1] is sre_constants.MAXREPEAT
+            if unbounded and inside_repeat:
+                reasons.add("вложенные неограниченные повторы (экспоненциальный перебор)")
+            chars = _repeat_chars(sub)
+            rest = [item for item in items[position + 1:] if item[0] is not sre_constants.AT]
+            if unbounded and chars is None and rest:
+                reasons.add("неограниченный повтор широкого класса (.*) в середине паттерна (квадратичный поиск)")
+            if unbounded and rest and _is_unbounded(*rest[0]):
+                next_chars = _repeat_chars(list(rest[0][1][2]))
+                if chars is None or next_chars is None or chars & next_chars:
+                    reasons.add("соседние неограниченные повторы с общими символами (полиномиальный перебор)")
+            _analyze(sub, inside_repeat or unbounded, reasons)
+        elif op is sre_constants.SUBPATTERN:
+            _analyze(av[-1], inside_repeat, reasons)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                _analyze(branch, inside_repeat, reasons)
+
+
+def analyze_pattern(pattern: Pattern) -> List[str]:
+    """
+    Ищет в паттерне конструкции, на которых re может уйти в долгий перебор
+    (catastrophic backtracking) на длинных текстах из PDF и документов.
+
+    :param pattern: Скомпилированное регулярное выражение
+    :return: Список причин риска (пустой — паттерн безопасен)
+    """
+    reasons: Set[str] = set()
+    try:
+        items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+        if items and _is_unbounded(*items[0]) and len(items) > 1:
+            # x+y: на серии "xxxx..." поиск пробует каждую позицию до конца серии
+            reasons.add("неограниченный повтор в начале паттерна (квадратичный поиск)")
+        _analyze(items, False, reasons)
+    except RecursionError:
+        reasons.add("слишком глубокая вложенность")
+    return sorted(reasons)
+
+
+_OPEN_REPEAT_RE = re.compile(r'\{(\d*),\}')
+_BOUNDED_REPEAT_RE = re.compile(r'\{\d*(?:,\d*)?\}')
+
+
+def _class_end(source: str, start: int) -> int:
+    """Позиция после символьного класса [...], который начинается в start."""
+    position = start + 1
+    if source.startswith('^', position):
+        position += 1
+    if source.startswith(']', position):
+        position += 1  # ']' сразу после '[' или '[^' — обычный символ
+    while position < len(source) and source[position] != ']':
+        position += 2 if source[position] == '\\' else 1
+    return position + 1
+
+
+def bounded_pattern(pattern: Pattern, limit: int = GUARDED_MAX_REPEAT) -> Pattern:
+    """
+    Ограничивает неограниченные повторы паттерна: * → {0,limit}, + → {1,limit},
+    {m,} → {m,limit}. Ленивые и захватывающие модификаторы (*?, ++) сохраняются.
+    У совпадения появляется максимальная длина (pattern_max_width), и рискованный
+    паттерн можно проверять окнами без потерь на стыке: "пош[еє]л.*нах[ую][йи]"
+    находит "нахуй" не дальше limit символов после "пошел".
+
+    :param pattern: Скомпилированное регулярное выражение
+    :param limit: Максимум повторов
+    :return: Новый паттерн с теми же флагами (исходный, если переписать не удалось)
+    """
+    source = pattern.pattern
+    if not isinstance(source, str):
+        return pattern
+    parts = []
+    position = 0
+    after_quantifier = False  # За квантификатором '?' и '+' — модификаторы, а не повторы
+    while position < len(source):
+        char = source[position]
+        if char == '\\':
+            parts.append(source[position:position + 2])
+            position += 2
+            after_quantifier = False
+            continue
+        if char == '[':
+            end = _class_end(source, position)
+            parts.append(source[position:end])
+            position = end
+            after_quantifier = False
+            continue
+        if char == '(' and source.startswith('?', position + 1):
+            parts.append('(?')  # Начало (?:...), (?P<...>), (?=...) — не квантификатор
+            position += 2
+            after_quantifier = False
+            continue
+        if after_quantifier:
+            after_quantifier = False
+            if char in '?+':
+                parts.append(char)
+                position += 1
+                continue
+        if char in '*+':
+            parts.append(f"{{{0 if char == '*' else 1},{limit}}}")
+            position += 1
+            after_quantifier = True
+            continue
+        if char == '{':
+            open_repeat = _OPEN_REPEAT_RE.match(source, position)
+            if open_repeat:
+                low = int(open_repeat.group(1) or 0)
+                parts.append(f"{{{low},{max(low, limit)}}}")
+                position = open_repeat.end()
+                after_quantifier = True
+                continue
+            bounded_repeat = _BOUNDED_REPEAT_RE.match(source, position)
+            if bounded_repeat:
+                parts.append(bounded_repeat.group())
+                position = bounded_repeat.end()
+                after_quantifier = True
+                continue
+        parts.append(char)
+        position += 1
+        after_quantifier = char == '?'
+    try:
+        return re.compile(''.join(parts), pattern.flags)
+    except re.error:
+        return pattern
+
+
+def pattern_max_width(pattern: Pattern) -> Optional[int]:
+    """Максимальная длина совпадения паттерна (None — не ограничена или не вычисляется)."""
+    try:
+        width = sre_parse.parse(pattern.pattern, pattern.flags).getwidth()[1]
+    except (re.error, RecursionError):
+        return None
+    return width if width < sre_constants.MAXREPEAT else None
+
+
+def _canonical_chars(op, av) -> FrozenSet[str]:
+    """Канонические варианты одного символа или символьного класса."""
+    if op is sre_constants.LITERAL:
+        return frozenset({fold_char(chr(av))})
+    if op is sre_constants.IN:
+        try:
+            chars = _class_chars(av)
+        except _NotIndexable:
+            raise _NotCanonical()
+        return frozenset(fold_char(char) for char in chars)
+    raise _NotCanonical()
+
+
+@dataclass(frozen=True)
+class _CanonicalPart:
+    """Одна позиция канонического паттерна"""
+    options: FrozenSet[str]  # Варианты строк; "" — позиция необязательна
+    repeat: bool = False  # Повтор символьного класса ([а-яё]*)
+
+
+def _canonical_parts(items: list) -> Tuple[bool, List[_CanonicalPart], bool]:
+    """
+    Переводит последовательность узлов sre_parse в список позиций канонического паттерна.
+
+    :param items: Последовательность узлов (одна ветка паттерна)
+    :return: (граница слова в начале, позиции паттерна, граница в конце)
+    """
+    leading = trailing = False
+    if items and items[0] == (sre_constants.AT, sre_constants.AT_BOUNDARY):
+        leading = True
+        items = items[1:]
+    if items and items[-1] == (sre_constants.AT, sre_constants.AT_BOUNDARY):
+        trailing = True
+        items = items[:-1]
+
+    parts: List[_CanonicalPart] = []
+    for position, (op, av) in enumerate(items):
+        if op in (sre_constants.LITERAL, sre_constants.IN):
+            parts.append(_CanonicalPart(_canonical_chars(op, av)))
+            continue
+        if op not in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            raise _NotCanonical()
+        min_count, max_count, sub = av
+        if len(sub) != 1:
+            raise _NotCanonical()
+        if max_count == 0:
+            continue
+        chars = _canonical_chars(*sub[0])
+        if min_count > 1:
+            # o{2,} — двойная буква, нормализация ее схлопнет (см. ниже)
+            raise _NotCanonical()
+        options = chars | {""} if min_count == 0 else chars
+        if (len(chars) == 1 and len(next(iter(chars))) <= 1) or max_count == 1:
+            # Повтор одного символа нормализация схлопывает: x+ → x, x* → x?
+            parts.append(_CanonicalPart(options))
+        elif position == len(items) - 1 and not trailing:
+            # Хвост [окун]* в конце паттерна не влияет на факт совпадения
+            if min_count > 0:
+                parts.append(_CanonicalPart(chars))
+        elif all(len(char) == 1 for char in chars - {""}):
+            parts.append(_CanonicalPart(options, repeat=True))
+        else:
+            raise _NotCanonical()
+
+    # Двойные буквы нормализация схлопывает, и паттерн "ссанина" начал бы
+    # ловить фамилию "Санина" — такие паттерны остаются регулярными выражениями
+    for previous, part in zip(parts, parts[1:]):
+        if part == previous and not part.repeat and len(part.options) == 1 and len(next(iter(part.options))) == 1:
+            raise _NotCanonical()
+    # Если соседние позиции могут дать одинаковые буквы ([уy][йy] → у, [иу]),
+    # в тексте они схлопнутся в одну — вторая позиция становится необязательной
+    for index in range(1, len(parts)):
+        if (parts[index - 1].options - {""}) & (parts[index].options - {""}):
+            parts[index] = _CanonicalPart(parts[index].options | {""}, parts[index].repeat)
+    return leading, parts, trailing
+
+
+def _part_regex(part: _CanonicalPart) -> str:
+    """Регулярное выражение для одной позиции канонического паттерна."""
+    options = sorted((option for option in part.options if option), key=lambda option: (-len(option), option))
+    optional = "?" if "" in part.options else ""
+    if not options:
+        return ""
+    if part.repeat:
+        return "[" + "".join(re.escape(option) for option in options) + "]" + ("*" if optional else "+")
+    if len(options) == 1 and len(options[0]) == 1:
+        return re.escape(options[0]) + optional
+    if all(len(option) == 1 for option in options):
+        return "[" + "".join(re.escape(option) for option in options) + "]" + optional
+    return "(?:" + "|".join(re.escape(option) for option in options) + ")" + optional
+
+
+def canonical_pattern(pattern: Pattern) -> Optional[Pattern]:
+    """
+    Переводит паттерн в канонический вид для поиска по нормализованному тексту.
+
+    :param pattern: Скомпилированное регулярное выражение (по исходному тексту)
+    :return: Паттерн по нормализованному тексту или None, если перевести нельзя
+    """
+    try:
+        items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+        if len(items) == 1 and items[0][0] is sre_constants.BRANCH:
+            branches = [list(branch) for branch in items[0][1][1]]
+        else:
+            branches = [items]
+
+        alternatives = []
+        for branch in branches:
+            leading, parts, trailing = _canonical_parts(branch)
+            min_length = sum(min(len(option) for option in part.options) for part in parts)
+            if min_length < MIN_CANONICAL_LENGTH:
+                raise _NotCanonical()
+            alternatives.append(
+                (r"\b" if leading else "") + "".join(_part_regex(part) for part in parts) + (r"\b" if trailing else "")
+            )
+    except (_NotCanonical, re.error, RecursionError):
+        return None
+    return re.compile("|".join(alternatives))
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Собирает регулярное выражение, совпадающее с любой строкой из набора.
+    Общие начала строк выносятся в дерево, чтобы движок не перебирал все варианты подряд.
+    Строка, которая является началом другой ("хуи" и "хуил"), остается в выражении:
+    продолжение после нее необязательное.
+    """
+    groups: Dict[str, Set[str]] = {}
+    for word in words:
+        groups.setdefault(word[0], set()).add(word[1:])
+    branches = []
+    for char in sorted(groups):
+        tails = groups[char]
+        rest = tails - {""}
+        tail = _trie_regex(rest) if rest else ""
+        if tail and "" in tails:
+            tail = f"(?:{tail})?"
+        elif "|" in tail:
+            tail = f"(?:{tail})"
+        branches.append(re.escape(char) + tail)
+    return "|".join(branches)
+
+
+TIER_CANONICAL = "canonical"  # Канонический паттерн по нормализованному тексту
+TIER_ORIGINAL = "original"  # Исходный паттерн по исходному тексту
+TIER_GUARDED = "guarded"  # Рискованный паттерн: окна и бюджет времени
+
+
+@dataclass(frozen=True)
+class _EntryPlan:
+    """Как проверяется запись: уровень матчера, паттерн и префиксы для индекса"""
+    tier: str  # TIER_CANONICAL, TIER_ORIGINAL или TIER_GUARDED
+    pattern: Pattern  # Паттерн, который запускается на своем уровне
+    prefixes: Optional[FrozenSet[str]] = None  # Префиксы для индекса (None — проверяется search())
+    reasons: Tuple[str, ...] = ()  # Причины риска (analyze_pattern) для TIER_GUARDED
+    ngrams: Optional[Tuple[NgramGroup, ...]] = None  # Обязательные n-граммы для префильтра (None — не вычислены)
+    scripts: FrozenSet[str] = frozenset()  # Письменности, без которых паттерн не совпадет (required_scripts)
+
+
+def _plan_entry(entry: BlacklistEntry) -> _EntryPlan:
+    """
+    Разбор записи для матчера — самая дорогая часть сборки (перевод в канонический
+    вид, анализ риска, перебор префиксов), поэтому планы переиспользуются
+    при пересборке матчера с изменениями (BlacklistMatcher.with_changes).
+    """
+    pattern = canonical_pattern(entry.pattern)
+    if pattern is not None and not analyze_pattern(pattern):
+        prefixes = pattern_prefixes(pattern, CANONICAL_PREFIX_LENGTH)
+        return _EntryPlan(
+            TIER_CANONICAL, pattern, _frozen(prefixes),
+            ngrams=required_ngrams(pattern, CANONICAL_PREFILTER_NGRAM_LENGTHS),
+            scripts=required_scripts(pattern, canonical=True),
+        )
+    ngrams = required_ngrams(entry.pattern)
+    scripts = required_scripts(entry.pattern)
+    reasons = analyze_pattern(entry.pattern)
+    if reasons:
+        return _EntryPlan(
+            TIER_GUARDED, bounded_pattern(entry.pattern), reasons=tuple(reasons), ngrams=ngrams, scripts=scripts
+        )
+    prefixes = pattern_prefixes(entry.pattern, PREFIX_LENGTH)
+    return _EntryPlan(TIER_ORIGINAL, entry.pattern, _frozen(prefixes), ngrams=ngrams, scripts=scripts)
+
+
+def _frozen(items: Optional[Set[str]]) -> Optional[FrozenSet[str]]:
+    return frozenset(items) if items is not None else None
+
+
+class _Prefilter:
+    """
+    Префильтр уровня матчера по обязательным n-граммам паттернов (required_ngrams).
+
+    Регулярное выражение из самых редких групп всех паттернов (на C) ищет
+    позиции-кандидаты; для паттернов, чья редкая группа там встретилась,
+    проверяются остальные их группы (подстроки в тексте). Ложных отсевов нет:
+    группы — необходимое условие совпадения.
+    """
+
+    def __init__(self, requirements: Iterable[Tuple[NgramGroup, ...]]):
+        self._requirements: List[Tuple[NgramGroup, ...]] = list(requirements)
+        owners: Dict[Tuple[bool, str], List[int]] = {}
+        for number, groups in enumerate(self._requirements):
+            for gram in groups[0].grams:
+                owners.setdefault((groups[0].at_boundary, gram), []).append(number)
+        self._owners: Dict[Tuple[bool, str], Tuple[int, ...]] = {
+            key: tuple(numbers) for key, numbers in owners.items()
+        }
+        # Отдельные выражения для n-грамм с границей слова и без: общее выражение
+        # из двух ветвей движок re не умеет быстро пропускать по первому символу
+        self._scanners: List[Tuple[Pattern, bool]] = []
+        for at_boundary in (False, True):
+            grams = {gram for boundary, gram in self._owners if boundary is at_boundary}
+            if grams:
+                regex = _trie_regex(grams)
+                self._scanners.append((re.compile(f"\\b(?:{regex})" if at_boundary else regex), at_boundary))
+        self._lengths: Tuple[int, ...] = tuple(sorted({len(gram) for _, gram in self._owners}))
+
+    @classmethod
+    def build(cls, plans: Iterable[_EntryPlan]) -> Optional["_Prefilter"]:
+        """None — у какого-то паттерна n-граммы неизвестны (фильтровать нельзя) или паттернов нет."""
+        requirements = []
+        for plan in plans:
+            if plan.ngrams is None:
+                return None
+            requirements.append(plan.ngrams)
+        return cls(requirements) if requirements else None
+
+    def may_match(self, text: str) -> bool:
+        """
+        :param text: Текст в том же виде, в котором его проверяют паттерны уровня (в нижнем регистре)
+        :return: False — ни один паттерн уровня в тексте совпасть не может
+        """
+        owners = self._owners
+        requirements = self._requirements
+        checked: Set[int] = set()
+        for scanner, at_boundary in self._scanners:
+            found = scanner.search(text)
+            while found is not None:
+                position = found.start()
+                # В одной позиции могут начинаться n-граммы разной длины
+                for length in self._lengths:
+                    for number in owners.get((at_boundary, text[position:position + length]), ()):
+                        if number in checked:
+                            continue
+                        checked.add(number)
+                        # Остальные группы проверяются без учета границы слова — это только ослабляет фильтр
+                        if all(any(part in text for part in group.grams) for group in requirements[number][1:]):
+                            return True
+                found = scanner.search(text, position + 1)
+        return False
+
+
+class _PrefixIndex:
+    """Индекс паттернов по префиксам начала совпадения (см. pattern_prefixes)"""
+
+    def __init__(
+        self,
+        items: Iterable[Tuple[BlacklistEntry, Pattern, Optional[FrozenSet[str]]]],
+        length: int = PREFIX_LENGTH
+    ):
+        index: Dict[str, List[Tuple[BlacklistEntry, Pattern]]] = {}
+        fallback: List[Tuple[BlacklistEntry, Pattern]] = []
+
+        self.items: Tuple[Tuple[BlacklistEntry, Pattern], ...] = tuple(
+            (entry, pattern) for entry, pattern, _ in items
+        )
+        for entry, pattern, prefixes in items:
+            if prefixes is None:
+                fallback.append((entry, pattern))
+                continue
+            for prefix in prefixes:
+                index.setdefault(prefix, []).append((entry, pattern))
+
+        self._index: Dict[str, Tuple[Tuple[BlacklistEntry, Pattern], ...]] = {
+            prefix: tuple(candidates) for prefix, candidates in index.items()
+        }
+        self.fallback: Tuple[Tuple[BlacklistEntry, Pattern], ...] = tuple(fallback)
+        self.length = length
+        # Позиции, с которых начинается хотя бы один префикс, ищет движок re (на C),
+        # а не цикл по каждому символу текста
+        self._scanner: Optional[Pattern] = (
+            re.compile(f"(?=(?:{_trie_regex(self._index)}))") if self._index else None
+        )
+
+    def search(
+        self, text: str, lowered: str, stats: Optional[MatchStats] = None
+    ) -> Optional[Tuple[BlacklistEntry, re.Match]]:
+        """
+        Ищет первое совпадение.
+
+        :param text: Текст, по которому работают паттерны
+        :param lowered: Тот же текст в нижнем регистре (той же длины) — по нему идет поиск в индексе
+        :param stats: Счетчики, в которые записывается время каждого паттерна (опционально)
+        :return: (запись, совпадение) или None
+        """
+        for entry, pattern in self.fallback:
+            if stats is None:
+                match = pattern.search(text)
+            else:
+                started = time.perf_counter()
+                match = pattern.search(text)
+                stats.record_call(entry, time.perf_counter() - started)
+            if match:
+                return entry, match
+
+        if self._scanner is None:
+            return None
+        get_candidates = self._index.__getitem__
+        length = self.length
+        for found in self._scanner.finditer(lowered):
+            position = found.start()
+            for entry, pattern in get_candidates(lowered[position:position + length]):
+                if stats is None:
+                    match = pattern.match(text, position)
+                else:
+                    started = time.perf_counter()
+                    match = pattern.match(text, position)
+                    stats.record_call(entry, time.perf_counter() - started)
+                if match:
+                    return entry, match
+        return None
+
+
+class _Tier:
+    """Уровень матчера для текстов одного набора письменностей: индекс, префильтр, рискованные паттерны"""
+
+    def __init__(
+        self,
+        items: List[Tuple[BlacklistEntry, Pattern, _EntryPlan]],
+        length: int,
+        use_prefilter: bool
+    ):
+        self.size = len(items)
+        self.index = _PrefixIndex(
+            [(entry, pattern, plan.prefixes) for entry, pattern, plan in items if plan.tier != TIER_GUARDED], length
+        )
+        self.guarded: Tuple[Tuple[BlacklistEntry, Pattern], ...] = tuple(
+            (entry, pattern) for entry, pattern, plan in items if plan.tier == TIER_GUARDED
+        )
+        # Перекрытие окон — не меньше самого длинного совпадения рискованных паттернов
+        # (повторы ограничены bounded_pattern; если длину вычислить не удалось — GUARDED_WINDOW_OVERLAP)
+        self.guarded_overlap = max(
+            [GUARDED_WINDOW_OVERLAP] + [
+                pattern_max_width(plan.pattern) or GUARDED_WINDOW_OVERLAP
+                for _, _, plan in items if plan.tier == TIER_GUARDED
+            ]
+        )
+        self.prefilter: Optional[_Prefilter] = (
+            _Prefilter.build(plan for _, _, plan in items) if use_prefilter else None
+        )
+
+
+class BlacklistMatcher:
+    """
+    Однопроходный матчер по набору паттернов черного списка.
+
+    Сначала текст нормализуется (normalize_text) и проверяется каноническими
+    паттернами, затем исходный текст проверяется паттернами, которые
+    перевести в канонический вид не удалось. Внутри каждой группы
+    возвращается совпадение, найденное раньше всех по позиции в тексте.
+
+    Рискованные паттерны (analyze_pattern) проверяются последними, окнами
+    ограниченного размера и в пределах бюджета времени на текст: враждебный
+    текст не может занять event loop на секунды.
+
+    Перед каждым уровнем короткий текст проходит префильтр по обязательным
+    n-граммам паттернов (required_ngrams): чистые комментарии отсекаются
+    без запуска самих паттернов (use_prefilter=False — для сравнения в бенчмарке).
+
+    Паттерны, которым нужны буквы определенной письменности (required_scripts),
+    не участвуют в проверке текстов без этих букв: кириллическому тексту не нужны
+    английские паттерны, и наоборот. Смешанный текст (частая обфускация)
+    проверяется всеми паттернами (use_routing=False — всегда всеми).
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[BlacklistEntry],
+        time_budget: float = DEFAULT_TIME_BUDGET,
+        stats: Optional[MatchStats] = None,
+        plans: Optional[Dict[BlacklistEntry, _EntryPlan]] = None,
+        use_prefilter: bool = True,
+        backend: Optional[RegexBackend] = None,
+        use_routing: bool = True
+    ):
+        self.entries: Tuple[BlacklistEntry, ...] = tuple(entries)
+        self.time_budget = time_budget
+        self.stats = stats  # Счетчики времени паттернов (переживают пересборку матчера)
+        # Движок, которым запускаются паттерны уровней (разбор и индекс всегда на re)
+        self.backend = backend or RegexBackend()
+        self._by_key: Dict[Tuple[str, str], BlacklistEntry] = {
+            (entry.source, entry.key): entry for entry in self.entries
+        }
+        self._plans: Dict[BlacklistEntry, _EntryPlan] = {}
+        canonical: List[Tuple[BlacklistEntry, Pattern, _EntryPlan]] = []
+        original: List[Tuple[BlacklistEntry, Pattern, _EntryPlan]] = []
+
+        for entry in self.entries:
+            plan = plans.get(entry) if plans else None
+            if plan is None:
+                plan = _plan_entry(entry)
+                if plan.tier == TIER_GUARDED:
+                    logger.warning(
+                        f"⚠️ Рискованный паттерн blacklist '{entry.key}' ({entry.pattern.pattern}): "
+                        f"{'; '.join(plan.reasons)}. Проверяется как {plan.pattern.pattern} "
+                        f"окнами по {GUARDED_WINDOW_SIZE} символов с бюджетом времени"
+                    )
+            self._plans[entry] = plan
+            pattern = self.backend.compile(plan.pattern)
+            if plan.tier == TIER_CANONICAL:
+                canonical.append((entry, pattern, plan))
+            else:
+                original.append((entry, pattern, plan))
+
+        # Префильтры: чистый текст отсекается одним проходом re по нормализованному
+        # (канонические паттерны) и по исходному в нижнем регистре (остальные) тексту
+        self.use_prefilter = use_prefilter
+        self.use_routing = use_routing
+        self._items: Dict[str, List[Tuple[BlacklistEntry, Pattern, _EntryPlan]]] = {
+            TIER_CANONICAL: canonical, TIER_ORIGINAL: original,
+        }
+        # Уровни для текстов с разным набором письменностей; полный набор — для смешанных
+        self._routes: Dict[Tuple[str, FrozenSet[str]], _Tier] = {}
+        self._canonical = self._route(TIER_CANONICAL, ALL_SCRIPTS)
+        self._original = self._route(TIER_ORIGINAL, ALL_SCRIPTS)
+
+        logger.debug(
+            f"BlacklistMatcher: {len(canonical)} канонических паттернов, "
+            f"{len(self._original.index.items)} по исходному тексту, {len(self._original.guarded)} рискованных"
+        )
+        fallback = self._canonical.index.fallback + self._original.index.fallback
+        if fallback:
+            logger.debug(
+                f"BlacklistMatcher: {len(fallback)} паттернов без индекса: "
+                f"{', '.join(entry.key for entry, _ in fallback)}"
+            )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _route(self, tier: str, scripts: FrozenSet[str]) -> _Tier:
+        """
+        Уровень с паттернами, которые могут совпасть в тексте с такими письменностями
+        (собирается при первом обращении и кэшируется).
+        """
+        route = self._routes.get((tier, scripts))
+        if route is None:
+            items = self._items[tier]
+            selected = [item for item in items if item[2].scripts <= scripts]
+            if len(selected) == len(items) and scripts != ALL_SCRIPTS:
+                route = self._route(tier, ALL_SCRIPTS)
+            else:
+                length = CANONICAL_PREFIX_LENGTH if tier == TIER_CANONICAL else PREFIX_LENGTH
+                route = _Tier(selected, length, self.use_prefilter)
+            self._routes[(tier, scripts)] = route
+        return route
+
+    def _canonical_tier(self, normalized: str) -> _Tier:
+        """Канонические паттерны для нормализованного текста."""
+        if not self.use_routing:
+            return self._canonical
+        return self._route(TIER_CANONICAL, text_scripts(normalized, canonical=True))
+
+    def _original_tier(self, text: str) -> _Tier:
+        """Паттерны по исходному тексту (вместе с рискованными)."""
+        if not self.use_routing:
+            return self._original
+        return self._route(TIER_ORIGINAL, text_scripts(text))
+
+    def routed_size(self, text: str) -> int:
+        """Сколько паттернов проверяется на этом тексте после маршрутизации по письменностям."""
+        return self._canonical_tier(normalize_text(text).text).size + self._original_tier(text).size
+
+    def may_match(self, text: str) -> bool:
+        """
+        Вердикт префильтра: False — ни один паттерн в тексте совпасть не может.
+        True не означает нарушение (ложные срабатывания префильтра проверяет search()).
+        """
+        if not text:
+            return False
+        if len(text) > PREFILTER_MAX_TEXT_LENGTH:
+            return True
+        normalized = normalize_text(text).text
+        canonical = self._canonical_tier(normalized)
+        if canonical.size and (canonical.prefilter is None or canonical.prefilter.may_match(normalized)):
+            return True
+        original = self._original_tier(text)
+        return bool(original.size) and (original.prefilter is None or original.prefilter.may_match(text.lower()))
+
+    def get_entry(self, source: str, key: str) -> Optional[BlacklistEntry]:
+        """Запись по источнику и ключу (None, если такой нет)."""
+        return self._by_key.get((source, key))
+
+    def with_changes(
+        self,
+        added: Iterable[BlacklistEntry] = (),
+        removed: Iterable[Tuple[str, str]] = ()
+    ) -> "BlacklistMatcher":
+        """
+        Новый матчер с добавленными и удаленными записями. Разбор оставшихся записей
+        переиспользуется, заново разбираются только добавленные — пересборка после
+        изменения одной фразы занимает миллисекунды, а не секунды.
+
+        :param added: Новые записи (добавляются в конец)
+        :param removed: (source, key) удаляемых записей
+        :return: Новый BlacklistMatcher (текущий не меняется)
+        """
+        removed = set(removed)
+        entries = [entry for entry in self.entries if (entry.source, entry.key) not in removed]
+        present = {(entry.source, entry.key) for entry in entries}
+        for entry in added:
+            if (entry.source, entry.key) not in present:
+                entries.append(entry)
+                present.add((entry.source, entry.key))
+        return BlacklistMatcher(
+            entries, time_budget=self.time_budget, stats=self.stats, plans=self._plans,
+            use_prefilter=self.use_prefilter, backend=self.backend, use_routing=self.use_routing,
+        )
+
+    def scanner(self) -> "IncrementalScanner":
+        """Создает IncrementalScanner для проверки текста, поступающего частями."""
+        return IncrementalScanner(self)
+
+    @property
+    def plans(self) -> Dict[BlacklistEntry, _EntryPlan]:
+        """Результат разбора записей (сохраняется в артефакт, см. moderation_artifact)."""
+        return self._plans
+
+    @property
+    def guarded_entries(self) -> Tuple[BlacklistEntry, ...]:
+        """Паттерны, которые проверяются окнами с бюджетом времени."""
+        return tuple(entry for entry, _ in self._original.guarded)
+
+    @property
+    def guarded_overlap(self) -> int:
+        """Перекрытие окон рискованных паттернов (не меньше самого длинного их совпадения)."""
+        return self._original.guarded_overlap
+
+    def search(self, text: str) -> Optional[BlacklistHit]:
+        """
+        Ищет первое нарушение в тексте.
+
+        :param text: Текст для проверки
+        :return: Найденное нарушение (с диапазоном в исходном тексте) или None
+        :raises CheckIncomplete: Бюджет времени исчерпан до конца проверки рискованных паттернов
+        """
+        if not text:
+            return None
+        started = time.monotonic()
+
+        filtered = len(text) <= PREFILTER_MAX_TEXT_LENGTH
+        normalized = normalize_text(text).text
+        canonical = self._canonical_tier(normalized)
+        if not filtered or canonical.prefilter is None or canonical.prefilter.may_match(normalized):
+            found = canonical.index.search(normalized, normalized, self.stats)
+            if found:
+                entry, match = found
+                # Карта позиций нужна только для найденного нарушения — строим ее повторно
+                start, end = normalize_text(text, with_offsets=True).original_span(match.start(), match.end())
+                return BlacklistHit(entry=entry, start=start, end=end)
+
+        lowered = text.lower()
+        original = self._original_tier(text)
+        if filtered and original.prefilter is not None and not original.prefilter.may_match(lowered):
+            return None
+        if len(lowered) != len(text):
+            # Редкие символы, меняющие длину при lower() (например, 'İ') — смещения
+            # индекса разъедутся с исходным текстом, поэтому проверяем по старинке
+            for entry, pattern in original.index.items:
+                call_started = time.perf_counter()
+                match = pattern.search(text)
+                if self.stats is not None:
+                    self.stats.record_call(entry, time.perf_counter() - call_started)
+                if match:
+                    return BlacklistHit(entry=entry, start=match.start(), end=match.end())
+        else:
+            found = original.index.search(text, lowered, self.stats)
+            if found:
+                entry, match = found
+                return BlacklistHit(entry=entry, start=match.start(), end=match.end())
+
+        if original.guarded:
+            return self._search_guarded(text, original, started + self.time_budget)
+        return None
+
+    def _search_guarded(self, text: str, tier: _Tier, deadline: float) -> Optional[BlacklistHit]:
+        """
+        Проверяет рискованные паттерны окнами с перекрытием tier.guarded_overlap:
+        любое совпадение целиком помещается в одно из окон. Время одного вызова re
+        ограничено размером окна. Если бюджет исчерпан, проверка прерывается
+        исключением CheckIncomplete (остальные паттерны к этому моменту уже проверены).
+        """
+        overlap = tier.guarded_overlap
+        size = max(GUARDED_WINDOW_SIZE, 2 * overlap)
+        for window_start in range(0, max(len(text) - overlap, 1), size - overlap):
+            window_end = min(window_start + size, len(text))
+            for entry, pattern in tier.guarded:
+                if time.monotonic() > deadline:
+                    raise CheckIncomplete(window_start, len(text))
+                call_started = time.perf_counter()
+                match = pattern.search(text, window_start, window_end)
+                if self.stats is not None:
+                    self.stats.record_call(entry, time.perf_counter() - call_started)
+                if match:
+                    return BlacklistHit(entry=entry, start=match.start(), end=match.end())
+        return None
+
+
+class IncrementalScanner:
+    """
+    Проверка текста, который поступает частями (страницы PDF, абзацы, слайды).
+
+    Каждая часть проверяется вместе с хвостом предыдущих (STREAM_OVERLAP символов),
+    поэтому нарушение, разрезанное границей страницы, тоже находится. Хвост
+    начинается с границы слова: обрезанное слово ("...корабля") не дает ложного
+    совпадения по \\b в начале окна. Диапазон найденного нарушения — в координатах
+    всего потока (сумма переданных частей).
+
+    После первого нарушения следующие части не проверяются: вызывающий код
+    должен прекратить скачивание и разбор. Если на какой-то части исчерпан бюджет
+    времени (CheckIncomplete), это пишется в лог и в счетчики, а unchecked
+    становится True: отсутствие нарушения в таком потоке не гарантировано.
+    """
+
+    def __init__(self, matcher: BlacklistMatcher):
+        self._matcher = matcher
+        # Хвост не короче самого длинного совпадения рискованных паттернов
+        self._overlap = max(STREAM_OVERLAP, matcher.guarded_overlap)
+        self._tail = ""
+        self._tail_start = 0  # Позиция хвоста в потоке
+        self.consumed = 0  # Сколько символов потока передано в feed()
+        self.hit: Optional[BlacklistHit] = None
+        self.fragment = ""  # Совпавший фрагмент текста
+        self.unchecked = False  # Была ли часть, проверенная не полностью
+
+    def feed(self, chunk: str) -> Optional[BlacklistHit]:
+        """
+        Проверяет очередную часть текста.
+
+        :param chunk: Часть текста
+        :return: Найденное нарушение (и во всех следующих вызовах тоже) или None
+        """
+        if self.hit is not None or not chunk:
+            return self.hit
+        window = self._tail + chunk
+        self.consumed += len(chunk)
+
+        try:
+            found = self._matcher.search(window)
+        except CheckIncomplete as e:
+            logger.warning(f"⏱️ Бюджет времени на проверку blacklist исчерпан на части потока ({e}), часть без вердикта")
+            if self._matcher.stats is not None:
+                self._matcher.stats.unchecked += 1
+            self.unchecked = True
+            found = None
+        if found:
+            self.hit = BlacklistHit(
+                entry=found.entry,
+                start=self._tail_start + found.start,
+                end=self._tail_start + found.end,
+            )
+            self.fragment = window[found.start:found.end]
+            return self.hit
+
+        cut = max(len(window) - self._overlap, 0)
+        if cut:
+            space = _SPACE_RE.search(window, cut)
+            if space:
+                cut = space.end()
+        self._tail = window[cut:]
+        self._tail_start += cut
+        return None
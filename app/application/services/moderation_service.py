@@ -1,11 +1,28 @@
 """
 Сервис модерации: проверка сообщений на соответствие черному списку
 """
+import asyncio
+import hashlib
 import logging
 import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import groupby
+from app.config.settings import settings
 from app.infrastructure.db.session import get_async_session
 from app.infrastructure.db.repositories import BlacklistRepository
-from typing import List, Dict, Pattern
+from app.infrastructure.db.models import BlacklistChange
+from app.application.services.moderation_matcher import (
+    BlacklistEntry, BlacklistHit, BlacklistMatcher, CheckIncomplete, IncrementalScanner, MatchStats, PatternStats,
+    SOURCE_RU, SOURCE_EN, SOURCE_DB
+)
+from app.application.services.moderation_artifact import load_artifact, save_artifact, vocabulary_hash
+from app.application.services.regex_backends import get_regex_backend
+from app.application.services.text_normalizer import normalize_text
+from typing import Iterable, List, Dict, Pattern, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -132,37 +149,41 @@ RUSSIAN_PROFANITY_PATTERNS: Dict[str, Pattern] = {
 }
 
 # Регулярные выражения для английских матерных слов
-# Учитывают возможные замены букв (o на 0, a на @, i на 1, и т.д.) и множественные повторы
+# Учитывают возможные замены букв (o на 0, a на @, i на 1, и т.д.) и множественные повторы.
+# Двойные буквы записаны как s{2,}, а не s+s+: соседние повторы одного символа
+# дают полиномиальный перебор на длинных строках ("asssss..."). Первая буква без +:
+# для поиска f+u+c+k+ и fu+c+k+ равносильны, но s+h+... перебирает каждую позицию
+# серии "sssss..." до конца серии (квадратичный поиск).
 ENGLISH_PROFANITY_PATTERNS: Dict[str, Pattern] = {
-    "fuck": re.compile(r'f+u+c+k+', re.IGNORECASE),
-    "fuck off": re.compile(r'f+u+c+k+\s*o+f+f+', re.IGNORECASE),
-    "fuck you": re.compile(r'f+u+c+k+\s*y+o+u+', re.IGNORECASE),
-    "fucking": re.compile(r'f+u+c+k+i+n+g+', re.IGNORECASE),
-    "fucked": re.compile(r'f+u+c+k+e+d+', re.IGNORECASE),
-    "fucker": re.compile(r'f+u+c+k+e+r+', re.IGNORECASE),
-    "shit": re.compile(r's+h+i+t+', re.IGNORECASE),
-    "shitting": re.compile(r's+h+i+t+t+i+n+g+', re.IGNORECASE),
-    "damn": re.compile(r'd+a+m+n+', re.IGNORECASE),
-    "bitch": re.compile(r'b+i+t+c+h+', re.IGNORECASE),
-    "bitches": re.compile(r'b+i+t+c+h+e+s+', re.IGNORECASE),
-    "asshole": re.compile(r'a+s+s+h+o+l+e+', re.IGNORECASE),
-    "ass": re.compile(r'\ba+s+s+\b', re.IGNORECASE),  # \b для границ слова, чтобы не ловить "class", "pass" и т.д.
-    "bastard": re.compile(r'b+a+s+t+a+r+d+', re.IGNORECASE),
-    "crap": re.compile(r'c+r+a+p+', re.IGNORECASE),
-    "piss off": re.compile(r'p+i+s+s+\s*o+f+f+', re.IGNORECASE),
-    "piss": re.compile(r'p+i+s+s+', re.IGNORECASE),
-    "dick": re.compile(r'd+i+c+k+', re.IGNORECASE),
-    "cock": re.compile(r'c+o+c+k+', re.IGNORECASE),
-    "pussy": re.compile(r'p+u+s+s+y+', re.IGNORECASE),
-    "whore": re.compile(r'w+h+o+r+e+', re.IGNORECASE),
-    "slut": re.compile(r's+l+u+t+', re.IGNORECASE),
-    "motherfucker": re.compile(r'm+o+t+h+e+r+f+u+c+k+e+r+', re.IGNORECASE),
-    "motherfucking": re.compile(r'm+o+t+h+e+r+f+u+c+k+i+n+g+', re.IGNORECASE),
-    "son of a bitch": re.compile(r's+o+n+\s+o+f+\s+a+\s+b+i+t+c+h+', re.IGNORECASE),
-    "bullshit": re.compile(r'b+u+l+l+s+h+i+t+', re.IGNORECASE),
-    "damn it": re.compile(r'd+a+m+n+\s+i+t+', re.IGNORECASE),
-    "goddamn": re.compile(r'g+o+d+d+a+m+n+', re.IGNORECASE),
-    "hell": re.compile(r'\bh+e+l+l+\b', re.IGNORECASE),  # \b для границ слова
+    "fuck": re.compile(r'fu+c+k+', re.IGNORECASE),
+    "fuck off": re.compile(r'fu+c+k+\s*o+f{2,}', re.IGNORECASE),
+    "fuck you": re.compile(r'fu+c+k+\s*y+o+u+', re.IGNORECASE),
+    "fucking": re.compile(r'fu+c+k+i+n+g+', re.IGNORECASE),
+    "fucked": re.compile(r'fu+c+k+e+d+', re.IGNORECASE),
+    "fucker": re.compile(r'fu+c+k+e+r+', re.IGNORECASE),
+    "shit": re.compile(r'sh+i+t+', re.IGNORECASE),
+    "shitting": re.compile(r'sh+i+t{2,}i+n+g+', re.IGNORECASE),
+    "damn": re.compile(r'da+m+n+', re.IGNORECASE),
+    "bitch": re.compile(r'bi+t+c+h+', re.IGNORECASE),
+    "bitches": re.compile(r'bi+t+c+h+e+s+', re.IGNORECASE),
+    "asshole": re.compile(r'as{2,}h+o+l+e+', re.IGNORECASE),
+    "ass": re.compile(r'\ba+s{2,}\b', re.IGNORECASE),  # \b для границ слова, чтобы не ловить "class", "pass" и т.д.
+    "bastard": re.compile(r'ba+s+t+a+r+d+', re.IGNORECASE),
+    "crap": re.compile(r'cr+a+p+', re.IGNORECASE),
+    "piss off": re.compile(r'pi+s{2,}\s*o+f{2,}', re.IGNORECASE),
+    "piss": re.compile(r'pi+s{2,}', re.IGNORECASE),
+    "dick": re.compile(r'di+c+k+', re.IGNORECASE),
+    "cock": re.compile(r'co+c+k+', re.IGNORECASE),
+    "pussy": re.compile(r'pu+s{2,}y+', re.IGNORECASE),
+    "whore": re.compile(r'wh+o+r+e+', re.IGNORECASE),
+    "slut": re.compile(r'sl+u+t+', re.IGNORECASE),
+    "motherfucker": re.compile(r'mo+t+h+e+r+f+u+c+k+e+r+', re.IGNORECASE),
+    "motherfucking": re.compile(r'mo+t+h+e+r+f+u+c+k+i+n+g+', re.IGNORECASE),
+    "son of a bitch": re.compile(r'so+n+\s+o+f+\s+a+\s+b+i+t+c+h+', re.IGNORECASE),
+    "bullshit": re.compile(r'bu+l{2,}s+h+i+t+', re.IGNORECASE),
+    "damn it": re.compile(r'da+m+n+\s+i+t+', re.IGNORECASE),
+    "goddamn": re.compile(r'go+d{2,}a+m+n+', re.IGNORECASE),
+    "hell": re.compile(r'\bh+e+l{2,}\b', re.IGNORECASE),  # \b для границ слова
 }
 
 
@@ -213,78 +234,559 @@ def create_regex_from_phrase(phrase: str) -> Pattern:
     
     # Строим регулярное выражение
     pattern_parts = []
-    for char in phrase.lower():
+    for char, run in groupby(phrase.lower()):
+        count = len(list(run))
         if char in char_map:
-            pattern_parts.append(char_map[char])
+            pattern_parts.append(char_map[char] * count)
         elif char.isalnum():
-            # Для английских букв, которых нет в маппинге, используем как есть с возможными повторами
-            pattern_parts.append(f'{re.escape(char)}+')
+            # Для английских букв, которых нет в маппинге, используем как есть с возможными повторами.
+            # Серия одинаковых букв — одним повтором x{n,}, а не x+x+ (иначе полиномиальный перебор).
+            # Первая буква фразы без повтора: для поиска x+... и x... равносильны, а x+... квадратичен
+            if not pattern_parts:
+                pattern_parts.append(re.escape(char) * count)
+            else:
+                pattern_parts.append(f'{re.escape(char)}+' if count == 1 else f'{re.escape(char)}{{{count},}}')
         else:
             # Для знаков препинания и других символов
-            pattern_parts.append(re.escape(char))
+            pattern_parts.append(re.escape(char) * count)
     
     pattern = ''.join(pattern_parts)
     return re.compile(pattern, re.IGNORECASE)
 
+# Счетчики срабатываний и времени паттернов (общие для всех снимков черного списка)
+match_stats = MatchStats()
+# Движок, которым матчер запускает паттерны (re, regex или re2 — см. regex_backends)
+regex_backend = get_regex_backend(settings.MODERATION_REGEX_BACKEND)
+
+def build_matcher(phrases: Tuple[str, ...], save: bool = True) -> BlacklistMatcher:
+    """
+    Собирает единый матчер из встроенных паттернов и фраз из БД.
+    Разбор паттернов загружается из артефакта (moderation_artifact) и
+    пересохраняется, если словарь изменился.
+
+    :param phrases: Фразы из таблицы blacklist (в порядке выборки)
+    :param save: Пересохранять ли артефакт (False — процессы-воркеры только читают его)
+    :return: Скомпилированный матчер
+    """
+    entries = [
+        BlacklistEntry(key=word, source=SOURCE_RU, pattern=pattern)
+        for word, pattern in RUSSIAN_PROFANITY_PATTERNS.items()
+    ]
+    entries.extend(
+        BlacklistEntry(key=word, source=SOURCE_EN, pattern=pattern)
+        for word, pattern in ENGLISH_PROFANITY_PATTERNS.items()
+    )
+    entries.extend(_phrase_entry(phrase) for phrase in phrases)
+
+    # Разбор паттернов берется из артефакта; заново разбираются только новые записи
+    vocabulary = vocabulary_hash(entries)
+    cached_vocabulary, plans = load_artifact()
+    matcher = BlacklistMatcher(
+        entries, time_budget=settings.MODERATION_TIME_BUDGET_MS / 1000, stats=match_stats,
+        plans=plans, backend=regex_backend
+    )
+    if save and vocabulary != cached_vocabulary:
+        save_artifact(matcher.plans, vocabulary)
+    return matcher
+
+
+def _phrase_entry(phrase: str) -> BlacklistEntry:
+    """Запись матчера для фразы из БД."""
+    try:
+        pattern = create_regex_from_phrase(phrase)
+    except Exception as e:
+        logger.error(f"⚠️ Ошибка при компиляции фразы '{phrase}': {e}")
+        # В случае ошибки используем простой поиск
+        pattern = re.compile(re.escape(phrase), re.IGNORECASE)
+    return BlacklistEntry(key=phrase, source=SOURCE_DB, pattern=pattern)
+
+
+@dataclass(frozen=True)
+class BlacklistSnapshot:
+    """Неизменяемый снимок черного списка: версия из БД и собранный по ней матчер"""
+    version: int  # Значение blacklist_version.version на момент загрузки
+    phrases: Tuple[str, ...]  # Фразы из БД (в порядке записей матчера)
+    matcher: BlacklistMatcher
+    change_id: int = 0  # id последнего примененного изменения из blacklist_changes
+
+
+class BlacklistCache:
+    """
+    Процессный кэш черного списка.
+
+    Горячий путь (get_snapshot) не ходит в БД и ничего не компилирует, пока
+    снимок актуален. Снимок заменяется целиком одной ссылкой, поэтому
+    проверка никогда не видит наполовину обновленный список.
+
+    Изменения из любого процесса (add_to_blacklist / remove_from_blacklist,
+    скрипты, второй экземпляр бота) пишутся в журнал blacklist_changes.
+    refresh_if_changed() забирает из журнала только новые записи и применяет
+    дельту к матчеру (with_changes): таблица blacklist целиком не читается,
+    заново компилируются только добавленные фразы.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[BlacklistSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        """Версия загруженного снимка (None, если кэш ещё не загружен)."""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    async def get_snapshot(self) -> BlacklistSnapshot:
+        """Возвращает актуальный снимок, загружая его при первом обращении."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            if self._snapshot is None:
+                await self._load()
+            return self._snapshot
+
+    async def reload(self) -> BlacklistSnapshot:
+        """Принудительно перечитывает черный список из БД."""
+        async with self._lock:
+            await self._load()
+            return self._snapshot
+
+    async def refresh_if_changed(self) -> bool:
+        """
+        Применяет новые записи журнала изменений blacklist к снимку.
+        Если изменений нет — один запрос по первичному ключу журнала.
+
+        :return: True если снимок был обновлен
+        """
+        snapshot = await self.get_snapshot()
+        async with get_async_session() as session:
+            changes = await BlacklistRepository.get_changes_since(session, snapshot.change_id, limit=CHANGES_BATCH_SIZE)
+            if not changes:
+                return False
+            version = await BlacklistRepository.get_version(session)
+
+        async with self._lock:
+            if self._snapshot is not snapshot:
+                return True  # Снимок уже обновлен параллельным вызовом
+            # id журнала в SQLite идут подряд: запись сериализована, новая строка получает max(id) + 1.
+            # Пропуск в id значит, что журнал обрезан prune_changes (процесс отстал) — это ожидаемый
+            # случай: дельту применить нельзя, и список перечитывается целиком.
+            gap = (changes[0].id != snapshot.change_id + 1
+                   or changes[-1].id - changes[0].id + 1 != len(changes))
+            if (gap or len(changes) >= CHANGES_BATCH_SIZE
+                    or any(change.action == BlacklistChange.CLEAR for change in changes)):
+                # Журнал обрезан, изменений слишком много или таблица очищена
+                logger.info(f"🔄 blacklist: {len(changes)}+ изменений после #{snapshot.change_id}, перечитываем список целиком")
+                await self._load()
+                return True
+            self._apply_changes(snapshot, changes, version)
+        return True
+
+    def _apply_changes(self, snapshot: BlacklistSnapshot, changes: List, version: int):
+        """Применяет дельту из журнала: компилируются только добавленные фразы."""
+        phrases = dict.fromkeys(snapshot.phrases)
+        for change in changes:
+            phrase = (change.phrase or "").strip()
+            if not phrase:
+                continue
+            if change.action == BlacklistChange.ADD:
+                phrases[phrase] = None
+            elif change.action == BlacklistChange.REMOVE:
+                phrases.pop(phrase, None)
+
+        old = set(snapshot.phrases)
+        added = [phrase for phrase in phrases if phrase not in old]
+        removed = old.difference(phrases)
+        matcher = snapshot.matcher.with_changes(
+            added=[_phrase_entry(phrase) for phrase in added],
+            removed=[(SOURCE_DB, phrase) for phrase in removed],
+        )
+        self._snapshot = BlacklistSnapshot(
+            version=version,
+            phrases=tuple(entry.key for entry in matcher.entries if entry.source == SOURCE_DB),
+            matcher=matcher,
+            change_id=changes[-1].id,
+        )
+        logger.info(
+            f"🔄 blacklist обновлен по журналу (изменения #{changes[0].id}–#{changes[-1].id}): "
+            f"+{len(added)} / -{len(removed)} фраз, версия {version}"
+        )
+
+    async def _load(self):
+        """Читает версию, журнал и фразы в одной сессии и атомарно подменяет снимок."""
+        async with get_async_session() as session:
+            version = await BlacklistRepository.get_version(session)
+            change_id = await BlacklistRepository.get_last_change_id(session)
+            blacklist = await BlacklistRepository.get_all(session)
+        phrases = tuple(dict.fromkeys(phrase for phrase in (item.phrase.strip() for item in blacklist) if phrase))
+        self._snapshot = BlacklistSnapshot(
+            version=version, phrases=phrases, matcher=build_matcher(phrases), change_id=change_id
+        )
+        logger.info(f"🔧 Кэш blacklist загружен: версия {version}, {len(self._snapshot.matcher)} паттернов ({len(phrases)} фраз из БД)")
+
+
+# Больше изменений за один опрос — снимок перечитывается целиком
+CHANGES_BATCH_SIZE = 500
+
+blacklist_cache = BlacklistCache()
+
+
+class VerdictCache:
+    """
+    Ограниченный LRU-кэш вердиктов проверки blacklist.
+
+    Ключ — хэш текста (blake2b, 16 байт), сам текст не хранится, поэтому
+    память определяется только числом записей (~200 байт на запись).
+    Кэш привязан к версии снимка черного списка и очищается при ее смене.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._version: Optional[int] = None
+        self._verdicts: "OrderedDict[bytes, Optional[BlacklistHit]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def lookup(self, snapshot: BlacklistSnapshot, text: str) -> Tuple[Optional[bytes], bool, Optional[BlacklistHit]]:
+        """
+        Ищет вердикт в кэше.
+
+        :param snapshot: Актуальный снимок черного списка
+        :param text: Текст для проверки
+        :return: (ключ для store, найден ли вердикт, вердикт)
+        """
+        if self.max_size <= 0:
+            return None, False, None
+        if snapshot.version != self._version:
+            self._verdicts.clear()
+            self._version = snapshot.version
+
+        key = self._key(text)
+        verdicts = self._verdicts
+        if key in verdicts:
+            verdicts.move_to_end(key)
+            self.hits += 1
+            return key, True, verdicts[key]
+        self.misses += 1
+        return key, False, None
+
+    def store(self, snapshot: BlacklistSnapshot, key: Optional[bytes], hit: Optional[BlacklistHit]):
+        """
+        Сохраняет вердикт, полученный после lookup.
+        Вердикт устаревшего снимка (список сменился во время проверки) не сохраняется.
+        """
+        if key is None or snapshot.version != self._version:
+            return
+        verdicts = self._verdicts
+        verdicts[key] = hit
+        if len(verdicts) > self.max_size:
+            verdicts.popitem(last=False)
+
+
+verdict_cache = VerdictCache(settings.MODERATION_VERDICT_CACHE_SIZE)
+
+
+# Матчер в процессе-воркере: (версия, фразы) → матчер, собирается один раз на версию
+_worker_matcher: Optional[Tuple[int, Tuple[str, ...], BlacklistMatcher]] = None
+
+def _search_in_worker(version: int, phrases: Tuple[str, ...], text: str) -> Optional[Tuple[str, str, int, int]]:
+    """
+    Проверка текста в процессе-воркере (ProcessPoolExecutor).
+
+    :return: (source, key, start, end) найденного нарушения или None
+    """
+    global _worker_matcher
+    if _worker_matcher is None or _worker_matcher[0] != version or _worker_matcher[1] != phrases:
+        # Артефакт сохраняет основной процесс; воркеры только читают его и не гоняются за запись
+        _worker_matcher = (version, phrases, build_matcher(phrases, save=False))
+    matcher = _worker_matcher[2]
+    hit = matcher.search(text)
+    if hit is None:
+        return None
+    return hit.entry.source, hit.entry.key, hit.start, hit.end
+
+
+class ModerationExecutor:
+    """
+    Выбирает, где проверять текст, по его длине:
+    - короткие комментарии — прямо в обработчике (дешевле, чем переключение потока);
+    - длинные тексты (документы, PDF, транскрипции) — в потоке (asyncio.to_thread),
+      чтобы event loop продолжал обрабатывать другие апдейты;
+    - очень длинные — в отдельном процессе, если MODERATION_PROCESS_MIN_CHARS > 0
+      (re не отпускает GIL, процесс не делит с ботом ни GIL, ни ядро).
+
+    Отмена: если ожидающая задача отменена, CancelledError сразу уходит вызывающему
+    коду, а результат фоновой проверки отбрасывается (и не попадает в кэш вердиктов).
+    Проверка в потоке не прерывается посреди вызова re, но ограничена бюджетом
+    времени матчера; еще не начатая проверка в процессе снимается из очереди.
+    """
+
+    def __init__(self, inline_max_chars: int, process_min_chars: int = 0, process_workers: int = 1):
+        self.inline_max_chars = inline_max_chars
+        self.process_min_chars = process_min_chars
+        self.process_workers = process_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def strategy(self, text: str) -> str:
+        """Способ проверки текста: 'inline', 'thread' или 'process'."""
+        if len(text) <= self.inline_max_chars:
+            return "inline"
+        if self.process_min_chars > 0 and len(text) >= self.process_min_chars:
+            return "process"
+        return "thread"
+
+    async def search(self, snapshot: BlacklistSnapshot, text: str) -> Optional[BlacklistHit]:
+        """
+        Проверяет текст матчером снимка выбранным способом.
+
+        :param snapshot: Снимок черного списка
+        :param text: Текст для проверки
+        :return: Найденное нарушение или None
+        """
+        strategy = self.strategy(text)
+        if strategy == "inline":
+            return snapshot.matcher.search(text)
+        if strategy == "process":
+            try:
+                return await self._search_in_process(snapshot, text)
+            except BrokenProcessPool as e:
+                logger.error(f"⚠️ Процесс проверки blacklist упал ({e}), проверяем в потоке")
+                self.shutdown()
+        return await asyncio.to_thread(snapshot.matcher.search, text)
+
+    async def feed(self, scanner: IncrementalScanner, chunk: str) -> Optional[BlacklistHit]:
+        """
+        Передает часть извлекаемого текста в сканер: короткую — прямо в обработчике,
+        длинную — в потоке, как и search(). В процесс сканер не передается:
+        его хвост и позиция живут в объекте и нужны следующему вызову.
+
+        :param scanner: Сканер blacklist (create_blacklist_scanner)
+        :param chunk: Часть текста
+        :return: Найденное нарушение или None (см. IncrementalScanner.feed)
+        """
+        if scanner.hit is not None or len(chunk) <= self.inline_max_chars:
+            return scanner.feed(chunk)
+        return await asyncio.to_thread(scanner.feed, chunk)
+
+    async def _search_in_process(self, snapshot: BlacklistSnapshot, text: str) -> Optional[BlacklistHit]:
+        """Проверка в ProcessPoolExecutor; запись восстанавливается по ключу в снимке."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            logger.info(f"🔧 Запущен пул процессов для проверки blacklist ({self.process_workers} шт.)")
+        loop = asyncio.get_running_loop()
+        found = await loop.run_in_executor(
+            self._pool, _search_in_worker, snapshot.version, snapshot.phrases, text
+        )
+        if found is None:
+            return None
+        source, key, start, end = found
+        return BlacklistHit(entry=snapshot.matcher.get_entry(source, key), start=start, end=end)
+
+    def shutdown(self):
+        """Останавливает пул процессов (при остановке бота)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+moderation_executor = ModerationExecutor(
+    inline_max_chars=settings.MODERATION_INLINE_MAX_CHARS,
+    process_min_chars=settings.MODERATION_PROCESS_MIN_CHARS,
+    process_workers=settings.MODERATION_PROCESS_WORKERS,
+)
+
+
+_SOURCE_NAMES = {
+    SOURCE_RU: "Русское матерное слово",
+    SOURCE_EN: "Английское матерное слово",
+    SOURCE_DB: "Фраза из БД",
+}
+
+
+@dataclass(frozen=True)
+class BlacklistVerdict:
+    """Результат проверки текста по blacklist"""
+    violation: bool  # Найдено ли нарушение
+    key: Optional[str] = None  # Ключ сработавшего паттерна (слово или фраза из БД)
+    source: Optional[str] = None  # SOURCE_RU, SOURCE_EN или SOURCE_DB
+    start: Optional[int] = None  # Начало совпадения в исходном тексте
+    end: Optional[int] = None  # Конец совпадения (не включая)
+    fragment: str = ""  # Совпавший фрагмент исходного текста
+    normalized: str = ""  # Фрагмент в каноническом виде (normalize_text)
+    version: Optional[int] = None  # Версия снимка черного списка
+    elapsed_ms: float = 0.0  # Время проверки
+    unchecked: bool = False  # Бюджет времени исчерпан: нарушение не найдено, но текст проверен не полностью
+
+    @property
+    def source_name(self) -> str:
+        """Название источника для логов и уведомлений."""
+        return _SOURCE_NAMES.get(self.source, "")
+
+
+def _make_verdict(
+    text: str, hit: Optional[BlacklistHit], version: int, elapsed: float, unchecked: bool = False
+) -> BlacklistVerdict:
+    """Собирает BlacklistVerdict из найденного нарушения."""
+    if hit is None:
+        return BlacklistVerdict(violation=False, version=version, elapsed_ms=elapsed * 1000, unchecked=unchecked)
+    fragment = text[hit.start:hit.end]
+    return BlacklistVerdict(
+        violation=True,
+        key=hit.entry.key,
+        source=hit.entry.source,
+        start=hit.start,
+        end=hit.end,
+        fragment=fragment,
+        normalized=normalize_text(fragment).text,
+        version=version,
+        elapsed_ms=elapsed * 1000,
+    )
+
+async def check_message_verdict(text: str) -> BlacklistVerdict:
+    """
+    Проверяет текст по blacklist и возвращает подробный вердикт: какой паттерн
+    сработал, источник, диапазон совпадения и его канонический вид.
+    Повторные тексты (спам-волны, повторные проверки подписи) берутся из кэша вердиктов.
+    Если бюджет времени исчерпан, вердикт помечается unchecked, пишется в лог
+    и в счетчики и не кэшируется (повторная проверка может успеть).
+
+    :param text: Текст для проверки
+    :return: BlacklistVerdict
+    """
+    if not text:
+        return BlacklistVerdict(violation=False)
+
+    logger.info(f"🔍 Проверяем blacklist: текст='{text[:100]}...'")
+
+    snapshot = await blacklist_cache.get_snapshot()
+    started = time.perf_counter()
+    key, found, hit = verdict_cache.lookup(snapshot, text)
+    unchecked = None
+    if not found:
+        # Короткий текст проверяется сразу, длинный — в потоке/процессе (см. ModerationExecutor).
+        # При отмене задачи CancelledError уходит наверх, вердикт не сохраняется
+        try:
+            hit = await moderation_executor.search(snapshot, text)
+            verdict_cache.store(snapshot, key, hit)
+        except CheckIncomplete as e:
+            unchecked = e
+    elapsed = time.perf_counter() - started
+    match_stats.record_check(elapsed, hit, unchecked=unchecked is not None)
+
+    verdict = _make_verdict(text, hit, snapshot.version, elapsed, unchecked=unchecked is not None)
+    if unchecked is not None:
+        logger.warning(
+            f"⏱️ Проверка blacklist не завершена: бюджет времени {snapshot.matcher.time_budget * 1000:.0f} мс "
+            f"исчерпан, {unchecked}. Текст длиной {len(text)} без вердикта ({verdict.elapsed_ms:.1f} мс)"
+        )
+    elif verdict.violation:
+        logger.warning(
+            f"⚠️ НАЙДЕНО НАРУШЕНИЕ! {verdict.source_name} в тексте: '{verdict.key}' "
+            f"(фрагмент: '{verdict.fragment}', канонический вид: '{verdict.normalized}', "
+            f"позиция {verdict.start}-{verdict.end}, {verdict.elapsed_ms:.1f} мс)"
+        )
+    else:
+        logger.info(f"✅ Проверка blacklist завершена, нарушений не найдено ({verdict.elapsed_ms:.1f} мс)")
+    return verdict
+
 async def check_message_for_blacklist(text: str) -> bool:
     """
     Проверяет, содержит ли текст запрещённые выражения из blacklist.
-    Использует регулярные выражения для более надежного обнаружения матерных слов.
+    Подробности о нарушении — см. check_message_verdict.
     
     :param text: Текст для проверки
     :return: True если найдено нарушение, False если все ОК
     """
-    if not text:
-        return False
-    
-    text_lower = text.lower()
-    logger.info(f"🔍 Проверяем blacklist: текст='{text[:100]}...'")
-    
-    # 1. Проверяем предопределенные регулярные выражения для матерных слов
-    # Сначала проверяем русские матерные слова
-    for word, pattern in RUSSIAN_PROFANITY_PATTERNS.items():
-        if pattern.search(text):
-            logger.warning(f"⚠️ НАЙДЕНО НАРУШЕНИЕ! Русское матерное слово '{word}' найдено в тексте (regex)")
-            return True
-    
-    # Затем проверяем английские матерные слова
-    for word, pattern in ENGLISH_PROFANITY_PATTERNS.items():
-        if pattern.search(text):
-            logger.warning(f"⚠️ НАЙДЕНО НАРУШЕНИЕ! Английское матерное слово '{word}' найдено в тексте (regex)")
-            return True
-    
-    # 2. Проверяем фразы из базы данных (blacklist)
-    async with get_async_session() as session:
-        blacklist = await BlacklistRepository.get_all(session)
-        logger.info(f"   Проверяем фразы из БД blacklist: {len(blacklist)} фраз")
-        
-        for item in blacklist:
-            phrase = item.phrase.strip()
-            if not phrase:
-                continue
-            
-            # Создаем регулярное выражение из фразы
-            phrase_lower = phrase.lower()
-            try:
-                # Сначала пробуем простое совпадение (для обратной совместимости)
-                if phrase_lower in text_lower:
-                    logger.warning(f"⚠️ НАЙДЕНО НАРУШЕНИЕ! Фраза из БД '{phrase}' найдена в тексте (простой поиск)")
-                    return True
-                
-                # Затем пробуем регулярное выражение
-                regex_pattern = create_regex_from_phrase(phrase)
-                if regex_pattern.search(text):
-                    logger.warning(f"⚠️ НАЙДЕНО НАРУШЕНИЕ! Фраза из БД '{phrase}' найдена в тексте (regex)")
-                    return True
-            except Exception as e:
-                logger.error(f"⚠️ Ошибка при проверке фразы '{phrase}': {e}")
-                # В случае ошибки используем простой поиск
-                if phrase_lower in text_lower:
-                    logger.warning(f"⚠️ НАЙДЕНО НАРУШЕНИЕ! Фраза из БД '{phrase}' найдена в тексте (fallback)")
-                    return True
-    
-    logger.info(f"✅ Проверка blacklist завершена, нарушений не найдено")
-    return False
+    verdict = await check_message_verdict(text)
+    return verdict.violation
+
+async def check_messages_for_blacklist(texts: Iterable[str]) -> List[Optional[BlacklistHit]]:
+    """
+    Пакетная проверка текстов по blacklist (повторный аудит сохраненных комментариев).
+    Все тексты проверяются одним снимком черного списка: матчер не пересобирается
+    и БД не читается на каждый текст, в лог пишется только итог.
+
+    :param texts: Тексты для проверки
+    :return: Для каждого текста — найденное нарушение или None (в том же порядке).
+             Тексты, на которых исчерпан бюджет времени, — None; их число пишется в лог и в счетчики
+    """
+    snapshot = await blacklist_cache.get_snapshot()
+    # Аудит проходит тысячи уникальных текстов — кэш вердиктов не используется,
+    # чтобы не вытеснить из него горячие тексты из чатов
+    search = snapshot.matcher.search
+    hits = []
+    unchecked = 0
+    for text in texts:
+        if not text:
+            hits.append(None)
+            continue
+        started = time.perf_counter()
+        incomplete = False
+        try:
+            hit = search(text)
+        except CheckIncomplete:
+            hit, incomplete = None, True
+            unchecked += 1
+        match_stats.record_check(time.perf_counter() - started, hit, unchecked=incomplete)
+        hits.append(hit)
+    violations = sum(1 for hit in hits if hit)
+    logger.info(f"🔍 Пакетная проверка blacklist: {len(hits)} текстов, нарушений: {violations} (версия {snapshot.version})")
+    if unchecked:
+        logger.warning(f"⏱️ Пакетная проверка blacklist: {unchecked} текстов проверены не полностью (исчерпан бюджет времени)")
+    return hits
+
+async def create_blacklist_scanner() -> IncrementalScanner:
+    """
+    Создает сканер для проверки текста, который извлекается частями (страницы PDF,
+    абзацы документа). Извлечение прекращается, как только сканер нашел нарушение.
+
+    :return: IncrementalScanner на текущем снимке черного списка
+    """
+    snapshot = await blacklist_cache.get_snapshot()
+    return snapshot.matcher.scanner()
+
+def describe_hit(hit: BlacklistHit, fragment: str) -> str:
+    """Строка для лога о найденном нарушении."""
+    return f"{_SOURCE_NAMES[hit.entry.source]}: '{hit.entry.key}' (фрагмент: '{fragment}')"
+
+async def get_blacklist_stats(limit: int = 10) -> Dict:
+    """
+    Статистика проверок blacklist для админ-панели.
+
+    :param limit: Сколько паттернов показывать в топах
+    :return: Словарь: общие счетчики, топ по срабатываниям и по времени, паттерны без срабатываний
+    """
+    snapshot = await blacklist_cache.get_snapshot()
+    stats = match_stats
+    rows = [
+        (entry, stats.patterns.get((entry.source, entry.key)) or PatternStats())
+        for entry in snapshot.matcher.entries
+    ]
+    return {
+        'version': snapshot.version,
+        'patterns': len(rows),
+        'checks': stats.checks,
+        'violations': stats.violations,
+        'avg_ms': stats.total_time / stats.checks * 1000 if stats.checks else 0.0,
+        'max_ms': stats.max_time * 1000,
+        'unchecked': stats.unchecked,
+        'cache_hits': verdict_cache.hits,
+        'cache_misses': verdict_cache.misses,
+        'since': stats.since,
+        'top_hits': sorted((row for row in rows if row[1].hits), key=lambda row: -row[1].hits)[:limit],
+        'top_time': sorted((row for row in rows if row[1].calls), key=lambda row: -row[1].time)[:limit],
+        'never_fired': [entry for entry, pattern_stats in rows if not pattern_stats.hits],
+    }
+
+def reset_blacklist_stats():
+    """Обнуляет счетчики проверок blacklist."""
+    match_stats.reset()
+    verdict_cache.hits = 0
+    verdict_cache.misses = 0
 
 async def add_to_blacklist(phrase: str, admin_id: int = None) -> bool:
     """Добавить фразу в черный список"""
@@ -304,7 +806,8 @@ async def add_to_blacklist(phrase: str, admin_id: int = None) -> bool:
             user_id=admin_id,
             message=f"Добавлено в blacklist: {phrase}"
         ))
-        return True
+    await blacklist_cache.refresh_if_changed()
+    return True
 
 async def remove_from_blacklist(phrase: str, admin_id: int = None) -> bool:
     """Удалить фразу из черного списка"""
@@ -318,7 +821,8 @@ async def remove_from_blacklist(phrase: str, admin_id: int = None) -> bool:
             user_id=admin_id,
             message=f"Удалено из blacklist: {phrase}"
         ))
-        return True
+    await blacklist_cache.refresh_if_changed()
+    return True
 
 async def get_all_blacklist() -> List:
     """Получить весь черный список"""
@@ -0,0 +1,213 @@
+"""
+Пул процессов для разбора документов (PDF, docx, xlsx, pptx, odt).
+
+Разбор файлов — чистая работа CPU (pypdf и разбор XML держат GIL):
+в event loop один большой Excel останавливает модерацию во всех чатах.
+Поэтому файл уходит в процесс-воркер байтами (или путем к временному файлу,
+если он скачан на диск), обратно приходит текст (document_parsers.parse_document).
+
+Защиты для контейнера на 768 MB:
+- таймаут задачи (PARSER_TASK_TIMEOUT): убивается только воркер, который
+  разбирал этот файл (воркер сообщает свой pid в начале задачи), новые задачи
+  уходят в новый пул. Разборы других сообщений, которые шли в старом пуле,
+  один раз повторяются в новом, а не отменяются;
+- лимит памяти воркера (PARSER_MEMORY_LIMIT_MB сверх занятой при запуске,
+  RLIMIT_AS): разбор, которому не хватило памяти, падает в воркере, бот продолжает работу;
+- перезапуск воркеров после PARSER_MAX_TASKS задач или если пиковый RSS
+  воркера вырос больше чем на PARSER_MAX_RSS_MB: фрагментированная куча не копится.
+Воркеры запускаются через forkserver (spawn, если его нет), а не fork: в боте
+работают потоки (aiosqlite, to_thread), и fork мог бы унаследовать чужую
+захваченную блокировку (logging, malloc, sqlite) и зависнуть.
+Воркеры запускаются при первом документе, как и процессы проверки blacklist
+(ModerationExecutor). PARSER_PROCESS_WORKERS=0 — разбор в потоке, без процессов.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.config.settings import settings
+from app.application.services.document_parsers import ParseStats, init_worker, parse_document, run_task
+
+logger = logging.getLogger(__name__)
+
+# forkserver не копирует потоки и блокировки процесса бота (на Windows есть только spawn)
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+@dataclass
+class _Workers:
+    """Пул процессов и воркеры, которые сейчас разбирают файлы"""
+    executor: ProcessPoolExecutor
+    started: Any  # multiprocessing.SimpleQueue: воркер пишет (номер задачи, pid) в начале задачи
+    running: Dict[int, Optional[int]] = field(default_factory=dict)  # Номер задачи → pid воркера (None — еще в очереди)
+    tasks: int = 0  # Задач, отправленных в пул
+    killed: bool = False  # Воркер убит по таймауту: остальные задачи пула упадут с BrokenProcessPool
+
+    def update_pids(self):
+        """Читает сообщения воркеров о начатых задачах (очередь не должна заполняться)."""
+        while not self.started.empty():
+            task_id, pid = self.started.get()
+            if task_id in self.running:
+                self.running[task_id] = pid
+
+
+class ParserPool:
+    """Процессы-воркеры для разбора документов с таймаутом, лимитом памяти и перезапуском"""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        task_timeout: float = 30.0,
+        memory_limit_mb: int = 0,
+        max_rss_mb: int = 0,
+        max_tasks: int = 0
+    ):
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        self._pool: Optional[_Workers] = None
+        self._task_ids = itertools.count(1)
+
+    def _get_pool(self) -> _Workers:
+        if self._pool is None:
+            context = multiprocessing.get_context(START_METHOD)
+            started = context.SimpleQueue()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(self.memory_limit_mb, started),
+            )
+            self._pool = _Workers(executor, started)
+            logger.info(f"🔧 Запущен пул процессов для разбора документов ({self.workers} шт., {START_METHOD})")
+        return self._pool
+
+    async def parse(self, extension: str, source: Union[bytes, str], max_chars: int) -> Tuple[List[str], ParseStats]:
+        """
+        Разбирает файл в процессе-воркере.
+
+        :param extension: Расширение файла ('.pdf', '.docx', ...)
+        :param source: Содержимое файла или путь к временному файлу (downloads.Download.source())
+        :param max_chars: Сколько символов текста достаточно
+        :return: (части текста, статистика разбора) — см. document_parsers.parse_document
+        :raises asyncio.TimeoutError: Разбор не уложился в task_timeout (воркер убит)
+        :raises Exception: Ошибка разбора в воркере (в том числе MemoryError и BrokenProcessPool)
+        """
+        if self.workers <= 0:
+            return await asyncio.to_thread(parse_document, extension, source, max_chars)
+
+        pool = self._get_pool()
+        try:
+            chunks, stats = await self._run(pool, extension, source, max_chars)
+        except BrokenProcessPool:
+            if not pool.killed:
+                raise
+            # Пул сломан таймаутом чужого файла, а не этим: разбираем заново в новом пуле
+            logger.info(f"🔁 Разбор {extension} прерван перезапуском процессов, повторяем")
+            pool = self._get_pool()
+            chunks, stats = await self._run(pool, extension, source, max_chars)
+
+        if self.max_rss_mb and stats.rss_mb > self.max_rss_mb:
+            logger.info(f"♻️ Процесс разбора вырос на {stats.rss_mb:.0f} MB (лимит {self.max_rss_mb} MB), перезапускаем")
+            self._recycle(pool)
+        elif self.max_tasks and pool.tasks >= self.max_tasks and pool is self._pool:
+            logger.info(f"♻️ Процессы разбора выполнили {pool.tasks} задач, перезапускаем")
+            self._recycle(pool)
+        return chunks, stats
+
+    async def _run(self, pool: _Workers, extension: str, source: Union[bytes, str], max_chars: int):
+        """
+        Одна задача в пуле pool. Таймаут отсчитывается с момента, когда воркер взял
+        файл (ожидание в очереди за другими файлами не считается); по таймауту
+        убивается только этот воркер.
+        """
+        task_id = next(self._task_ids)
+        pool.tasks += 1
+        pool.running[task_id] = None
+        try:
+            future = pool.executor.submit(run_task, task_id, extension, source, max_chars)
+            waiter = asyncio.wrap_future(future)
+            loop = asyncio.get_running_loop()
+            # Начало задачи видно только по сообщению воркера: проверяем его четыре раза за таймаут,
+            # поэтому воркер убивается через task_timeout..1.25*task_timeout после начала разбора
+            poll = self.task_timeout / 4
+            deadline = None
+            while True:
+                timeout = poll if deadline is None else max(deadline - loop.time(), 0)
+                done, _ = await asyncio.wait({waiter}, timeout=timeout)
+                if done:
+                    return waiter.result()
+                pool.update_pids()
+                pid = pool.running.get(task_id)
+                if deadline is None:
+                    if pid is not None:
+                        deadline = loop.time() + self.task_timeout
+                    continue
+                logger.error(
+                    f"⏱️ Разбор {extension} не уложился в {self.task_timeout:g} с, процесс разбора {pid} убивается"
+                )
+                self._detach(pool)
+                pool.killed = True
+                self._kill_worker(pid)
+                pool.executor.shutdown(wait=False)
+                raise asyncio.TimeoutError()
+        except asyncio.CancelledError:
+            future.cancel()  # Файл еще в очереди — не разбираем (начатый разбор дорабатывает)
+            raise
+        except BrokenProcessPool as e:
+            if not pool.killed:
+                logger.error(f"⚠️ Процесс разбора документов упал при разборе {extension} ({e}), пул пересоздается")
+                self._detach(pool)
+                pool.executor.shutdown(wait=False)
+            raise
+        finally:
+            pool.running.pop(task_id, None)
+            pool.update_pids()
+
+    def _detach(self, pool: _Workers):
+        """Новые задачи больше не отправляются в pool."""
+        if pool is self._pool:
+            self._pool = None
+
+    def _recycle(self, pool: _Workers):
+        """Плавный перезапуск: начатые задачи дорабатывают, новые уходят в новый пул."""
+        self._detach(pool)
+        pool.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _kill_worker(pid: int):
+        try:
+            os.kill(pid, KILL_SIGNAL)
+        except ProcessLookupError:
+            pass  # Воркер уже завершился
+
+    def shutdown(self):
+        """Останавливает пул процессов (при остановке бота): занятые воркеры убиваются, очередь отменяется."""
+        pool = self._pool
+        if pool is None:
+            return
+        self._detach(pool)
+        pool.update_pids()
+        for pid in set(pool.running.values()):
+            if pid is not None:
+                self._kill_worker(pid)
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+parser_pool = ParserPool(
+    workers=settings.PARSER_PROCESS_WORKERS,
+    task_timeout=settings.PARSER_TASK_TIMEOUT,
+    memory_limit_mb=settings.PARSER_MEMORY_LIMIT_MB,
+    max_rss_mb=settings.PARSER_MAX_RSS_MB,
+    max_tasks=settings.PARSER_MAX_TASKS,
+)
@@ -0,0 +1,166 @@
+"""
+Движки регулярных выражений для паттернов черного списка.
+
+Словари паттернов (RUSSIAN_PROFANITY_PATTERNS и др.) и разбор паттернов
+в BlacklistMatcher остаются на стандартном re: он задает семантику.
+Движок (settings.MODERATION_REGEX_BACKEND) только компилирует паттерн,
+который запускается по тексту:
+- re — стандартный модуль (по умолчанию и запасной вариант);
+- regex — модуль regex в режиме совместимости с re (VERSION0);
+- re2 — google-re2, поиск за линейное время без катастрофического перебора.
+
+Паттерн, семантику которого движок не повторяет точно (у RE2 \\b, \\w, \\s
+работают только с ASCII, нет обратных ссылок и lookaround), остается на re.
+"""
+import logging
+import re
+from typing import Dict, Optional, Pattern
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Опциональные движки (чтобы не падать, если библиотеки не установлены)
+try:
+    import regex
+except ImportError:
+    regex = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+logger = logging.getLogger(__name__)
+
+REGEX_BACKEND_RE = "re"
+REGEX_BACKEND_REGEX = "regex"
+REGEX_BACKEND_RE2 = "re2"
+
+# Флаги re, которые RE2 понимает как встроенные (?i), (?s), (?m)
+_RE2_INLINE_FLAGS = {re.IGNORECASE: "i", re.DOTALL: "s", re.MULTILINE: "m"}
+# re.UNICODE у строковых паттернов ставится всегда, RE2 и так работает с Unicode
+_RE2_IGNORED_FLAGS = re.UNICODE
+# Узлы разбора, которые RE2 не поддерживает или понимает иначе, чем re
+_RE2_UNSUPPORTED_OPS = {
+    sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS, sre_constants.ASSERT, sre_constants.ASSERT_NOT,
+}
+for _name in ("ATOMIC_GROUP", "POSSESSIVE_REPEAT", "GROUPREF_IGNORE"):  # Python 3.11+
+    if hasattr(sre_constants, _name):
+        _RE2_UNSUPPORTED_OPS.add(getattr(sre_constants, _name))
+
+
+class RegexBackend:
+    """Стандартный re: паттерн запускается как есть"""
+    name = REGEX_BACKEND_RE
+
+    def __init__(self):
+        self._compiled: Dict[Pattern, Pattern] = {}
+
+    def supports(self, pattern: Pattern) -> bool:
+        """Повторяет ли движок семантику паттерна re в точности."""
+        return True
+
+    def compile(self, pattern: Pattern) -> Pattern:
+        """
+        Компилирует паттерн re этим движком (результаты кэшируются: матчер
+        пересобирается при каждом изменении черного списка).
+
+        :param pattern: Паттерн стандартного re
+        :return: Объект с search()/match() как у re.Pattern; сам pattern, если движок его не поддерживает
+        """
+        compiled = self._compiled.get(pattern)
+        if compiled is None:
+            compiled = pattern
+            if self.supports(pattern):
+                try:
+                    compiled = self._compile(pattern)
+                except Exception as e:
+                    logger.debug(f"Движок {self.name} не скомпилировал паттерн {pattern.pattern!r}: {e}")
+            self._compiled[pattern] = compiled
+        return compiled
+
+    def _compile(self, pattern: Pattern) -> Pattern:
+        return pattern
+
+    def runs(self, pattern: Pattern) -> bool:
+        """Запускается ли паттерн этим движком (а не запасным re)."""
+        return self.name == REGEX_BACKEND_RE or self.compile(pattern) is not pattern
+
+
+class RegexModuleBackend(RegexBackend):
+    """Модуль regex в режиме совместимости с re"""
+    name = REGEX_BACKEND_REGEX
+
+    def _compile(self, pattern: Pattern) -> Pattern:
+        return regex.compile(pattern.pattern, pattern.flags | regex.VERSION0)
+
+
+class Re2Backend(RegexBackend):
+    """google-re2: линейное время; паттерны с \\b, ^, $, \\w, \\s, \\d, lookaround и обратными ссылками остаются на re"""
+    name = REGEX_BACKEND_RE2
+
+    def supports(self, pattern: Pattern) -> bool:
+        flags = pattern.flags & ~_RE2_IGNORED_FLAGS
+        if any(flags & flag for flag in (re.VERBOSE, re.ASCII, re.LOCALE)):
+            return False
+        try:
+            return _re2_compatible(list(sre_parse.parse(pattern.pattern, pattern.flags)))
+        except (re.error, RecursionError):
+            return False
+
+    def _compile(self, pattern: Pattern) -> Pattern:
+        inline = "".join(letter for flag, letter in _RE2_INLINE_FLAGS.items() if pattern.flags & flag)
+        return re2.compile(f"(?{inline}){pattern.pattern}" if inline else pattern.pattern)
+
+
+def _re2_compatible(items) -> bool:
+    """Нет ли в разобранном паттерне конструкций, которые RE2 понимает иначе, чем re."""
+    for op, av in items:
+        if op in _RE2_UNSUPPORTED_OPS:
+            return False
+        if op is sre_constants.AT:
+            return False  # \b в RE2 — только ASCII, ^ и $ иначе ведут себя с pos и переводом строки
+        if op is sre_constants.CATEGORY:
+            return False  # \w, \s, \d в RE2 — только ASCII
+        if op is sre_constants.IN and not _re2_compatible(av):
+            return False
+        if op is sre_constants.SUBPATTERN and not _re2_compatible(av[-1]):
+            return False
+        if op is sre_constants.BRANCH and not all(_re2_compatible(branch) for branch in av[1]):
+            return False
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and not _re2_compatible(av[2]):
+            return False
+    return True
+
+
+_BACKENDS = {
+    REGEX_BACKEND_RE: (RegexBackend, True),
+    REGEX_BACKEND_REGEX: (RegexModuleBackend, regex is not None),
+    REGEX_BACKEND_RE2: (Re2Backend, re2 is not None),
+}
+
+
+def available_backends() -> Dict[str, bool]:
+    """Имена движков и установлены ли их библиотеки."""
+    return {name: installed for name, (_, installed) in _BACKENDS.items()}
+
+
+def get_regex_backend(name: Optional[str]) -> RegexBackend:
+    """
+    Движок по имени из настроек.
+
+    :param name: re, regex или re2 (None/пусто — re)
+    :return: Движок; стандартный re, если имя неизвестно или библиотека не установлена
+    """
+    name = (name or REGEX_BACKEND_RE).strip().lower()
+    if name not in _BACKENDS:
+        logger.warning(f"⚠️ Неизвестный движок регулярных выражений '{name}', используется re")
+        return RegexBackend()
+    backend_class, installed = _BACKENDS[name]
+    if not installed:
+        logger.warning(f"⚠️ Движок регулярных выражений '{name}' не установлен, используется re")
+        return RegexBackend()
+    return backend_class()
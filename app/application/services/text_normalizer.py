@@ -0,0 +1,201 @@
+"""
+Нормализация текста для модерации.
+
+Приводит текст к каноническому виду один раз на сообщение, чтобы словарь
+черного списка можно было искать как обычные подстроки:
+- NFKC и casefold (полноширинные символы, лигатуры, регистр);
+- удаление невидимых символов (zero-width, soft hyphen, комбинируемые диакритики);
+- латинские двойники кириллических букв и цифры-буквы (a→а, o→о, 0→о, 3→з, см. CANONICAL_CHARS);
+- любые пробельные символы → обычный пробел;
+- буквы, разделенные пробелами/точками/дефисами ("х у й", "f.u.c.k"), склеиваются;
+- повторы одного символа схлопываются ("сууука" → "сука").
+
+Каждому символу канонического текста можно сопоставить позицию в исходном
+тексте (offsets), чтобы показать, какой фрагмент сообщения совпал.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Визуальные двойники (после casefold) и цифры/символы вместо букв.
+# Склеиваются только символы, которые выглядят как буква. Отдельные буквы (й, і, ї)
+# и цифры, лишь отдаленно похожие на букву (1, 4, 6), не склеиваются: такие замены
+# паттерны перечисляют сами ([иi1l], [бb6]), а свертка в нормализаторе расширяла
+# все паттерны сразу ("уе6", "ебла4н" совпадали там, где исходный паттерн — нет).
+# Латинская 'p' намеренно не склеивается с 'р': в паттернах она означает 'п' ([пp]).
+CANONICAL_CHARS: Dict[str, str] = {
+    # Латиница → кириллица
+    'a': 'а',
+    'c': 'с',
+    'e': 'е',
+    'i': 'и',
+    'o': 'о',
+    'x': 'х',
+    'y': 'у',
+    # Кириллические варианты
+    'ё': 'е',
+    'є': 'е',  # Украинская є
+    # Цифры и символы вместо букв
+    '0': 'о',
+    '3': 'з',
+    '@': 'а',
+}
+
+# Невидимые символы, которые вставляют внутрь слов, чтобы обойти фильтр
+_INVISIBLE_CHARS = '\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e\u3164\uffa0'
+
+
+def _drop_chars() -> str:
+    """Символы, которые удаляются из текста: невидимые, форматирующие, комбинируемые диакритики."""
+    chars = set(_INVISIBLE_CHARS)
+    # BMP + теги и селекторы вариантов (U+E0000..U+E01EF), которыми прячут текст
+    for code in list(range(0x10000)) + list(range(0xE0000, 0xE01F0)):
+        if unicodedata.category(chr(code)) in ('Mn', 'Me', 'Cf'):
+            chars.add(chr(code))
+    return ''.join(sorted(chars))
+
+
+def _char_class(chars: str) -> str:
+    """Собирает символьный класс регулярного выражения из диапазонов (так он работает быстрее)."""
+    codes = sorted(set(map(ord, chars)))
+    parts = []
+    start = previous = codes[0]
+    for code in codes[1:] + [None]:
+        if code is not None and code == previous + 1:
+            previous = code
+            continue
+        parts.append(re.escape(chr(start)) if start == previous else f"{re.escape(chr(start))}-{re.escape(chr(previous))}")
+        if code is not None:
+            start = previous = code
+    return '[' + ''.join(parts) + ']'
+
+
+_DROP_CHARS = frozenset(_drop_chars())
+_DROP_RE = re.compile(_char_class(''.join(_DROP_CHARS)))
+# Любой пробельный символ, кроме обычного пробела
+_WHITESPACE_RE = re.compile(r'[^\S ]')
+_CANONICAL_PAIRS = tuple(CANONICAL_CHARS.items())
+
+# Цепочка из 3+ одиночных букв, разделенных 1-3 символами-разделителями: "х у й", "f.u.c.k"
+_SPACED_LETTERS_RE = re.compile(r'(?<![^\W_])[^\W_](?![^\W_])(?:[\W_]{1,3}[^\W_](?![^\W_])){2,}')
+_LETTER_RE = re.compile(r'[^\W_]')
+# Повтор одного и того же символа
+_REPEAT_RE = re.compile(r'(.)\1+', re.DOTALL)
+
+
+@dataclass(frozen=True)
+class NormalizedText:
+    """Канонический текст и (опционально) позиции его символов в исходном тексте"""
+    text: str  # Канонический текст
+    offsets: Optional[Tuple[int, ...]] = None  # offsets[i] — индекс символа text[i] в исходном тексте
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Переводит диапазон канонического текста в диапазон исходного текста.
+
+        :param start: Начало диапазона в каноническом тексте
+        :param end: Конец диапазона (не включая) в каноническом тексте
+        :return: (start, end) в исходном тексте
+        """
+        if self.offsets is None:
+            raise ValueError("NormalizedText создан без offsets (with_offsets=False)")
+        if start >= end:
+            position = self.offsets[start] if start < len(self.offsets) else (self.offsets[-1] + 1 if self.offsets else 0)
+            return position, position
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+
+def fold_char(char: str) -> str:
+    """
+    Канонический вид одного символа (может быть пустым или длиннее одного символа).
+    Используется и для перевода паттернов черного списка в канонический вид.
+
+    :param char: Символ
+    :return: Канонический вид
+    """
+    result = []
+    for folded in unicodedata.normalize('NFKC', char).casefold():
+        if folded in _DROP_CHARS:
+            continue
+        if folded.isspace():
+            folded = ' '
+        result.append(CANONICAL_CHARS.get(folded, folded))
+    return ''.join(result)
+
+
+def _fold_chars(text: str, offsets: Optional[List[int]]) -> Tuple[str, Optional[List[int]]]:
+    """NFKC + casefold + удаление невидимых символов + двойники и цифры-буквы."""
+    folded = text.casefold()
+    if (len(folded) == len(text) and unicodedata.is_normalized('NFKC', text)
+            and not _DROP_RE.search(folded)):
+        # Быстрый путь: длина не меняется, позиции символов остаются прежними
+        folded = _WHITESPACE_RE.sub(' ', folded)
+        for char, canonical in _CANONICAL_PAIRS:
+            if char in folded:
+                folded = folded.replace(char, canonical)
+        return folded, offsets
+
+    # Медленный путь: длина меняется — собираем посимвольно, запоминая источник
+    chars: List[str] = []
+    new_offsets: Optional[List[int]] = [] if offsets is not None else None
+    for index, char in enumerate(text):
+        piece = fold_char(char)
+        if not piece:
+            continue
+        chars.append(piece)
+        if new_offsets is not None:
+            new_offsets.extend([offsets[index]] * len(piece))
+    return ''.join(chars), new_offsets
+
+
+def _keep_only(text: str, offsets: Optional[List[int]], pattern: re.Pattern, keep) -> Tuple[str, Optional[List[int]]]:
+    """
+    Заменяет каждое совпадение pattern на подмножество его символов.
+
+    :param keep: Функция match → список индексов (внутри text), которые нужно оставить
+    """
+    if offsets is None:
+        return pattern.sub(lambda match: ''.join(text[i] for i in keep(match)), text), None
+
+    chars: List[str] = []
+    new_offsets: List[int] = []
+    position = 0
+    for match in pattern.finditer(text):
+        chars.append(text[position:match.start()])
+        new_offsets.extend(offsets[position:match.start()])
+        for index in keep(match):
+            chars.append(text[index])
+            new_offsets.append(offsets[index])
+        position = match.end()
+    chars.append(text[position:])
+    new_offsets.extend(offsets[position:])
+    return ''.join(chars), new_offsets
+
+
+def _spaced_letters(match: re.Match) -> List[int]:
+    """Оставляет только буквы цепочки "х у й"."""
+    return [letter.start() for letter in _LETTER_RE.finditer(match.string, match.start(), match.end())]
+
+
+def _first_of_repeat(match: re.Match) -> List[int]:
+    """Оставляет первый символ из серии повторов."""
+    return [match.start()]
+
+
+def normalize_text(text: str, with_offsets: bool = False) -> NormalizedText:
+    """
+    Приводит текст к каноническому виду для поиска по словарю.
+
+    :param text: Исходный текст
+    :param with_offsets: Строить ли карту позиций в исходный текст (дороже, нужна только для найденных нарушений)
+    :return: NormalizedText
+    """
+    if not text:
+        return NormalizedText(text="", offsets=() if with_offsets else None)
+
+    offsets: Optional[List[int]] = list(range(len(text))) if with_offsets else None
+    result, offsets = _fold_chars(text, offsets)
+    result, offsets = _keep_only(result, offsets, _SPACED_LETTERS_RE, _spaced_letters)
+    result, offsets = _keep_only(result, offsets, _REPEAT_RE, _first_of_repeat)
+    return NormalizedText(text=result, offsets=tuple(offsets) if offsets is not None else None)
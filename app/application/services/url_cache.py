@@ -0,0 +1,144 @@
+"""
+Кэш текста веб-страниц по URL.
+
+Одна и та же ссылка (новость, пост) приходит в десятках комментариев:
+текст страницы хранится в памяти процесса и общий для всех вызовов
+prepare_message_content. Запись свежая URL_CACHE_TTL секунд, после этого
+страница перепроверяется условным запросом (If-None-Match / If-Modified-Since
+по сохраненным ETag / Last-Modified): ответ 304 продлевает запись без
+повторного скачивания и разбора. Неудачная загрузка (ошибка, таймаут,
+статус не 200) запоминается на URL_CACHE_NEGATIVE_TTL секунд, чтобы
+недоступный сайт не ждали в каждом комментарии. Одновременные запросы
+одного URL объединяются в одну загрузку.
+Размер кэша ограничен URL_CACHE_MAX_MB: вытесняются давно не использованные записи.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UrlCacheEntry:
+    """Запись кэша страницы"""
+    text: Optional[str]  # Текст страницы (None — загрузка не удалась)
+    expires_at: float  # Момент (time.monotonic), до которого запись свежая
+    etag: Optional[str] = None  # ETag ответа для If-None-Match
+    last_modified: Optional[str] = None  # Last-Modified ответа для If-Modified-Since
+
+    @property
+    def size(self) -> int:
+        """Примерный объем записи в байтах (текст в UTF-8 занимает до 2 байт на кириллический символ)."""
+        return 2 * len(self.text or "") + 200
+
+    @property
+    def revalidatable(self) -> bool:
+        """Можно ли перепроверить устаревшую запись условным запросом."""
+        return self.text is not None and bool(self.etag or self.last_modified)
+
+
+def cache_url(url: str) -> str:
+    """Ключ кэша: URL без фрагмента (#...), фрагмент на сервер не отправляется."""
+    return url.split("#", 1)[0]
+
+
+class UrlCache:
+    """LRU-кэш текста страниц с TTL, отрицательным кэшем и объединением одновременных загрузок"""
+
+    def __init__(self, max_bytes: int, ttl: float, negative_ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, UrlCacheEntry]" = OrderedDict()
+        self._size = 0
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def lookup(self, url: str) -> Tuple[Optional[UrlCacheEntry], bool]:
+        """
+        Ищет страницу в кэше.
+
+        :param url: URL страницы
+        :return: (запись или None, свежая ли запись). Устаревшая запись с ETag/Last-Modified
+                 возвращается для условного запроса, остальные устаревшие удаляются
+        """
+        if self.max_bytes <= 0:
+            return None, False
+        key = cache_url(url)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        if time.monotonic() < entry.expires_at:
+            self.hits += 1
+            return entry, True
+        self.misses += 1
+        if not entry.revalidatable:
+            self._remove(key)
+            return None, False
+        return entry, False
+
+    def store(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Сохраняет текст страницы (с ETag/Last-Modified ответа, если есть)."""
+        self._put(url, UrlCacheEntry(text, time.monotonic() + self.ttl, etag, last_modified))
+
+    def store_failure(self, url: str):
+        """Запоминает неудачную загрузку на negative_ttl секунд."""
+        self._put(url, UrlCacheEntry(None, time.monotonic() + self.negative_ttl))
+
+    def revalidated(self, url: str, entry: UrlCacheEntry):
+        """Продлевает запись после ответа 304 Not Modified."""
+        self.revalidations += 1
+        entry.expires_at = time.monotonic() + self.ttl
+        if cache_url(url) not in self._entries:
+            self._put(url, entry)
+
+    async def load(self, url: str, loader: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Загружает страницу, объединяя одновременные запросы одного URL:
+        пока загрузка идет, остальные вызовы ждут ее результат. Отмена одного
+        ожидающего (таймаут обработки сообщения) не прерывает загрузку для других.
+
+        :param url: URL страницы
+        :param loader: Загрузка страницы (сама сохраняет результат в кэш)
+        :return: Результат loader
+        """
+        key = cache_url(url)
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _put(self, url: str, entry: UrlCacheEntry):
+        if self.max_bytes <= 0 or entry.size > self.max_bytes:
+            return
+        key = cache_url(url)
+        self._remove(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+url_cache = UrlCache(
+    max_bytes=settings.URL_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.URL_CACHE_TTL,
+    negative_ttl=settings.URL_CACHE_NEGATIVE_TTL,
+)
@@ -0,0 +1,122 @@
+"""
+Ограничения одновременной загрузки страниц по ссылкам.
+
+Все ссылки сообщения скачиваются параллельно, но:
+- одновременно идет не больше URL_FETCH_CONCURRENCY загрузок на весь бот;
+- к одному домену — не больше URL_FETCH_PER_DOMAIN (сайт не заваливается
+  запросами из десятков комментариев с одной ссылкой);
+- домен, который URL_BREAKER_FAILURES раз подряд не ответил (таймаут, ошибка
+  соединения), пропускается URL_BREAKER_COOLDOWN секунд без запросов
+  (circuit breaker). После паузы разрешается одна пробная загрузка: удачная
+  возвращает домен в работу, неудачная снова выключает его.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict
+from urllib.parse import urlparse
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def url_domain(url: str) -> str:
+    """Домен ссылки в нижнем регистре ('' — не удалось разобрать)."""
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+@dataclass
+class _DomainState:
+    """Состояние домена: очередь загрузок и счетчик неудач"""
+    semaphore: asyncio.Semaphore
+    users: int = 0  # Загрузок, которые ждут или занимают семафор
+    failures: int = 0  # Неудачных загрузок подряд
+    open_until: float = 0.0  # До какого момента (time.monotonic) домен пропускается
+
+
+class UrlFetchLimits:
+    """Общий и доменные лимиты одновременных загрузок + circuit breaker по доменам"""
+
+    def __init__(self, concurrency: int, per_domain: int, failure_threshold: int, cooldown: float):
+        self.per_domain = max(1, per_domain)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._global = asyncio.Semaphore(max(1, concurrency))
+        self._domains: Dict[str, _DomainState] = {}
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _DomainState(asyncio.Semaphore(self.per_domain))
+        return state
+
+    def _forget_idle(self, domain: str):
+        """Удаляет состояние домена без загрузок и неудач (словарь не растет бесконечно)."""
+        state = self._domains.get(domain)
+        if state is not None and state.users == 0 and state.failures == 0:
+            del self._domains[domain]
+
+    def allows(self, domain: str) -> bool:
+        """
+        Можно ли сейчас загружать страницу с домена.
+
+        :param domain: Домен (url_domain)
+        :return: False — домен выключен после серии неудач (или уже идет пробная загрузка)
+        """
+        state = self._domains.get(domain)
+        if state is None or self.failure_threshold <= 0 or state.failures < self.failure_threshold:
+            return True
+        now = time.monotonic()
+        if now < state.open_until:
+            return False
+        # Пауза прошла: пропускаем одну пробную загрузку, остальные ждут ее результата
+        # (если проба не отчиталась — например, была отменена, — следующая через cooldown)
+        state.open_until = now + self.cooldown
+        return True
+
+    def record_success(self, domain: str):
+        """Загрузка удалась: счетчик неудач домена сбрасывается."""
+        state = self._domains.get(domain)
+        if state is None:
+            return
+        if state.failures >= self.failure_threshold > 0:
+            logger.info(f"✅ Домен {domain} снова отвечает, загрузки возобновлены")
+        state.failures = 0
+        self._forget_idle(domain)
+
+    def record_failure(self, domain: str):
+        """Таймаут или ошибка соединения: после failure_threshold подряд домен выключается на cooldown."""
+        state = self._state(domain)
+        state.failures += 1
+        if self.failure_threshold > 0 and state.failures >= self.failure_threshold:
+            state.open_until = time.monotonic() + self.cooldown
+            logger.warning(
+                f"⚠️ Домен {domain} не ответил {state.failures} раз подряд, "
+                f"ссылки на него пропускаются {self.cooldown:g} с"
+            )
+
+    @asynccontextmanager
+    async def slot(self, domain: str) -> AsyncIterator[None]:
+        """Место для загрузки: сначала в очереди домена, затем в общей."""
+        state = self._state(domain)
+        state.users += 1
+        try:
+            async with state.semaphore, self._global:
+                yield
+        finally:
+            state.users -= 1
+            self._forget_idle(domain)
+
+
+url_fetch_limits = UrlFetchLimits(
+    concurrency=settings.URL_FETCH_CONCURRENCY,
+    per_domain=settings.URL_FETCH_PER_DOMAIN,
+    failure_threshold=settings.URL_BREAKER_FAILURES,
+    cooldown=settings.URL_BREAKER_COOLDOWN,
+)
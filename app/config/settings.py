@@ -16,6 +16,36 @@ class Settings(BaseSettings):
     DB_URL: str = Field("sqlite+aiosqlite:///app.db", env="DB_URL")
     OPENAI_API_KEY: str = Field(default="", env="OPENAI_API_KEY")  # OpenAI API Key для AI-функций
     GEMINI_API_KEY: str = Field(default="", env="GEMINI_API_KEY")  # Gemini API Key (опционально)
+    MODERATION_TIME_BUDGET_MS: int = Field(default=100, env="MODERATION_TIME_BUDGET_MS")  # Бюджет на рискованные паттерны blacklist для одного текста
+    MODERATION_VERDICT_CACHE_SIZE: int = Field(default=20000, env="MODERATION_VERDICT_CACHE_SIZE")  # Вердиктов blacklist в LRU-кэше (0 — выключен)
+    MODERATION_INLINE_MAX_CHARS: int = Field(default=2000, env="MODERATION_INLINE_MAX_CHARS")  # Тексты до этой длины проверяются в обработчике, длиннее — в потоке
+    MODERATION_PROCESS_MIN_CHARS: int = Field(default=0, env="MODERATION_PROCESS_MIN_CHARS")  # Тексты от этой длины проверяются в отдельном процессе (0 — без процессов, экономит RAM)
+    MODERATION_PROCESS_WORKERS: int = Field(default=1, env="MODERATION_PROCESS_WORKERS")  # Процессов для проверки blacklist
+    MODERATION_ARTIFACT_PATH: str = Field(default="", env="MODERATION_ARTIFACT_PATH")  # Файл предкомпилированного матчера blacklist (пусто — data/moderation_matcher.pkl в корне проекта)
+    MODERATION_REGEX_BACKEND: str = Field(default="re", env="MODERATION_REGEX_BACKEND")  # Движок паттернов blacklist: re, regex или re2 (если не установлен — re)
+    HTTP_POOL_LIMIT: int = Field(default=30, env="HTTP_POOL_LIMIT")  # Всего соединений в общей HTTP-сессии (скачивание файлов и страниц)
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(default=8, env="HTTP_POOL_LIMIT_PER_HOST")  # Соединений к одному хосту (api.telegram.org и др.)
+    HTTP_KEEPALIVE_TIMEOUT: float = Field(default=30.0, env="HTTP_KEEPALIVE_TIMEOUT")  # Сколько секунд держать простаивающее соединение открытым
+    HTTP_DNS_CACHE_TTL: int = Field(default=300, env="HTTP_DNS_CACHE_TTL")  # Кэш DNS общей HTTP-сессии, секунд
+    CONTENT_CACHE_TTL_DAYS: int = Field(default=30, env="CONTENT_CACHE_TTL_DAYS")  # Сколько дней хранить извлеченный контент файлов (описания фото, тексты, транскрипции)
+    CONTENT_CACHE_MAX_MB: int = Field(default=20, env="CONTENT_CACHE_MAX_MB")  # Максимальный размер кэша контента в БД (0 — кэш выключен)
+    PARSER_PROCESS_WORKERS: int = Field(default=1, env="PARSER_PROCESS_WORKERS")  # Процессов для разбора документов (0 — разбор в потоке)
+    PARSER_TASK_TIMEOUT: float = Field(default=30.0, env="PARSER_TASK_TIMEOUT")  # Максимум секунд на разбор одного файла (затем воркер убивается)
+    PARSER_MEMORY_LIMIT_MB: int = Field(default=300, env="PARSER_MEMORY_LIMIT_MB")  # Сколько MB виртуальной памяти процесс разбора может занять сверх унаследованной от бота (0 — без лимита)
+    PARSER_MAX_RSS_MB: int = Field(default=150, env="PARSER_MAX_RSS_MB")  # Процесс разбора перезапускается, если его пиковый RSS вырос больше чем на столько MB
+    PARSER_MAX_TASKS: int = Field(default=50, env="PARSER_MAX_TASKS")  # Процессы разбора перезапускаются после стольких файлов (0 — без перезапуска)
+    URL_CACHE_TTL: int = Field(default=3600, env="URL_CACHE_TTL")  # Сколько секунд текст страницы по ссылке свежий (затем перепроверяется по ETag/Last-Modified)
+    URL_CACHE_NEGATIVE_TTL: int = Field(default=300, env="URL_CACHE_NEGATIVE_TTL")  # Сколько секунд помнить неудачную загрузку страницы (ошибка, таймаут, статус не 200)
+    URL_CACHE_MAX_MB: int = Field(default=5, env="URL_CACHE_MAX_MB")  # Максимальный размер кэша страниц в памяти (0 — кэш выключен)
+    URL_PAGE_MAX_KB: int = Field(default=2048, env="URL_PAGE_MAX_KB")  # Сколько KB страницы по ссылке скачивается для извлечения текста (остаток не читается)
+    URL_MAX_PER_MESSAGE: int = Field(default=5, env="URL_MAX_PER_MESSAGE")  # Сколько ссылок сообщения обрабатывается (остальные игнорируются)
+    URL_MESSAGE_BUDGET: float = Field(default=8.0, env="URL_MESSAGE_BUDGET")  # Секунд на все ссылки сообщения (не успевшие страницы не попадают в текст)
+    URL_FETCH_CONCURRENCY: int = Field(default=8, env="URL_FETCH_CONCURRENCY")  # Одновременных загрузок страниц на весь бот
+    URL_FETCH_PER_DOMAIN: int = Field(default=2, env="URL_FETCH_PER_DOMAIN")  # Одновременных загрузок с одного домена
+    URL_BREAKER_FAILURES: int = Field(default=3, env="URL_BREAKER_FAILURES")  # После стольких таймаутов/ошибок соединения подряд домен пропускается (0 — не пропускать)
+    URL_BREAKER_COOLDOWN: float = Field(default=300.0, env="URL_BREAKER_COOLDOWN")  # Сколько секунд пропускать недоступный домен
+    URL_PREVIEW_MIN_CHARS: int = Field(default=60, env="URL_PREVIEW_MIN_CHARS")  # Ссылка под текстом такой длины (заголовок статьи в сообщении) не скачивается (0 — скачивать всегда)
+    CONTENT_PREPARE_TIMEOUT: float = Field(default=75.0, env="CONTENT_PREPARE_TIMEOUT")  # Общий срок подготовки контента сообщения (URL, фото, документ, аудио обрабатываются параллельно)
 
     @staticmethod
     def parse_admin_ids(admin_ids_str: str) -> List[int]:
@@ -1,5 +1,5 @@
 """
-SQLAlchemy ORM models: User, Ban, Warn, Log, Blacklist, ScheduledPost, AiUsage.
+SQLAlchemy ORM models: User, Ban, Warn, Log, Blacklist, BlacklistVersion, BlacklistChange, ScheduledPost, AiUsage, ContentCacheItem.
 """
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
@@ -67,6 +67,27 @@ class BlacklistItem(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     added_by = Column(Integer, nullable=True)  # admin_id
 
+class BlacklistVersion(Base):
+    """Версия черного списка: увеличивается при каждом изменении таблицы blacklist."""
+    __tablename__ = "blacklist_version"
+    id = Column(Integer, primary_key=True)  # Всегда одна строка с id=1
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class BlacklistChange(Base):
+    """
+    Журнал изменений черного списка. id растет монотонно, поэтому процессы бота
+    по последнему примененному id забирают только новые изменения (дельту).
+    """
+    __tablename__ = "blacklist_changes"
+    ADD = "add"  # Фраза добавлена
+    REMOVE = "remove"  # Фраза удалена
+    CLEAR = "clear"  # Таблица очищена целиком (процессы перечитывают список)
+    id = Column(Integer, primary_key=True)
+    action = Column(String(16), nullable=False)  # ADD, REMOVE или CLEAR
+    phrase = Column(String(255), nullable=True)  # Фраза (для CLEAR не задается)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class Log(Base):
     __tablename__ = "logs"
     id = Column(Integer, primary_key=True)
@@ -112,4 +133,18 @@ class PostComment(Base):
     is_bot_comment = Column(Boolean, default=False, nullable=False)  # Флаг: комментарий от бота или пользователя
     content = Column(Text, nullable=False)  # Полный обработанный контент (текст + медиа)
     content_type = Column(String(50), nullable=True)  # Тип контента: text, photo, document, voice, audio, etc.
-    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)  # Время создания
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)  # Время создания
+
+class ContentCacheItem(Base):
+    """
+    Кэш извлеченного контента файлов Telegram: описание фото, текст PDF/документа,
+    транскрипция аудио. Ключ — file_unique_id (один и тот же для пересланного
+    и повторно отправленного файла) и версия обработчика.
+    """
+    __tablename__ = "content_cache"
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(128), nullable=False, unique=True, index=True)  # "<вид>:<версия обработчика>:<file_unique_id>"
+    content = Column(Text, nullable=False)  # Извлеченный текст
+    size = Column(Integer, nullable=False, default=0)  # Размер content в байтах (UTF-8), для ограничения кэша
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)  # Время извлечения (TTL)
+    accessed_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)  # Последнее обращение (вытеснение)
@@ -4,7 +4,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import Optional, List
-from .models import User, Ban, Warn, BlacklistItem, Log, UserStatus, Admin, PostComment
+from .models import User, Ban, Warn, BlacklistItem, BlacklistVersion, BlacklistChange, Log, UserStatus, Admin, PostComment, ContentCacheItem
 from sqlalchemy import delete, update, func
 import datetime
 
@@ -128,6 +128,7 @@ class BlacklistRepository:
     @staticmethod
     async def add(session: AsyncSession, item: BlacklistItem) -> BlacklistItem:
         session.add(item)
+        await BlacklistRepository.record_change(session, BlacklistChange.ADD, item.phrase)
         await session.commit()
         await session.refresh(item)
         return item
@@ -144,7 +145,9 @@ class BlacklistRepository:
 
     @staticmethod
     async def delete_by_phrase(session: AsyncSession, phrase: str):
-        await session.execute(delete(BlacklistItem).where(BlacklistItem.phrase == phrase))
+        result = await session.execute(delete(BlacklistItem).where(BlacklistItem.phrase == phrase))
+        if result.rowcount:
+            await BlacklistRepository.record_change(session, BlacklistChange.REMOVE, phrase)
         await session.commit()
 
     @staticmethod
@@ -152,6 +155,71 @@ class BlacklistRepository:
         q = await session.execute(select(func.count(BlacklistItem.id)))
         return q.scalar() or 0
 
+    @staticmethod
+    async def get_version(session: AsyncSession) -> int:
+        """Текущая версия черного списка (0, если список ещё не менялся)."""
+        q = await session.execute(select(BlacklistVersion.version).where(BlacklistVersion.id == 1))
+        return q.scalar() or 0
+
+    @staticmethod
+    async def bump_version(session: AsyncSession):
+        """
+        Увеличивает версию черного списка в текущей транзакции (без commit),
+        чтобы изменение фраз и новая версия фиксировались атомарно.
+        Строка версии создается в async_init_db, здесь только UPDATE
+        (вставка "если строки нет" гонялась бы между процессами).
+        """
+        await session.execute(
+            update(BlacklistVersion).where(BlacklistVersion.id == 1)
+            .values(version=BlacklistVersion.version + 1)
+        )
+
+    @staticmethod
+    async def record_change(session: AsyncSession, action: str, phrase: Optional[str] = None):
+        """
+        Записывает изменение в журнал blacklist_changes и увеличивает версию
+        в текущей транзакции (без commit).
+
+        :param action: BlacklistChange.ADD, REMOVE или CLEAR
+        :param phrase: Фраза (для CLEAR не нужна)
+        """
+        session.add(BlacklistChange(action=action, phrase=phrase))
+        await BlacklistRepository.bump_version(session)
+
+    @staticmethod
+    async def get_last_change_id(session: AsyncSession) -> int:
+        """id последней записи журнала изменений (0, если журнал пуст)."""
+        q = await session.execute(select(func.max(BlacklistChange.id)))
+        return q.scalar() or 0
+
+    @staticmethod
+    async def get_changes_since(session: AsyncSession, after_id: int, limit: int = 1000) -> List[BlacklistChange]:
+        """
+        Изменения черного списка после указанного id (по возрастанию id).
+        Если изменений нет — один запрос по первичному ключу без чтения таблицы blacklist.
+
+        :param after_id: id последнего уже примененного изменения
+        :param limit: Максимум изменений за один раз
+        """
+        q = await session.execute(
+            select(BlacklistChange).where(BlacklistChange.id > after_id)
+            .order_by(BlacklistChange.id).limit(limit)
+        )
+        return q.scalars().all()
+
+    @staticmethod
+    async def prune_changes(session: AsyncSession, keep_last: int = 1000) -> int:
+        """
+        Удаляет старые записи журнала изменений, оставляя последние keep_last.
+        Процесс, отставший дальше удаленных записей, перечитает список целиком.
+
+        :return: Количество удаленных записей
+        """
+        last_id = await BlacklistRepository.get_last_change_id(session)
+        result = await session.execute(delete(BlacklistChange).where(BlacklistChange.id <= last_id - keep_last))
+        await session.commit()
+        return result.rowcount
+
 class LogRepository:
     @staticmethod
     async def add(session: AsyncSession, log: Log) -> Log:
@@ -377,6 +445,44 @@ class PostCommentRepository:
         await session.commit()
         return result.rowcount
     
+    @staticmethod
+    async def get_chunk_since(
+        session: AsyncSession,
+        since: datetime.datetime,
+        after_id: int = 0,
+        limit: int = 500,
+        include_bot: bool = False
+    ) -> List:
+        """
+        Получить очередную порцию комментариев, созданных после указанной даты.
+        Порции выбираются по возрастанию id (keyset-пагинация), поэтому весь
+        период не загружается в память. Возвращаются строки только с нужными
+        колонками, без ORM-объектов.
+        
+        :param session: Сессия БД
+        :param since: Начало периода
+        :param after_id: id последнего комментария из предыдущей порции
+        :param limit: Размер порции
+        :param include_bot: Включать ли комментарии бота
+        :return: Строки (id, post_message_id, comment_message_id, user_id, content, created_at)
+        """
+        query = (
+            select(
+                PostComment.id,
+                PostComment.post_message_id,
+                PostComment.comment_message_id,
+                PostComment.user_id,
+                PostComment.content,
+                PostComment.created_at,
+            )
+            .where(PostComment.created_at >= since)
+            .where(PostComment.id > after_id)
+        )
+        if not include_bot:
+            query = query.where(PostComment.is_bot_comment == False)
+        q = await session.execute(query.order_by(PostComment.id).limit(limit))
+        return list(q.all())
+    
     @staticmethod
     async def count_by_post(session: AsyncSession, post_message_id: int) -> int:
         """Подсчитать количество комментариев к посту."""
@@ -385,3 +491,79 @@ class PostCommentRepository:
             .where(PostComment.post_message_id == post_message_id)
         )
         return q.scalar() or 0
+
+class ContentCacheRepository:
+    """Репозиторий кэша извлеченного контента файлов (content_cache)."""
+
+    @staticmethod
+    async def get(session: AsyncSession, cache_key: str, since: datetime.datetime) -> Optional[str]:
+        """
+        Контент по ключу, если он извлечен не раньше since; отмечает обращение.
+
+        :param session: Сессия БД
+        :param cache_key: Ключ записи
+        :param since: Граница TTL (более старые записи не возвращаются)
+        :return: Контент или None
+        """
+        q = await session.execute(
+            select(ContentCacheItem.id, ContentCacheItem.content)
+            .where(ContentCacheItem.cache_key == cache_key)
+            .where(ContentCacheItem.created_at >= since)
+        )
+        row = q.first()
+        if row is None:
+            return None
+        await session.execute(
+            update(ContentCacheItem).where(ContentCacheItem.id == row.id)
+            .values(accessed_at=datetime.datetime.utcnow())
+        )
+        await session.commit()
+        return row.content
+
+    @staticmethod
+    async def put(session: AsyncSession, cache_key: str, content: str):
+        """Сохраняет контент (заменяет запись с тем же ключом)."""
+        now = datetime.datetime.utcnow()
+        await session.execute(delete(ContentCacheItem).where(ContentCacheItem.cache_key == cache_key))
+        session.add(ContentCacheItem(
+            cache_key=cache_key, content=content, size=len(content.encode("utf-8")),
+            created_at=now, accessed_at=now,
+        ))
+        await session.commit()
+
+    @staticmethod
+    async def get_total_size(session: AsyncSession) -> int:
+        """Суммарный размер контента в кэше (байт)."""
+        q = await session.execute(select(func.sum(ContentCacheItem.size)))
+        return q.scalar() or 0
+
+    @staticmethod
+    async def prune(session: AsyncSession, before: datetime.datetime, max_bytes: int) -> int:
+        """
+        Удаляет записи старше before, затем давно не использованные записи,
+        пока кэш не уложится в max_bytes.
+
+        :param session: Сессия БД
+        :param before: Граница TTL
+        :param max_bytes: Максимальный суммарный размер контента
+        :return: Количество удаленных записей
+        """
+        result = await session.execute(delete(ContentCacheItem).where(ContentCacheItem.created_at < before))
+        deleted = result.rowcount
+        excess = await ContentCacheRepository.get_total_size(session) - max_bytes
+        if excess > 0:
+            # Самые давно использованные записи, пока не наберется превышение
+            q = await session.execute(
+                select(ContentCacheItem.id, ContentCacheItem.size).order_by(ContentCacheItem.accessed_at)
+            )
+            stale_ids = []
+            for row in q.all():
+                if excess <= 0:
+                    break
+                stale_ids.append(row.id)
+                excess -= row.size
+            if stale_ids:
+                result = await session.execute(delete(ContentCacheItem).where(ContentCacheItem.id.in_(stale_ids)))
+                deleted += result.rowcount
+        await session.commit()
+        return deleted
@@ -6,8 +6,9 @@ import logging
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy import inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.config.settings import settings
-from app.infrastructure.db.models import Base, UserStatus, Admin, PostComment  # Импортируем все модели для создания таблиц
+from app.infrastructure.db.models import Base, UserStatus, Admin, PostComment, BlacklistVersion  # Импортируем все модели для создания таблиц
 from app.common.error_handler import handle_sync_error, ErrorContext, ErrorSeverity
 
 logger = logging.getLogger(__name__)
@@ -40,9 +41,21 @@ async def async_init_db():
         
         # Проверяем и добавляем отсутствующие колонки
         await _migrate_users_table(conn)
+
+        # Строка версии черного списка создается один раз здесь, а не при первом изменении
+        await _seed_blacklist_version(conn)
     
     logger.info("[DB INIT] Все нужные таблицы созданы (если отсутствовали).")
 
+async def _seed_blacklist_version(conn):
+    """
+    Создает строку версии черного списка (id=1), если ее нет.
+    INSERT OR IGNORE: одновременный старт нескольких процессов не падает на дубликате.
+    """
+    await conn.execute(
+        sqlite_insert(BlacklistVersion).values(id=1, version=0).on_conflict_do_nothing(index_elements=["id"])
+    )
+
 async def _migrate_users_table(conn):
     """
     Миграция: добавляет отсутствующие колонки в таблицу users (status, warn_count).
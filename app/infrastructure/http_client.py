@@ -0,0 +1,69 @@
+"""
+Общая HTTP-сессия aiohttp для скачивания контента.
+
+Одна сессия на процесс с пулом соединений: файлы с api.telegram.org,
+PDF, документы и веб-страницы скачиваются по уже открытым соединениям
+(keep-alive) без повторного DNS-запроса и TLS-рукопожатия.
+Сессия создается при старте бота (app/main.py) и закрывается при остановке;
+скрипты и проверки, которые не вызывают init_http_session(), получают ее
+при первом обращении.
+"""
+import logging
+from typing import Optional
+
+import aiohttp
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """Создает сессию с пулом соединений по настройкам HTTP_*."""
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    # Общий таймаут — страховка; запросы задают свои (10 с для страниц, 60 с для файлов)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120))
+
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """
+    Создает общую сессию (вызывается при старте бота, внутри event loop).
+
+    :return: Сессия aiohttp
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info(
+            f"🌐 HTTP-сессия создана: до {settings.HTTP_POOL_LIMIT} соединений, "
+            f"до {settings.HTTP_POOL_LIMIT_PER_HOST} на хост, keep-alive {settings.HTTP_KEEPALIVE_TIMEOUT} с"
+        )
+    return _session
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Общая сессия для запросов (не закрывать после использования).
+
+    :return: Сессия aiohttp; создается при первом обращении, если init_http_session() не вызывался
+    """
+    if _session is None or _session.closed:
+        return await init_http_session()
+    return _session
+
+
+async def close_http_session():
+    """Закрывает общую сессию и ее соединения (при остановке бота)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("✅ HTTP-сессия закрыта")
+    _session = None
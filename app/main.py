@@ -9,9 +9,12 @@ from app.presentation.routers.user_router import user_router
 from app.presentation.routers.admin_router import admin_router
 from app.presentation.routers.channel_router import channel_router
 from app.infrastructure.db.session import async_init_db, get_async_session
-from app.infrastructure.db.repositories import AdminRepository, LogRepository, PostCommentRepository
+from app.infrastructure.db.repositories import AdminRepository, BlacklistRepository, LogRepository, PostCommentRepository
 from app.application.services.user_service import unban_expired_users, register_user
+from app.application.services.moderation_service import blacklist_cache, moderation_executor
+from app.application.services.parser_pool import parser_pool
 from app.infrastructure.ai_clients import init_ai_clients
+from app.infrastructure.http_client import init_http_session, close_http_session
 from app.application.services.comment_service import CommentService
 from app.application.services import set_comment_service, set_ai_clients
 from app.common.logger import setup_logging
@@ -64,6 +67,11 @@ async def cleanup_old_logs_periodically():
                     deleted_count = await LogRepository.delete_old_logs(session, days=30)
                     if deleted_count > 0:
                         logger.info(f"🧹 Удалено логов старше 30 дней: {deleted_count}")
+                
+                # Журнал изменений blacklist: процессам нужны только последние записи
+                pruned_count = await BlacklistRepository.prune_changes(session, keep_last=1000)
+                if pruned_count > 0:
+                    logger.info(f"🧹 Удалено старых записей журнала blacklist: {pruned_count}")
         except asyncio.CancelledError:
             # Задача была отменена - это нормально при остановке бота
             break
@@ -103,6 +111,28 @@ async def cleanup_old_comments_periodically():
             # Ждем перед следующей попыткой даже при ошибке
             await asyncio.sleep(3600)  # 1 час при ошибке
 
+async def refresh_blacklist_cache_periodically():
+    """Фоновая задача: подхватывает изменения blacklist из других процессов (скрипты, второй бот)"""
+    while True:
+        try:
+            # Забираем новые записи журнала blacklist_changes каждые 30 секунд
+            # (один SELECT по первичному ключу; применяется только дельта)
+            await asyncio.sleep(30)
+            await blacklist_cache.refresh_if_changed()
+        except asyncio.CancelledError:
+            # Задача была отменена - это нормально при остановке бота
+            break
+        except Exception as e:
+            await handle_error(
+                error=e,
+                context=ErrorContext(
+                    operation="refresh_blacklist_cache_periodically",
+                    severity=ErrorSeverity.MEDIUM
+                )
+            )
+            # Ждем перед следующей попыткой даже при ошибке
+            await asyncio.sleep(60)  # 1 минута при ошибке
+
 async def initialize_admins():
     """
     Загрузить начальных администраторов из .env в БД (если БД пуста).
@@ -194,6 +224,21 @@ async def main():
     # Инициализируем администраторов из .env (если БД пуста)
     await initialize_admins()
     
+    # Загружаем blacklist в кэш заранее, чтобы первая проверка не ждала БД
+    try:
+        await blacklist_cache.reload()
+    except Exception as e:
+        await handle_error(
+            error=e,
+            context=ErrorContext(
+                operation="main.load_blacklist_cache",
+                severity=ErrorSeverity.MEDIUM
+            )
+        )
+    
+    # Общая HTTP-сессия с пулом соединений для скачивания файлов, PDF и страниц
+    await init_http_session()
+    
     # Инициализируем AI клиенты и сервис комментариев
     try:
         ai_clients = init_ai_clients()
@@ -266,6 +311,7 @@ async def main():
     ban_check_task = None
     logs_cleanup_task = None
     comments_cleanup_task = None
+    blacklist_refresh_task = None
     try:
         ban_check_task = asyncio.create_task(check_expired_bans_periodically())
         logger.info("✅ Запущена фоновая задача для проверки истекших банов (каждый час)")
@@ -276,6 +322,9 @@ async def main():
         comments_cleanup_task = asyncio.create_task(cleanup_old_comments_periodically())
         logger.info("✅ Запущена фоновая задача для очистки старых комментариев (каждые 24 часа)")
         
+        blacklist_refresh_task = asyncio.create_task(refresh_blacklist_cache_periodically())
+        logger.info("✅ Запущена фоновая задача для обновления кэша blacklist (каждые 30 секунд)")
+        
         await dp.start_polling(bot, drop_pending_updates=True)
     except KeyboardInterrupt:
         logger.info("\n⚠️  Получен сигнал остановки (Ctrl+C)...")
@@ -343,6 +392,59 @@ async def main():
                     )
                 )
         
+        if blacklist_refresh_task:
+            try:
+                blacklist_refresh_task.cancel()
+                try:
+                    await blacklist_refresh_task
+                except asyncio.CancelledError:
+                    pass  # Нормально - задача отменена
+                logger.info("✅ Фоновая задача обновления кэша blacklist остановлена")
+            except Exception as e:
+                await handle_error(
+                    error=e,
+                    context=ErrorContext(
+                        operation="main.stop_blacklist_refresh_task",
+                        severity=ErrorSeverity.LOW
+                    )
+                )
+        
+        # Останавливаем процессы проверки blacklist (если запускались)
+        try:
+            moderation_executor.shutdown()
+        except Exception as e:
+            await handle_error(
+                error=e,
+                context=ErrorContext(
+                    operation="main.shutdown_moderation_executor",
+                    severity=ErrorSeverity.LOW
+                )
+            )
+        
+        # Останавливаем процессы разбора документов (если запускались)
+        try:
+            parser_pool.shutdown()
+        except Exception as e:
+            await handle_error(
+                error=e,
+                context=ErrorContext(
+                    operation="main.shutdown_parser_pool",
+                    severity=ErrorSeverity.LOW
+                )
+            )
+        
+        # Закрываем общую HTTP-сессию (соединения пула)
+        try:
+            await close_http_session()
+        except Exception as e:
+            await handle_error(
+                error=e,
+                context=ErrorContext(
+                    operation="main.close_http_session",
+                    severity=ErrorSeverity.LOW
+                )
+            )
+        
         # Корректно закрываем сессию бота
         try:
             await bot.session.close()
@@ -2,12 +2,14 @@
 Админ-команды: /ban, /warn, /blacklist, /stats, /addadmin, /removeadmin, /admins, /myadmin, /setrole
 Админ-панель: /admin - интерактивная панель управления
 """
+import html
 import logging
 from aiogram import Router, types, Bot
 from aiogram.filters import Command
 from aiogram.filters.command import CommandObject
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
+from aiogram.exceptions import TelegramBadRequest
 from app.config.settings import settings
 from app.common.error_handler import handle_error, ErrorContext, ErrorSeverity
 
@@ -16,7 +18,7 @@ from app.application.services.user_service import (
     ban_user, add_warn, get_user_by_id, get_user_warns_count, get_user_ban, register_user
 )
 from app.application.services.moderation_service import (
-    add_to_blacklist, remove_from_blacklist, get_all_blacklist
+    add_to_blacklist, remove_from_blacklist, get_all_blacklist, get_blacklist_stats, reset_blacklist_stats
 )
 from app.application.services.stats_service import get_stats
 from app.application.services.admin_service import (
@@ -107,7 +109,8 @@ def get_blacklist_menu_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton(text="➖ Удалить фразу", callback_data=AdminPanelCallback(action="blacklist_remove_input").pack())
         ],
         [
-            InlineKeyboardButton(text="📋 Список фраз", callback_data=AdminPanelCallback(action="blacklist_list", page=1).pack())
+            InlineKeyboardButton(text="📋 Список фраз", callback_data=AdminPanelCallback(action="blacklist_list", page=1).pack()),
+            InlineKeyboardButton(text="📈 Статистика паттернов", callback_data=AdminPanelCallback(action="blacklist_stats").pack())
         ],
         [
             InlineKeyboardButton(text="⬅️ Назад", callback_data=AdminPanelCallback(action="main").pack())
@@ -134,6 +137,100 @@ def get_admins_menu_keyboard() -> InlineKeyboardMarkup:
     return keyboard
 
 
+def get_blacklist_stats_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура статистики паттернов blacklist"""
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="🔄 Обновить", callback_data=AdminPanelCallback(action="blacklist_stats").pack()),
+            InlineKeyboardButton(text="🧹 Сбросить счетчики", callback_data=AdminPanelCallback(action="blacklist_stats_reset").pack())
+        ],
+        [
+            InlineKeyboardButton(text="⬅️ Назад", callback_data=AdminPanelCallback(action="blacklist_menu").pack())
+        ]
+    ])
+    return keyboard
+
+
+def format_blacklist_stats(stats: dict) -> str:
+    """
+    Текст статистики паттернов blacklist (срабатывания, время, паттерны без срабатываний).
+
+    Длинные фразы обрезаются до экранирования, а текст собирается из целых
+    строк и фраз: обрезка по лимиту не разрывает HTML-теги и сущности (&amp;).
+
+    :param stats: Результат get_blacklist_stats()
+    :return: Текст в HTML-разметке (не длиннее 4000 символов)
+    """
+    MAX_MESSAGE_LENGTH = 4000
+    MAX_KEY_LENGTH = 60  # Фраза длиннее обрезается (до экранирования)
+    source_display = {"ru": "RU", "en": "EN", "db": "БД"}
+    since = datetime.datetime.utcfromtimestamp(stats['since']).strftime("%d.%m.%Y %H:%M")
+
+    def key_html(key: str) -> str:
+        if len(key) > MAX_KEY_LENGTH:
+            key = key[:MAX_KEY_LENGTH - 1] + "…"
+        return html.escape(key)
+
+    parts = [
+        f"📈 <b>Статистика проверок blacklist</b> (с {since} UTC)\n\n"
+        f"🔢 Паттернов: {stats['patterns']} (версия {stats['version']})\n"
+        f"🔍 Проверок: {stats['checks']}, нарушений: {stats['violations']}\n"
+        f"⏱️ Среднее время: {stats['avg_ms']:.2f} мс, максимум: {stats['max_ms']:.1f} мс\n"
+        f"💾 Кэш вердиктов: {stats['cache_hits']} попаданий / {stats['cache_misses']} промахов\n"
+    ]
+    if stats['unchecked']:
+        parts.append(f"⚠️ Без вердикта (исчерпан бюджет времени): {stats['unchecked']} текстов\n")
+
+    parts.append("\n🎯 <b>Чаще всего срабатывают:</b>\n")
+    for entry, pattern_stats in stats['top_hits']:
+        parts.append(f"• [{source_display.get(entry.source, entry.source)}] {key_html(entry.key)} — {pattern_stats.hits}\n")
+    if not stats['top_hits']:
+        parts.append("• пока нет срабатываний\n")
+
+    parts.append("\n🐢 <b>Дороже всего по времени:</b>\n")
+    for entry, pattern_stats in stats['top_time']:
+        parts.append(
+            f"• [{source_display.get(entry.source, entry.source)}] {key_html(entry.key)} — "
+            f"{pattern_stats.time * 1000:.1f} мс за {pattern_stats.calls} запусков\n"
+        )
+    if not stats['top_time']:
+        parts.append("• нет данных\n")
+
+    never_fired = stats['never_fired']
+    parts.append(f"\n💤 <b>Ни разу не сработали:</b> {len(never_fired)} из {stats['patterns']}\n")
+    db_never_fired = [entry.key for entry in never_fired if entry.source == "db"]
+    for index, key in enumerate(db_never_fired):
+        parts.append(("Фразы из БД: " if index == 0 else ", ") + key_html(key))
+
+    text = ""
+    for part in parts:
+        if len(text) + len(part) > MAX_MESSAGE_LENGTH - 3:
+            return text + "..."
+        text += part
+    return text
+
+
+async def show_blacklist_stats(callback: types.CallbackQuery, notice: Optional[str] = None):
+    """
+    Показывает статистику blacklist в сообщении панели.
+    Если за время с прошлого показа ничего не изменилось, Telegram отвечает
+    "message is not modified" — это не ошибка для администратора.
+
+    :param callback: Нажатие кнопки админ-панели
+    :param notice: Текст всплывающего уведомления или None
+    """
+    stats = await get_blacklist_stats()
+    try:
+        await callback.message.edit_text(
+            format_blacklist_stats(stats), parse_mode="HTML", reply_markup=get_blacklist_stats_keyboard()
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        notice = notice or "Статистика не изменилась"
+    await callback.answer(notice)
+
+
 def get_back_to_main_keyboard() -> InlineKeyboardMarkup:
     """Кнопка "Назад в главное меню" """
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -313,14 +410,14 @@ async def warn_command_handler(message: types.Message, command: CommandObject, b
 
 @admin_router.message(Command("blacklist"))
 async def blacklist_command_handler(message: types.Message, command: CommandObject):
-    """Команда /blacklist {add|remove|list} {phrase}"""
+    """Команда /blacklist {add|remove|list|stats} {phrase}"""
     if not await is_admin(message.from_user.id):
         await message.answer("❌ Доступ запрещен. Эта команда доступна только администраторам.")
         return
     
     args = command.args
     if not args:
-        await message.answer("❌ Использование:\n/blacklist add {фраза}\n/blacklist remove {фраза}\n/blacklist list")
+        await message.answer("❌ Использование:\n/blacklist add {фраза}\n/blacklist remove {фраза}\n/blacklist list\n/blacklist stats")
         return
     
     parts = args.split(maxsplit=1)
@@ -378,8 +475,12 @@ async def blacklist_command_handler(message: types.Message, command: CommandObje
         
         await message.answer(text)
     
+    elif action == "stats":
+        stats = await get_blacklist_stats()
+        await message.answer(format_blacklist_stats(stats), parse_mode="HTML")
+    
     else:
-        await message.answer("❌ Неизвестное действие. Используйте: add, remove или list")
+        await message.answer("❌ Неизвестное действие. Используйте: add, remove, list или stats")
 
 @admin_router.message(Command("stats"))
 async def stats_command_handler(message: types.Message):
@@ -1055,6 +1156,18 @@ async def admin_panel_callback_handler(callback: types.CallbackQuery, callback_d
             await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
             await callback.answer()
         
+        elif action == "blacklist_stats":
+            # Статистика паттернов blacklist
+            await show_blacklist_stats(callback)
+        
+        elif action == "blacklist_stats_reset":
+            # Сброс счетчиков (только senior_admin и выше)
+            if not await check_admin_permission(callback.from_user.id, "senior_admin"):
+                await callback.answer("❌ Сбросить счетчики может только senior_admin или owner", show_alert=True)
+                return
+            reset_blacklist_stats()
+            await show_blacklist_stats(callback, "✅ Счетчики сброшены")
+        
         elif action == "admins_list":
             # Список администраторов
             admins = await get_all_admins()
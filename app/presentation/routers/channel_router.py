@@ -5,7 +5,7 @@
 """
 from aiogram import Router, types, Bot
 from aiogram.filters import Command
-from app.application.services.moderation_service import check_message_for_blacklist
+from app.application.services.moderation_service import check_message_for_blacklist, check_message_verdict, create_blacklist_scanner
 from app.application.services.user_service import get_user_ban, get_user_by_id, get_user_warns_count, ban_user, register_user, add_warn
 from app.application.services.content_service import prepare_message_content
 from app.application.services.comment_service import CommentService
@@ -34,14 +34,15 @@ async def check_and_handle_blacklist_violation(
     :return: True если найдено нарушение и сообщение удалено, False если все ОК
     """
     logger.info(f"🔍 Проверяем blacklist для {violation_type}: контент='{content_for_check[:100]}...'")
-    is_violation = await check_message_for_blacklist(content_for_check.strip())
-    if not is_violation:
+    verdict = await check_message_verdict(content_for_check.strip())
+    if not verdict.violation:
         logger.info(f"✅ Проверка blacklist пройдена для {violation_type}")
         return False  # Нарушения нет
     
-    logger.warning(f"⚠️ НАРУШЕНИЕ BLACKLIST ОБНАРУЖЕНО! {violation_type} содержит запрещенную лексику, удаляем комментарий")
-    
-    logger.warning(f"⚠️ {violation_type} содержит запрещенную лексику, удаляем комментарий")
+    logger.warning(
+        f"⚠️ НАРУШЕНИЕ BLACKLIST ОБНАРУЖЕНО! {violation_type} содержит запрещенную лексику "
+        f"({verdict.source_name}: '{verdict.key}', фрагмент: '{verdict.fragment}'), удаляем комментарий"
+    )
     
     username_display = f"@{message.from_user.username}" if message.from_user.username else f"ID {message.from_user.id}"
     warn_count = 0
@@ -456,7 +457,12 @@ async def discussion_message_handler(message: types.Message, bot: Bot):
     if ai_clients and ai_clients.openai:
         try:
             # Подготавливаем полный контент для проверки
-            full_content = await prepare_message_content(bot, message, ai_clients.openai)
+            # Сканер проверяет текст документов по мере извлечения: при нарушении
+            # скачивание и разбор останавливаются, AI не вызывается
+            blacklist_scanner = await create_blacklist_scanner()
+            full_content = await prepare_message_content(
+                bot, message, ai_clients.openai, blacklist_scanner=blacklist_scanner
+            )
             logger.info(f"Полный контент для проверки blacklist: {full_content[:200]}...")
             
             # Проверяем описание фотографии (фото с подписью или текстом)
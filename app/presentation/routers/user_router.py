@@ -121,6 +121,7 @@ async def help_handler(message: types.Message, bot: Bot):
             help_text += "/blacklist add {фраза} - Добавить фразу в черный список\n"
             help_text += "/blacklist remove {фраза} - Удалить фразу из черного списка\n"
             help_text += "/blacklist list [страница] - Показать список запрещенных фраз\n"
+            help_text += "/blacklist stats - Срабатывания и время проверки паттернов\n"
             help_text += "/stats - Показать статистику бота\n\n"
             help_text += "👮 <b>Управление администраторами:</b>\n"
             help_text += "/addadmin {user_id} {роль} - Добавить администратора\n"
@@ -12,7 +12,7 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 import asyncio
-from app.infrastructure.db.session import get_async_session
+from app.infrastructure.db.session import get_async_session, async_init_db
 from app.infrastructure.db.repositories import BlacklistRepository
 from app.infrastructure.db.models import BlacklistItem
 # Слова для добавления (с заглавной и строчной буквы)
@@ -26,6 +26,8 @@ WORDS_TO_ADD = [
 async def add_words_to_blacklist():
     """Добавить указанные слова в blacklist"""
     print("[INFO] Добавляем слова в blacklist...")
+    # Создаем отсутствующие таблицы (в т.ч. blacklist_version)
+    await async_init_db()
     
     async with get_async_session() as session:
         # Получаем существующие фразы
@@ -0,0 +1,89 @@
+"""
+Скрипт для повторной проверки сохраненных комментариев по blacklist.
+Нужен после добавления новых фраз: проверяет комментарии за последние N дней
+текущим черным списком и выводит найденные нарушения.
+
+Запуск: python -m app.scripts.audit_comments_blacklist [--days 30] [--chunk 500] [--include-bot]
+
+Комментарии читаются порциями, все порции проверяются одним снимком
+черного списка (check_messages_for_blacklist).
+"""
+import sys
+import io
+import time
+import asyncio
+import argparse
+import datetime
+from pathlib import Path
+
+# Настройка кодировки для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.infrastructure.db.session import get_async_session, async_init_db
+from app.infrastructure.db.repositories import PostCommentRepository
+from app.application.services.moderation_service import check_messages_for_blacklist
+
+
+async def audit_comments(days: int = 30, chunk_size: int = 500, include_bot: bool = False):
+    """
+    Проверить комментарии за последние дни по текущему blacklist.
+
+    :param days: За сколько дней проверять комментарии
+    :param chunk_size: Размер порции, читаемой из БД
+    :param include_bot: Проверять ли комментарии бота
+    """
+    await async_init_db()
+
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    print(f"[INFO] Проверяем комментарии с {since:%Y-%m-%d %H:%M} (UTC), порциями по {chunk_size}...")
+
+    started = time.perf_counter()
+    checked = 0
+    violations = 0
+    last_id = 0
+
+    while True:
+        async with get_async_session() as session:
+            rows = await PostCommentRepository.get_chunk_since(
+                session, since, after_id=last_id, limit=chunk_size, include_bot=include_bot
+            )
+        if not rows:
+            break
+
+        hits = await check_messages_for_blacklist(row.content for row in rows)
+        for row, hit in zip(rows, hits):
+            if not hit:
+                continue
+            violations += 1
+            fragment = row.content[hit.start:hit.end]
+            print(
+                f"[VIOLATION] {row.created_at:%Y-%m-%d %H:%M} | пост {row.post_message_id} | "
+                f"комментарий {row.comment_message_id} | пользователь {row.user_id} | "
+                f"'{hit.entry.key}' ← '{fragment}'"
+            )
+
+        checked += len(rows)
+        last_id = rows[-1].id
+
+    elapsed = time.perf_counter() - started
+    print(f"\n[RESULT] Результат:")
+    print(f"   [INFO] Проверено комментариев: {checked}")
+    print(f"   [INFO] Найдено нарушений: {violations}")
+    print(f"   [INFO] Время: {elapsed:.1f} с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Повторная проверка комментариев по blacklist")
+    parser.add_argument("--days", type=int, default=30, help="За сколько дней проверять (по умолчанию 30)")
+    parser.add_argument("--chunk", type=int, default=500, help="Размер порции (по умолчанию 500)")
+    parser.add_argument("--include-bot", action="store_true", help="Проверять и комментарии бота")
+    args = parser.parse_args()
+
+    asyncio.run(audit_comments(days=args.days, chunk_size=args.chunk, include_bot=args.include_bot))
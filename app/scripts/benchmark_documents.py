@@ -0,0 +1,219 @@
+"""
+Бенчмарк разбора office-документов (docx, xlsx, pptx, odt).
+Сравнивает прежний разбор через объектные модели (python-docx, openpyxl
+в обычном режиме, python-pptx, ElementTree всего content.xml) с потоковым
+извлечением текста из XML (document_parsers): время и пик памяти
+(tracemalloc) на разбор всего файла и на разбор до бюджета MAX_TEXT_LENGTH.
+
+Запуск: python -m app.scripts.benchmark_documents [--file report.xlsx] [--size N]
+
+Без --file генерируются большие синтетические документы каждого формата
+(для генерации нужны python-docx, openpyxl и python-pptx).
+"""
+import sys
+import io
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+from zipfile import ZipFile, ZIP_DEFLATED
+
+# Настройка кодировки для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.application.services.document_parsers import DOCUMENT_PARSERS, ParseStats, _take_chunks
+
+try:
+    from docx import Document as DocxDocument
+except ImportError:
+    DocxDocument = None
+
+try:
+    from openpyxl import Workbook, load_workbook
+except ImportError:
+    Workbook = load_workbook = None
+
+try:
+    from pptx import Presentation
+except ImportError:
+    Presentation = None
+
+MAX_TEXT_LENGTH = 8000  # Как в content_service
+WORDS = (
+    "отчет квартал выручка расходы прибыль договор поставка клиент проект срок "
+    "report revenue budget invoice contract delivery customer project deadline"
+).split()
+
+
+def _sentence(rnd: random.Random, words: int = 12) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+
+def build_docx(size: int, rnd: random.Random) -> bytes:
+    """Word документ: size абзацев и таблица на size // 10 строк."""
+    doc = DocxDocument()
+    for _ in range(size):
+        doc.add_paragraph(_sentence(rnd))
+    table = doc.add_table(rows=size // 10, cols=4)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = rnd.choice(WORDS)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def build_xlsx(size: int, rnd: random.Random) -> bytes:
+    """Excel файл: size строк по 8 ячеек (строки и числа)."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Данные"
+    for row in range(size):
+        sheet.append([row, rnd.choice(WORDS), rnd.choice(WORDS), rnd.randint(1, 10 ** 6),
+                      rnd.random() * 1000, _sentence(rnd, 4), rnd.choice(WORDS), rnd.randint(0, 100)])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def build_pptx(size: int, rnd: random.Random) -> bytes:
+    """PowerPoint презентация: size // 20 слайдов с заголовком и текстом."""
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for _ in range(max(1, size // 20)):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = _sentence(rnd, 4)
+        slide.placeholders[1].text = "\n".join(_sentence(rnd) for _ in range(5))
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def build_odt(size: int, rnd: random.Random) -> bytes:
+    """OpenDocument Text: size абзацев в content.xml."""
+    paragraphs = "".join(f"<text:p>{_sentence(rnd)}</text:p>" for _ in range(size))
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+        f"<office:body><office:text>{paragraphs}</office:text></office:body></office:document-content>"
+    )
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.text")
+        archive.writestr("content.xml", content)
+    return buffer.getvalue()
+
+
+def legacy_docx(document_file) -> Iterator[str]:
+    doc = DocxDocument(document_file)
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            yield paragraph.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            yield "".join(cell.text + " " for cell in row.cells if cell.text.strip()) + "\n"
+
+
+def legacy_xlsx(document_file) -> Iterator[str]:
+    workbook = load_workbook(document_file, data_only=True)
+    for sheet_name in workbook.sheetnames:
+        sheet = workbook[sheet_name]
+        yield f"\n--- Лист: {sheet_name} ---\n"
+        for row in sheet.iter_rows(values_only=True):
+            row_text = " | ".join(str(cell) if cell is not None else "" for cell in row)
+            if row_text.strip():
+                yield row_text + "\n"
+
+
+def legacy_pptx(document_file) -> Iterator[str]:
+    prs = Presentation(document_file)
+    for slide_num, slide in enumerate(prs.slides, 1):
+        slide_text = f"\n--- Слайд {slide_num} ---\n"
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_text += shape.text + "\n"
+        yield slide_text
+
+
+def legacy_odt(document_file) -> Iterator[str]:
+    with ZipFile(document_file, 'r') as odt_file:
+        root = ET.fromstring(odt_file.read('content.xml'))
+    for elem in root.iter():
+        if elem.text and elem.text.strip():
+            yield elem.text.strip() + " "
+
+
+# Формат → (генератор синтетического файла, нужная для него библиотека, прежний разбор)
+FORMATS: Dict[str, tuple] = {
+    '.docx': (build_docx, DocxDocument, legacy_docx),
+    '.xlsx': (build_xlsx, Workbook, legacy_xlsx),
+    '.pptx': (build_pptx, Presentation, legacy_pptx),
+    '.odt': (build_odt, ZipFile, legacy_odt),
+}
+
+
+def measure(parse: Callable[[io.BytesIO], List[str]], content: bytes) -> tuple:
+    """
+    Время (без трассировки) и пик памяти (отдельным прогоном под tracemalloc).
+
+    :return: (секунды, пик MB, символов текста)
+    """
+    gc.collect()  # Мусор предыдущего разбора (объектной модели) не должен попасть в замер
+    started = time.perf_counter()
+    chunks = parse(io.BytesIO(content))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    parse(io.BytesIO(content))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, sum(len(chunk) for chunk in chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора office-документов")
+    parser.add_argument("--file", type=str, help="Документ для разбора (.docx, .xlsx, .pptx, .odt)")
+    parser.add_argument("--size", type=int, default=60000, help="Размер синтетических документов (абзацев/строк)")
+    args = parser.parse_args()
+
+    if args.file:
+        path = Path(args.file)
+        documents = {path.suffix.lower(): path.read_bytes()}
+    else:
+        rnd = random.Random(42)
+        documents = {}
+        for extension, (build, library, _) in FORMATS.items():
+            if library is None:
+                print(f"⚠️ {extension}: библиотека для генерации не установлена, пропускаем")
+                continue
+            documents[extension] = build(args.size, rnd)
+
+    for extension, content in documents.items():
+        if extension not in FORMATS:
+            print(f"⚠️ {extension}: формат не поддерживается")
+            continue
+        _, library, legacy = FORMATS[extension]
+        streaming = DOCUMENT_PARSERS[extension][0]
+        print(f"\n📄 {extension}: {len(content) / 1024 / 1024:.2f} MB")
+        for label, max_chars in (("весь файл", sys.maxsize), (f"бюджет {MAX_TEXT_LENGTH}", MAX_TEXT_LENGTH)):
+            results = {}
+            if library is not None:
+                results["объектная модель"] = measure(lambda f: _take_chunks(legacy(f), max_chars), content)
+            results["потоковый XML"] = measure(lambda f: _take_chunks(streaming(f, ParseStats()), max_chars), content)
+            for name, (elapsed, peak, chars) in results.items():
+                print(f"   {label:<14} {name:<18} {elapsed * 1000:>9.1f} мс  пик памяти {peak:>8.1f} MB  текст {chars} символов")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Бенчмарк проверки blacklist на корпусе комментариев.
+Сравнивает последовательную проверку паттернов (как было раньше)
+с однопроходным BlacklistMatcher (нормализация текста + канонические паттерны),
+показывает, какие обфускации ловит нормализация, и оценивает префильтр
+по n-граммам: долю ложных срабатываний на чистых текстах и ускорение,
+и маршрутизацию по письменностям: сколько паттернов не запускается
+на русских, английских и смешанных текстах.
+В конце сравниваются движки регулярных выражений (re, regex, re2) —
+на корпусе и на враждебном тексте для рискованных паттернов.
+
+Запуск: python -m app.scripts.benchmark_moderation [--file comments.txt] [--count N]
+
+Файл корпуса — по одному комментарию на строку. Без --file используется
+синтетический корпус из типичных русских/английских комментариев.
+"""
+import sys
+import io
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import Callable, List
+
+# Настройка кодировки для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.application.services.moderation_service import (
+    RUSSIAN_PROFANITY_PATTERNS, ENGLISH_PROFANITY_PATTERNS, create_regex_from_phrase, build_matcher
+)
+from app.application.services.moderation_matcher import (
+    BlacklistMatcher, CheckIncomplete, PREFILTER_MAX_TEXT_LENGTH, SCRIPT_CYRILLIC, SCRIPT_LATIN, ALL_SCRIPTS, text_scripts
+)
+from app.application.services.regex_backends import available_backends, get_regex_backend
+from app.scripts.init_default_blacklist import DEFAULT_BLACKLIST
+
+CLEAN_RU = [
+    "Спасибо за пост, очень интересно",
+    "Согласен с автором, но есть нюансы",
+    "А где можно почитать подробнее про налоговые изменения?",
+    "Интересно, как это повлияет на курс рубля в следующем году",
+    "Хорошая статья, сохранил себе в избранное",
+    "Не уверен, что это сработает на практике",
+    "Подскажите, пожалуйста, ссылку на первоисточник",
+    "Вчера обсуждали это с коллегами на работе",
+    "Цифры в таблице не сходятся с официальной статистикой",
+    "Ждём продолжения, тема действительно важная",
+]
+CLEAN_EN = [
+    "Thanks for sharing, great article",
+    "I think the author is right about the economy",
+    "Could you post the link to the original report?",
+    "This is exactly what happened last year as well",
+    "Interesting point, but the numbers look off",
+]
+DIRTY = [
+    "да ты просто идиот",
+    "какой же пиздец творится",
+    "fuuuck this",
+    "это хуйня полная",
+    "сука, опять подорожало",
+    "купить подписчиков недорого",
+    "what a load of bullshit",
+    # Короткие слова, чьи n-граммы — начала более длинных n-грамм префильтра ("хуи" / "хуил")
+    "ты хуй!",
+    "Ну ХУЙ и всё",
+]
+# Обфускации, которые не покрываются заменами букв внутри регулярных выражений
+OBFUSCATED = [
+    "с у к а",
+    "п.и.з.д.е.ц",
+    "сууукааа",
+    "ху\u200bйня",
+    "f u c k you",
+    "b1tch",
+    "еб@нутый",
+    "ｓｈｉｔ",
+    "ИДИ0Т",
+    "з-а-е-б-и-с-ь",
+]
+
+
+def build_corpus(count: int, violation_rate: float = 0.05, seed: int = 42) -> List[str]:
+    """
+    Собирает синтетический корпус комментариев.
+
+    :param count: Количество комментариев
+    :param violation_rate: Доля комментариев с нарушениями
+    :param seed: Seed для воспроизводимости
+    :return: Список комментариев
+    """
+    rnd = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        sentences = [rnd.choice(CLEAN_RU + CLEAN_EN) for _ in range(rnd.randint(1, 4))]
+        if rnd.random() < violation_rate:
+            sentences.insert(rnd.randrange(len(sentences) + 1), rnd.choice(DIRTY))
+        corpus.append(". ".join(sentences))
+    # Несколько длинных текстов, как из PDF/документов (до 8000 символов)
+    for _ in range(max(1, count // 100)):
+        document = []
+        while sum(len(s) + 2 for s in document) < 8000:
+            document.append(rnd.choice(CLEAN_RU + CLEAN_EN))
+        corpus.append(". ".join(document)[:8000])
+    return corpus
+
+
+def legacy_check(phrases: List[str]) -> Callable[[str], bool]:
+    """Последовательная проверка всех паттернов (старый алгоритм, без похода в БД)."""
+    def check(text: str) -> bool:
+        text_lower = text.lower()
+        for pattern in RUSSIAN_PROFANITY_PATTERNS.values():
+            if pattern.search(text):
+                return True
+        for pattern in ENGLISH_PROFANITY_PATTERNS.values():
+            if pattern.search(text):
+                return True
+        for phrase in phrases:
+            if phrase.lower() in text_lower:
+                return True
+            if create_regex_from_phrase(phrase).search(text):
+                return True
+        return False
+    return check
+
+
+def run(name: str, check: Callable[[str], bool], corpus: List[str], rounds: int) -> float:
+    """Прогоняет корпус и печатает время; возвращает время одного прохода."""
+    started = time.perf_counter()
+    hits = 0
+    for _ in range(rounds):
+        hits = sum(1 for text in corpus if check(text))
+    elapsed = (time.perf_counter() - started) / rounds
+    per_text_us = elapsed / len(corpus) * 1_000_000
+    print(f"   {name:<28} {elapsed * 1000:9.1f} мс   {per_text_us:8.1f} мкс/текст   нарушений: {hits}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки blacklist")
+    parser.add_argument("--file", type=str, help="Файл с комментариями (по одному на строку)")
+    parser.add_argument("--count", type=int, default=2000, help="Размер синтетического корпуса")
+    parser.add_argument("--rounds", type=int, default=3, help="Количество прогонов")
+    args = parser.parse_args()
+
+    if args.file:
+        corpus = [line.strip() for line in Path(args.file).read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        corpus = build_corpus(args.count)
+    phrases = [phrase.strip() for phrase in DEFAULT_BLACKLIST if phrase.strip()]
+
+    print(f"📊 Корпус: {len(corpus)} текстов, {sum(len(t) for t in corpus)} символов, фраз в БД: {len(phrases)}")
+
+    legacy = legacy_check(phrases)
+    matcher = build_matcher(tuple(phrases))
+
+    missed = [text for text in corpus if legacy(text) and matcher.search(text) is None]
+    if missed:
+        print(f"❌ BlacklistMatcher пропустил {len(missed)} нарушений, например: {missed[0][:100]}")
+    extra = [text for text in corpus if not legacy(text) and matcher.search(text) is not None]
+    if extra:
+        print(f"ℹ️ BlacklistMatcher нашел {len(extra)} дополнительных нарушений, например: {extra[0][:100]}")
+
+    print("\n🕵️ Обфускации:")
+    for text in OBFUSCATED:
+        hit = matcher.search(text)
+        found = f"'{hit.entry.key}' ← '{text[hit.start:hit.end]}'" if hit else "—"
+        print(f"   {text!r:<24} старый: {'да' if legacy(text) else 'нет':<4} новый: {found}")
+    print()
+
+    legacy_time = run("последовательно (старый)", legacy, corpus, args.rounds)
+    matcher_time = run("BlacklistMatcher", lambda text: matcher.search(text) is not None, corpus, args.rounds)
+    print(f"\n🚀 Ускорение: x{legacy_time / matcher_time:.1f}")
+
+    print("\n🧹 Префильтр по n-граммам:")
+    unfiltered = BlacklistMatcher(matcher.entries, use_prefilter=False)
+    mismatched = [text for text in corpus if matcher.search(text) != unfiltered.search(text)]
+    if mismatched:
+        print(f"❌ С префильтром вердикт отличается для {len(mismatched)} текстов, например: {mismatched[0][:100]}")
+    comments = [text for text in corpus if len(text) <= PREFILTER_MAX_TEXT_LENGTH]
+    clean = [text for text in comments if unfiltered.search(text) is None]
+    passed = sum(1 for text in clean if matcher.may_match(text))
+    if clean:
+        print(
+            f"   Чистых комментариев (до {PREFILTER_MAX_TEXT_LENGTH} символов): {len(clean)}, "
+            f"прошли префильтр: {passed} (ложные срабатывания: {passed / len(clean):.1%})"
+        )
+    if comments:
+        unfiltered_time = run("без префильтра", lambda text: unfiltered.search(text) is not None, comments, args.rounds)
+        filtered_time = run("с префильтром", lambda text: matcher.search(text) is not None, comments, args.rounds)
+        print(f"   Ускорение на комментариях: x{unfiltered_time / filtered_time:.2f}")
+
+    print("\n🗺️ Маршрутизация по письменностям:")
+    unrouted = BlacklistMatcher(matcher.entries, use_routing=False)
+    mismatched = [text for text in corpus if matcher.search(text) != unrouted.search(text)]
+    if mismatched:
+        print(f"❌ С маршрутизацией вердикт отличается для {len(mismatched)} текстов, например: {mismatched[0][:100]}")
+    groups = {
+        "русские": frozenset((SCRIPT_CYRILLIC,)),
+        "английские": frozenset((SCRIPT_LATIN,)),
+        "смешанные": ALL_SCRIPTS,
+    }
+    for label, scripts in groups.items():
+        texts = [text for text in corpus if text_scripts(text) == scripts]
+        if not texts:
+            continue
+        routed = sum(matcher.routed_size(text) for text in texts) / len(texts)
+        print(
+            f"   {label}: {len(texts)} текстов ({len(texts) / len(corpus):.0%}), "
+            f"паттернов на текст: {routed:.0f} из {len(matcher)} (не запускается {1 - routed / len(matcher):.0%})"
+        )
+        unrouted_time = run("все паттерны", lambda text: unrouted.search(text) is not None, texts, args.rounds)
+        routed_time = run("с маршрутизацией", lambda text: matcher.search(text) is not None, texts, args.rounds)
+        print(f"   {'':<28} ускорение: x{unrouted_time / routed_time:.2f}")
+
+    print("\n⚙️ Движки регулярных выражений:")
+    # Документ, на котором "пош[еє]л.*нах[ую][йи]" в re перебирает квадратичное число вариантов
+    hostile = "пошел " * 1400
+    for name, installed in available_backends().items():
+        if not installed:
+            print(f"   {name:<28} не установлен")
+            continue
+        backend = get_regex_backend(name)
+        engine = BlacklistMatcher(matcher.entries, backend=backend)
+        native = sum(1 for entry in engine.entries if backend.runs(entry.pattern))
+        run(f"{name} ({native}/{len(engine.entries)} паттернов)", lambda text: engine.search(text) is not None, corpus, args.rounds)
+        started = time.perf_counter()
+        try:
+            engine.search(hostile)
+            outcome = ""
+        except CheckIncomplete:
+            outcome = ", исчерпан бюджет времени"
+        print(f"   {'':<28} враждебный текст ({len(hostile)} символов): {(time.perf_counter() - started) * 1000:.1f} мс{outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Сборка предкомпилированного артефакта матчера черного списка.
+Разбирает встроенные паттерны и фразы из БД и сохраняет результат
+в data/moderation_matcher.pkl (или MODERATION_ARTIFACT_PATH), чтобы бот
+при старте не тратил на это время. Бот и сам пересобирает артефакт,
+если словарь изменился, — скрипт нужен для сборки заранее (при деплое).
+
+Запуск: python -m app.scripts.build_moderation_artifact [--force]
+"""
+import sys
+import io
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Настройка кодировки для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.infrastructure.db.session import get_async_session, async_init_db
+from app.infrastructure.db.repositories import BlacklistRepository
+from app.application.services.moderation_artifact import artifact_path, load_artifact
+from app.application.services.moderation_service import build_matcher
+
+
+async def build_artifact(force: bool = False):
+    """
+    Собрать артефакт матчера по текущему черному списку из БД.
+
+    :param force: Удалить существующий артефакт и разобрать все паттерны заново
+    """
+    await async_init_db()
+    async with get_async_session() as session:
+        blacklist = await BlacklistRepository.get_all(session)
+    phrases = tuple(dict.fromkeys(phrase for phrase in (item.phrase.strip() for item in blacklist) if phrase))
+
+    path = artifact_path()
+    if force and path.exists():
+        path.unlink()
+        print(f"[INFO] Старый артефакт удален: {path}")
+
+    print(f"[INFO] Фраз в БД: {len(phrases)}, собираем матчер...")
+    started = time.perf_counter()
+    matcher = build_matcher(phrases)
+    elapsed = time.perf_counter() - started
+
+    vocabulary, plans = load_artifact(path)
+    if not plans:
+        print(f"[ERROR] Артефакт не сохранен: {path}")
+        sys.exit(1)
+    print(f"[OK] Артефакт: {path} ({path.stat().st_size / 1024:.0f} КБ, {len(matcher)} паттернов, сборка {elapsed:.2f} с)")
+
+    started = time.perf_counter()
+    build_matcher(phrases)
+    print(f"[OK] Сборка матчера из артефакта: {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка артефакта матчера черного списка")
+    parser.add_argument("--force", action="store_true", help="Пересобрать все паттерны заново")
+    args = parser.parse_args()
+
+    asyncio.run(build_artifact(force=args.force))
@@ -0,0 +1,132 @@
+"""
+Проверка соответствия движков регулярных выражений стандартному re.
+Каждый паттерн встроенных словарей и фраз по умолчанию запускается
+стандартным re и проверяемым движком на корпусе комментариев и на самих
+словах черного списка (в разных регистрах и внутри предложений); диапазоны
+совпадений должны совпадать. Затем так же сравниваются вердикты BlacklistMatcher.
+
+Запуск: python -m app.scripts.check_regex_backends [--backend regex] [--count N]
+
+Код возврата 1 — найдены расхождения (или движок не установлен).
+"""
+import sys
+import io
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+
+# Настройка кодировки для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.application.services.moderation_service import (
+    RUSSIAN_PROFANITY_PATTERNS, ENGLISH_PROFANITY_PATTERNS, create_regex_from_phrase, build_matcher
+)
+from app.application.services.moderation_matcher import BlacklistMatcher
+from app.application.services.regex_backends import REGEX_BACKEND_RE, available_backends, get_regex_backend
+from app.scripts.benchmark_moderation import build_corpus, DIRTY, OBFUSCATED
+from app.scripts.init_default_blacklist import DEFAULT_BLACKLIST
+
+
+def build_texts(count: int) -> List[str]:
+    """
+    Тексты для проверки: корпус бенчмарка и слова черного списка в разных вариантах.
+
+    :param count: Размер синтетического корпуса
+    :return: Список текстов
+    """
+    words = list(RUSSIAN_PROFANITY_PATTERNS) + list(ENGLISH_PROFANITY_PATTERNS) + list(DEFAULT_BLACKLIST)
+    texts = build_corpus(count) + DIRTY + OBFUSCATED
+    for word in words:
+        texts.extend([
+            word,
+            word.upper(),
+            word.capitalize(),
+            f"ну ты {word}, конечно",
+            f"{word}{word}",
+            f"пре{word}ный",
+            f"{word}!\n{word.upper()}?",
+        ])
+    return texts
+
+
+def check_backend(name: str, texts: List[str], phrases: Tuple[str, ...]) -> int:
+    """
+    Сравнивает движок со стандартным re.
+
+    :param name: Имя движка
+    :param texts: Тексты для проверки
+    :param phrases: Фразы черного списка по умолчанию
+    :return: Количество расхождений
+    """
+    backend = get_regex_backend(name)
+    patterns = list(RUSSIAN_PROFANITY_PATTERNS.items()) + list(ENGLISH_PROFANITY_PATTERNS.items())
+    patterns.extend((phrase, create_regex_from_phrase(phrase)) for phrase in phrases)
+
+    compiled = [(key, pattern, backend.compile(pattern)) for key, pattern in patterns]
+    native = sum(1 for _, pattern, _ in compiled if backend.runs(pattern))
+    print(f"\n⚙️ Движок {name}: паттернов запускается движком {native} из {len(compiled)}, остальные — re")
+
+    mismatches = 0
+    for key, pattern, other in compiled:
+        if other is pattern:
+            continue
+        for text in texts:
+            expected = pattern.search(text)
+            actual = other.search(text)
+            expected_span = expected.span() if expected else None
+            actual_span = actual.span() if actual else None
+            if expected_span != actual_span:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"   ❌ '{key}' ({pattern.pattern}) на {text[:60]!r}: re {expected_span}, {name} {actual_span}")
+
+    reference = build_matcher(phrases)
+    matcher = BlacklistMatcher(reference.entries, backend=backend)
+    verdicts = 0
+    for text in texts:
+        if reference.search(text) != matcher.search(text):
+            verdicts += 1
+            if verdicts <= 10:
+                print(f"   ❌ Вердикт BlacklistMatcher отличается на {text[:60]!r}")
+
+    print(f"   Текстов: {len(texts)}, расхождений паттернов: {mismatches}, вердиктов: {verdicts}")
+    return mismatches + verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Соответствие движков регулярных выражений стандартному re")
+    parser.add_argument("--backend", type=str, help="Проверить только этот движок (по умолчанию — все установленные)")
+    parser.add_argument("--count", type=int, default=1000, help="Размер синтетического корпуса")
+    args = parser.parse_args()
+
+    installed = available_backends()
+    if args.backend:
+        if not installed.get(args.backend):
+            print(f"❌ Движок {args.backend} не установлен")
+            sys.exit(1)
+        names = [args.backend]
+    else:
+        names = [name for name, ok in installed.items() if ok and name != REGEX_BACKEND_RE]
+        skipped = [name for name, ok in installed.items() if not ok]
+        if skipped:
+            print(f"[INFO] Не установлены: {', '.join(skipped)}")
+
+    texts = build_texts(args.count)
+    phrases = tuple(phrase.strip() for phrase in DEFAULT_BLACKLIST if phrase.strip())
+    failures = sum(check_backend(name, texts, phrases) for name in names)
+
+    if failures:
+        print(f"\n❌ Найдено расхождений: {failures}")
+        sys.exit(1)
+    print(f"\n[OK] Семантика паттернов совпадает со стандартным re")
+
+
+if __name__ == "__main__":
+    main()
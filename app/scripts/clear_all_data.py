@@ -16,8 +16,9 @@ import asyncio
 from sqlalchemy import delete, func
 from sqlalchemy.future import select
 from app.infrastructure.db.session import get_async_session
+from app.infrastructure.db.repositories import BlacklistRepository
 from app.infrastructure.db.models import (
-    User, Admin, Ban, Warn, BlacklistItem, Log, 
+    User, Admin, Ban, Warn, BlacklistItem, BlacklistChange, Log, 
     ScheduledPost, AiUsage
 )
 
@@ -81,6 +82,9 @@ async def clear_all_data():
                         result = await session.execute(delete(model))
                         deleted_counts[table_name] = result.rowcount if hasattr(result, 'rowcount') else counts[table_name]
                         print(f"[SUCCESS] Удалено из {table_name}: {deleted_counts[table_name]} записей")
+                        if model is BlacklistItem:
+                            # Запущенный бот перезагрузит кэш blacklist по новой версии
+                            await BlacklistRepository.record_change(session, BlacklistChange.CLEAR)
                     else:
                         print(f"[INFO] Таблица {table_name} уже пуста")
                 except Exception as e:
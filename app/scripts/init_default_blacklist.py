@@ -2,7 +2,7 @@
 Скрипт для инициализации предварительного черного списка
 """
 import asyncio
-from app.infrastructure.db.session import get_async_session
+from app.infrastructure.db.session import get_async_session, async_init_db
 from app.infrastructure.db.repositories import BlacklistRepository
 from app.infrastructure.db.models import BlacklistItem
 
@@ -67,6 +67,8 @@ DEFAULT_BLACKLIST = [
 
 async def init_default_blacklist():
     """Добавить предварительный черный список в БД"""
+    # Создаем отсутствующие таблицы (в т.ч. blacklist_version)
+    await async_init_db()
     async with get_async_session() as session:
         existing = await BlacklistRepository.get_all(session)
         existing_phrases = {item.phrase.lower() for item in existing}
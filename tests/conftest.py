@@ -0,0 +1,19 @@
+"""
+Общие настройки тестов.
+
+Переменные окружения выставляются до импорта app.*: настройки (app.config.settings)
+читаются при импорте, а база и артефакт матчера не должны попадать в рабочую копию.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+test_dir = Path(tempfile.mkdtemp(prefix="bot-tests-"))
+os.environ.setdefault("BOT_TOKEN", "123456:test-token")
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{test_dir / 'test.db'}"
+os.environ["MODERATION_ARTIFACT_PATH"] = str(test_dir / "matcher.pkl")
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
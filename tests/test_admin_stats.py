@@ -0,0 +1,77 @@
+"""
+Статистика blacklist в админ-панели: лимит длины сообщения Telegram и повторное обновление.
+"""
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from app.presentation.routers import admin_router
+
+
+def _stats(keys, never_fired=()):
+    entries = [SimpleNamespace(source="db", key=key) for key in keys]
+    pattern_stats = SimpleNamespace(hits=5, time=0.01, calls=100)
+    return {
+        "since": time.time(), "patterns": len(keys), "version": 1, "checks": 10, "violations": 2,
+        "avg_ms": 0.5, "max_ms": 3.0, "cache_hits": 1, "cache_misses": 9, "unchecked": 0,
+        "top_hits": [(entry, pattern_stats) for entry in entries],
+        "top_time": [(entry, pattern_stats) for entry in entries],
+        "never_fired": [SimpleNamespace(source="db", key=key) for key in never_fired],
+    }
+
+
+def _assert_valid_html(text):
+    assert len(text) <= 4000
+    # Обрезка не разрывает сущности: после каждого & идет целая сущность
+    assert not re.search(r"&(?!amp;|lt;|gt;|quot;|#x27;)", text)
+    assert text.count("<b>") == text.count("</b>")
+
+
+def test_long_phrases_fit_message():
+    text = admin_router.format_blacklist_stats(_stats(["&" * 3000 + str(number) for number in range(10)]))
+    _assert_valid_html(text)
+    assert "Чаще всего срабатывают" in text
+
+
+@pytest.mark.parametrize("phrase", ["a&b " * 40, "<фраза> " * 30, "x" * 17])
+def test_never_fired_list_is_cut_by_whole_phrases(phrase):
+    text = admin_router.format_blacklist_stats(_stats([], never_fired=[phrase + str(n) for n in range(500)]))
+    _assert_valid_html(text)
+    assert text.endswith("...")
+
+
+class _Callback:
+    def __init__(self, error=None):
+        self.error = error
+        self.answers = []
+        self.message = SimpleNamespace(edit_text=self.edit_text)
+
+    async def edit_text(self, *args, **kwargs):
+        if self.error is not None:
+            raise self.error
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+def _bad_request(message):
+    return TelegramBadRequest(EditMessageText(text="x"), message)
+
+
+def test_refresh_without_changes_is_not_an_error(monkeypatch):
+    async def stats():
+        return _stats(["фраза"])
+
+    monkeypatch.setattr(admin_router, "get_blacklist_stats", stats)
+    callback = _Callback(_bad_request("Bad Request: message is not modified"))
+    asyncio.run(admin_router.show_blacklist_stats(callback))
+    assert callback.answers == ["Статистика не изменилась"]
+
+    callback = _Callback(_bad_request("Bad Request: message to edit not found"))
+    with pytest.raises(TelegramBadRequest):
+        asyncio.run(admin_router.show_blacklist_stats(callback))
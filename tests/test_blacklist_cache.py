@@ -0,0 +1,134 @@
+"""
+BlacklistCache: применение дельты из журнала blacklist_changes и перезагрузка при пропусках.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import delete
+
+from app.application.services.moderation_service import BlacklistCache
+from app.infrastructure.db.models import Base, BlacklistChange, BlacklistItem
+from app.infrastructure.db.repositories import BlacklistRepository
+from app.infrastructure.db.session import async_init_db, engine, get_async_session
+
+
+def run(coro):
+    """Запускает тест в новом event loop; соединения с БД закрываются вместе с ним."""
+    async def wrapper():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await async_init_db()
+            return await coro
+        finally:
+            await engine.dispose()
+    return asyncio.run(wrapper())
+
+
+async def add(phrase: str):
+    async with get_async_session() as session:
+        await BlacklistRepository.add(session, BlacklistItem(phrase=phrase))
+
+
+async def remove(phrase: str):
+    async with get_async_session() as session:
+        await BlacklistRepository.delete_by_phrase(session, phrase)
+
+
+async def loaded_cache(monkeypatch):
+    """Загруженный кэш и список полных перезагрузок после первой загрузки."""
+    cache = BlacklistCache()
+    await cache.get_snapshot()
+    reloads = []
+    original = cache._load
+
+    async def counting_load():
+        reloads.append(True)
+        await original()
+
+    monkeypatch.setattr(cache, "_load", counting_load)
+    return cache, reloads
+
+
+def test_version_row_is_seeded(monkeypatch):
+    async def scenario():
+        await async_init_db()  # Повторная инициализация не дублирует строку
+        async with get_async_session() as session:
+            assert await BlacklistRepository.get_version(session) == 0
+        await add("фразаодин")
+        await add("фразадва")
+        async with get_async_session() as session:
+            assert await BlacklistRepository.get_version(session) == 2
+
+    run(scenario())
+
+
+def test_no_changes(monkeypatch):
+    async def scenario():
+        cache, reloads = await loaded_cache(monkeypatch)
+        assert await cache.refresh_if_changed() is False
+        assert reloads == []
+
+    run(scenario())
+
+
+def test_delta_is_applied_without_reload(monkeypatch):
+    async def scenario():
+        await add("стараяфраза")
+        cache, reloads = await loaded_cache(monkeypatch)
+        assert (await cache.get_snapshot()).matcher.search("тут новаяфраза") is None
+
+        await add("новаяфраза")
+        assert await cache.refresh_if_changed() is True
+        snapshot = await cache.get_snapshot()
+        assert set(snapshot.phrases) == {"стараяфраза", "новаяфраза"}
+        assert snapshot.matcher.search("тут новаяфраза") is not None
+        assert snapshot.version == 2
+        assert snapshot.change_id == 2
+
+        await remove("стараяфраза")
+        assert await cache.refresh_if_changed() is True
+        snapshot = await cache.get_snapshot()
+        assert snapshot.phrases == ("новаяфраза",)
+        assert snapshot.matcher.search("тут стараяфраза") is None
+        assert snapshot.change_id == 3
+        assert reloads == []
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("pruned", [1, 2])
+def test_gap_in_change_log_reloads(monkeypatch, pruned):
+    async def scenario():
+        cache, reloads = await loaded_cache(monkeypatch)
+        for phrase in ("первая", "вторая", "третья"):
+            await add(phrase)
+        # Журнал обрезан: пропала запись в начале или в середине непримененной дельты
+        async with get_async_session() as session:
+            await session.execute(delete(BlacklistChange).where(BlacklistChange.id == pruned))
+            await session.commit()
+
+        assert await cache.refresh_if_changed() is True
+        snapshot = await cache.get_snapshot()
+        assert reloads == [True]
+        assert set(snapshot.phrases) == {"первая", "вторая", "третья"}
+        assert snapshot.change_id == 3
+        assert await cache.refresh_if_changed() is False
+
+    run(scenario())
+
+
+def test_clear_reloads(monkeypatch):
+    async def scenario():
+        await add("перваяфраза")
+        cache, reloads = await loaded_cache(monkeypatch)
+        async with get_async_session() as session:
+            await session.execute(delete(BlacklistItem))
+            await BlacklistRepository.record_change(session, BlacklistChange.CLEAR)
+            await session.commit()
+
+        assert await cache.refresh_if_changed() is True
+        assert reloads == [True]
+        assert (await cache.get_snapshot()).phrases == ()
+
+    run(scenario())
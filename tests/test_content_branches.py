@@ -0,0 +1,44 @@
+"""
+Параллельные ветки подготовки контента: ошибка или отмена одной ветки не теряет остальные.
+"""
+import asyncio
+
+from app.application.services.content_service import _run_content_branches
+
+
+async def _value(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _failing():
+    raise ValueError("сломалось")
+
+
+async def _cancelled():
+    # Ветка ждала задачу, которую отменили (как отмененная задача пула процессов)
+    future = asyncio.get_running_loop().create_future()
+    future.cancel()
+    return await future
+
+
+def test_cancelled_and_failed_branches_are_skipped():
+    async def scenario():
+        return await _run_content_branches(
+            [("url", _value("текст", 0.05)), ("photo", _cancelled()), ("document", _failing())],
+            None,
+            5.0,
+        )
+
+    assert asyncio.run(scenario()) == {"url": "текст"}
+
+
+def test_slow_branch_is_dropped_after_timeout():
+    async def scenario():
+        return await _run_content_branches(
+            [("url", _value("текст")), ("audio", _value("долго", 10))],
+            None,
+            0.1,
+        )
+
+    assert asyncio.run(scenario()) == {"url": "текст"}
@@ -0,0 +1,46 @@
+"""
+Кэш контента файлов: очистка по лимиту выполняется не при каждой записи.
+"""
+import asyncio
+
+from app.application.services import content_cache
+from app.infrastructure.db.models import Base
+from app.infrastructure.db.repositories import ContentCacheRepository
+from app.infrastructure.db.session import async_init_db, engine
+
+
+def test_prune_is_throttled(monkeypatch):
+    prunes = []
+
+    async def prune(session, before, max_bytes):
+        prunes.append(max_bytes)
+        return 0
+
+    monkeypatch.setattr(ContentCacheRepository, "prune", staticmethod(prune))
+    monkeypatch.setattr(content_cache, "_writes_since_prune", 0)
+    monkeypatch.setattr(content_cache, "_last_prune", 0.0)
+    monkeypatch.setattr(content_cache.settings, "CONTENT_CACHE_MAX_MB", 1)
+
+    async def scenario():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await async_init_db()
+            for number in range(2 * content_cache.PRUNE_EVERY_WRITES + 1):
+                await content_cache.store_content(content_cache.CONTENT_PDF, f"file-{number}", "текст")
+            return await content_cache.get_cached_content(content_cache.CONTENT_PDF, "file-0")
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == "текст"
+    # Первая запись после старта, затем каждая PRUNE_EVERY_WRITES-я
+    assert len(prunes) == 3
+
+
+def test_prune_after_interval(monkeypatch):
+    monkeypatch.setattr(content_cache, "_writes_since_prune", 0)
+    monkeypatch.setattr(content_cache, "_last_prune", 0.0)
+    assert content_cache._prune_due()
+    assert not content_cache._prune_due()
+    monkeypatch.setattr(content_cache, "_last_prune", content_cache._last_prune - content_cache.PRUNE_INTERVAL)
+    assert content_cache._prune_due()
@@ -0,0 +1,38 @@
+"""
+Артефакт матчера: сохранение, проверка прав перед pickle.load, воркеры только читают.
+"""
+import os
+
+import pytest
+
+from app.application.services import moderation_service
+from app.application.services.moderation_artifact import load_artifact, save_artifact
+
+PLANS = {"entry": "plan"}
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "artifacts" / "matcher.pkl"
+    assert save_artifact(PLANS, "vocabulary", path)
+    assert load_artifact(path) == ("vocabulary", PLANS)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права файлов проверяются только в POSIX")
+@pytest.mark.parametrize("target", ["file", "directory"])
+def test_writable_by_others_is_not_loaded(tmp_path, target):
+    path = tmp_path / "artifacts" / "matcher.pkl"
+    save_artifact(PLANS, "vocabulary", path)
+    item = path if target == "file" else path.parent
+    item.chmod(item.stat().st_mode | 0o002)
+    assert load_artifact(path) == (None, {})
+
+
+def test_worker_does_not_save_artifact(monkeypatch):
+    saved = []
+    monkeypatch.setattr(moderation_service, "save_artifact", lambda *args: saved.append(args))
+    monkeypatch.setattr(moderation_service, "_worker_matcher", None)
+    assert moderation_service._search_in_worker(1, ("новаяфразадляворкера",), "тут новаяфразадляворкера") is not None
+    assert saved == []
+
+    moderation_service.build_matcher(("новаяфразадляворкера",))
+    assert len(saved) == 1
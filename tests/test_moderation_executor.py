@@ -0,0 +1,40 @@
+"""
+ModerationExecutor.feed: длинные части извлекаемого текста проверяются не в event loop.
+"""
+import asyncio
+import threading
+
+from app.application.services.moderation_service import ModerationExecutor, build_matcher
+
+
+class RecordingScanner:
+    """Обертка сканера, запоминающая поток каждого вызова feed"""
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.threads = []
+
+    @property
+    def hit(self):
+        return self.scanner.hit
+
+    def feed(self, chunk):
+        self.threads.append(threading.get_ident())
+        return self.scanner.feed(chunk)
+
+
+def test_feed_runs_long_chunks_in_thread():
+    executor = ModerationExecutor(inline_max_chars=100)
+    scanner = RecordingScanner(build_matcher(()).scanner())
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        assert await executor.feed(scanner, "короткий текст") is None
+        assert await executor.feed(scanner, "длинный чистый текст " * 20) is None
+        hit = await executor.feed(scanner, "чистый текст " * 20 + "а потом хуй")
+        return loop_thread, hit
+
+    loop_thread, hit = asyncio.run(scenario())
+    assert hit is not None and hit.entry.key
+    assert scanner.threads[0] == loop_thread
+    assert all(thread != loop_thread for thread in scanner.threads[1:])
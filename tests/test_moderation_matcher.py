@@ -0,0 +1,153 @@
+"""
+Матчер blacklist против исходной последовательной проверки (baseline).
+
+Исходная проверка — все паттерны по очереди и подстрока/регулярное выражение
+для фраз из БД (legacy_check из бенчмарка). Матчер не должен пропускать
+ничего, что она находит, ни с префильтром, ни без него.
+"""
+import random
+import re
+
+import pytest
+
+from app.application.services.moderation_matcher import (
+    GUARDED_MAX_REPEAT, GUARDED_WINDOW_SIZE, SOURCE_RU, BlacklistEntry, BlacklistMatcher, CheckIncomplete,
+    bounded_pattern, pattern_max_width, _trie_regex
+)
+from app.application.services.moderation_service import (
+    ENGLISH_PROFANITY_PATTERNS, RUSSIAN_PROFANITY_PATTERNS, build_matcher
+)
+from app.scripts.benchmark_moderation import legacy_check
+from app.scripts.init_default_blacklist import DEFAULT_BLACKLIST
+
+PHRASES = tuple(phrase.strip() for phrase in DEFAULT_BLACKLIST if phrase.strip())
+DICTIONARY_KEYS = list(RUSSIAN_PROFANITY_PATTERNS) + list(ENGLISH_PROFANITY_PATTERNS) + list(PHRASES)
+# Тексты, которые префильтр пропускал, когда n-грамма была началом более длинной ("хуи" / "хуил")
+REGRESSION_SAMPLES = ["хуй", "ты хуй!", "Ну ХУЙ и всё", "хуи", "хуй .", "ТЫ ОХУЙ", "оохуй!", "ПОЯЁЛ 7АХУЙ"]
+SAMPLE_ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяabcdefghijklmnopqrstuvwxyz 0123456789!.,"
+
+
+def _baseline_samples(count: int, seed: int = 42):
+    """Случайные тексты: слова словаря с опечатками, вставками и заменами, обрамление, регистр."""
+    rnd = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        if rnd.random() < 0.3:
+            text = "".join(rnd.choice(SAMPLE_ALPHABET) for _ in range(rnd.randint(1, 12)))
+        else:
+            chars = list(rnd.choice(DICTIONARY_KEYS))
+            for _ in range(rnd.randint(0, 2)):
+                position = rnd.randrange(len(chars))
+                operation = rnd.random()
+                if operation < 0.4 and len(chars) > 1:
+                    chars.pop(position)
+                elif operation < 0.7:
+                    chars.insert(position, rnd.choice(SAMPLE_ALPHABET))
+                else:
+                    chars[position] = rnd.choice(SAMPLE_ALPHABET)
+            text = rnd.choice(["", "ты ", "Ну ", "вот "]) + "".join(chars) + rnd.choice(["", "!", " и всё", " ."])
+        samples.append(text.upper() if rnd.random() < 0.2 else text)
+    return samples
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return legacy_check(list(PHRASES))
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return build_matcher(PHRASES)
+
+
+@pytest.fixture(scope="module")
+def unfiltered(matcher):
+    return BlacklistMatcher(matcher.entries, use_prefilter=False)
+
+
+@pytest.mark.parametrize("words", [
+    ["хуи", "хуил"],
+    ["ab", "abc", "abd", "b"],
+    ["a", "ab", "abc"],
+    ["пош", "пошл", "пошёл"],
+])
+def test_trie_regex_matches_every_word(words):
+    regex = re.compile(_trie_regex(words))
+    for word in words:
+        assert regex.fullmatch(word), word
+
+
+@pytest.mark.parametrize("key", DICTIONARY_KEYS)
+def test_dictionary_key_matches_with_and_without_prefilter(key, baseline, matcher, unfiltered):
+    # Несколько исходных паттернов не совпадают со своим ключом ("петух" — \bп[еи]тух[ау]\b):
+    # для них проверяется только, что префильтр не меняет вердикт
+    if baseline(key):
+        assert matcher.search(key) is not None
+    assert (matcher.search(key) is None) == (unfiltered.search(key) is None)
+
+
+@pytest.mark.parametrize("text", REGRESSION_SAMPLES)
+def test_prefilter_regression_samples(text, baseline, matcher, unfiltered):
+    assert baseline(text)
+    assert matcher.search(text) is not None
+    assert unfiltered.search(text) is not None
+
+
+def test_no_baseline_violation_is_missed(baseline, matcher, unfiltered):
+    missed = []
+    for text in _baseline_samples(5000):
+        if baseline(text) and (matcher.search(text) is None or unfiltered.search(text) is None):
+            missed.append(text)
+    assert not missed, missed[:20]
+
+
+def test_prefilter_does_not_change_verdicts(matcher, unfiltered):
+    changed = [
+        text for text in _baseline_samples(5000, seed=7)
+        if (matcher.search(text) is None) != (unfiltered.search(text) is None)
+    ]
+    assert not changed, changed[:20]
+
+
+@pytest.mark.parametrize("source, expected", [
+    (r"пош[еє]л.*нах[ую][йи]", r"пош[еє]л.{0,%d}нах[ую][йи]" % GUARDED_MAX_REPEAT),
+    (r"\bмуд[а-яё]+[кн]*\b", r"\bмуд[а-яё]{1,%d}[кн]{0,%d}\b" % (GUARDED_MAX_REPEAT, GUARDED_MAX_REPEAT)),
+    (r"a+?b*+c{2,}d{3}e?", r"a{1,%d}?b{0,%d}+c{2,%d}d{3}e?" % ((GUARDED_MAX_REPEAT,) * 3)),
+    (r"[]*+]+\*(?:x)+", r"[]*+]{1,%d}\*(?:x){1,%d}" % (GUARDED_MAX_REPEAT, GUARDED_MAX_REPEAT)),
+])
+def test_bounded_pattern(source, expected):
+    bounded = bounded_pattern(re.compile(source, re.IGNORECASE))
+    assert bounded.pattern == expected
+    assert bounded.flags == re.compile(source, re.IGNORECASE).flags
+    assert pattern_max_width(bounded) is not None
+
+
+GUARDED = BlacklistEntry("пошёл нахуй", SOURCE_RU, re.compile(r"пош[еє]л.*нах[ую][йи]", re.IGNORECASE))
+
+
+@pytest.mark.parametrize("start", range(GUARDED_WINDOW_SIZE - 300, GUARDED_WINDOW_SIZE + 50, 7))
+@pytest.mark.parametrize("gap", [1, 40, GUARDED_MAX_REPEAT - 1])
+def test_guarded_match_across_window_boundary(start, gap):
+    matcher = BlacklistMatcher([GUARDED])
+    text = "ф" * start + "пошел" + "ж" * gap + "нахуй" + "ф" * 3000
+    hit = matcher.search(text)
+    assert hit is not None
+    assert (hit.start, hit.end) == (start, start + len("пошел") + gap + len("нахуй"))
+
+
+def test_guarded_gap_is_bounded():
+    matcher = BlacklistMatcher([GUARDED])
+    assert matcher.search("пошел" + "ж" * (GUARDED_MAX_REPEAT + 1) + "нахуй") is None
+    assert matcher.guarded_overlap >= pattern_max_width(bounded_pattern(GUARDED.pattern))
+
+
+def test_budget_overrun_is_not_a_clean_verdict():
+    matcher = BlacklistMatcher([GUARDED], time_budget=-1)
+    with pytest.raises(CheckIncomplete):
+        matcher.search("пошел " * 1000)
+
+
+def test_scanner_marks_unchecked_parts():
+    scanner = BlacklistMatcher([GUARDED], time_budget=-1).scanner()
+    assert scanner.feed("пошел " * 100 + "нахуй") is None
+    assert scanner.unchecked
@@ -0,0 +1,68 @@
+"""
+Пул разбора документов: таймаут убивает только зависший воркер, чужие разборы не теряются.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.application.services import document_parsers, parser_pool as parser_pool_module
+from app.application.services.document_parsers import ParseStats
+from app.application.services.parser_pool import ParserPool
+
+
+def fake_task(task_id, extension, source, max_chars):
+    """Задача воркера: расширение задает, сколько секунд «разбирается» файл."""
+    if document_parsers._started is not None:
+        document_parsers._started.put((task_id, os.getpid()))
+    time.sleep(float(extension))
+    return [source.decode()], ParseStats()
+
+
+@pytest.fixture
+def fake_parser(monkeypatch):
+    monkeypatch.setattr(parser_pool_module, "run_task", fake_task)
+
+
+def run_pool(pool: ParserPool, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_timeout_kills_only_hung_task(fake_parser):
+    pool = ParserPool(workers=2, task_timeout=1.0)
+
+    async def scenario():
+        # Оба воркера запущены и заняты по разу
+        await asyncio.gather(pool.parse("0.2", b"a", 100), pool.parse("0.2", b"b", 100))
+
+        async def neighbour():
+            await asyncio.sleep(0.5)
+            return await pool.parse("0.9", b"neighbour", 100)
+
+        return await asyncio.gather(pool.parse("30", b"hang", 100), neighbour(), return_exceptions=True)
+
+    hung, neighbour = run_pool(pool, scenario)
+    assert isinstance(hung, asyncio.TimeoutError)
+    # Разбор соседнего сообщения прерван вместе с пулом и повторен в новом
+    assert neighbour[0] == ["neighbour"]
+
+
+def test_queue_wait_is_not_counted_in_timeout(fake_parser):
+    pool = ParserPool(workers=1, task_timeout=1.0)
+
+    async def scenario():
+        return await asyncio.gather(pool.parse("0.7", b"first", 100), pool.parse("0.7", b"second", 100))
+
+    first, second = run_pool(pool, scenario)
+    assert first[0] == ["first"]
+    assert second[0] == ["second"]
+
+
+def test_workers_do_not_fork():
+    assert parser_pool_module.START_METHOD in ("forkserver", "spawn")
@@ -0,0 +1,72 @@
+"""
+Соответствие движков регулярных выражений стандартному re (см. app.scripts.check_regex_backends).
+"""
+import re
+
+import pytest
+
+from app.application.services.regex_backends import (
+    REGEX_BACKEND_RE, REGEX_BACKEND_RE2, REGEX_BACKEND_REGEX, Re2Backend, get_regex_backend
+)
+from app.scripts.check_regex_backends import build_texts, check_backend
+from app.scripts.init_default_blacklist import DEFAULT_BLACKLIST
+
+PHRASES = tuple(phrase.strip() for phrase in DEFAULT_BLACKLIST if phrase.strip())
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return build_texts(200)
+
+
+@pytest.mark.parametrize("name, module", [
+    (REGEX_BACKEND_RE, None),
+    (REGEX_BACKEND_REGEX, "regex"),
+    (REGEX_BACKEND_RE2, "re2"),
+])
+def test_backend_matches_re(name, module, texts):
+    if module is not None:
+        pytest.importorskip(module)
+    # Встроенные словари и фразы по умолчанию: те же диапазоны совпадений и вердикты матчера
+    assert check_backend(name, texts, PHRASES) == 0
+
+
+@pytest.mark.parametrize("pattern", [
+    r"\bхуй",  # \b в RE2 — только ASCII
+    r"^бля",
+    r"сука$",
+    r"(?<![а-я])хер",
+    r"пизд(?!ец)",
+    r"(?=ху)х",
+    r"\w+ня",
+    r"бля\s+буду",
+    r"[\d]+",
+    r"(а)\1",
+])
+def test_re2_keeps_unsupported_patterns_on_re(pattern):
+    compiled = re.compile(pattern, re.IGNORECASE)
+    assert not Re2Backend().supports(compiled)
+
+
+@pytest.mark.parametrize("pattern, flags", [
+    (r"[хx][уy]+[йи]", re.IGNORECASE),
+    (r"бля(ть|дь)?", 0),
+    (r"с[уy]к[аa].", re.DOTALL),
+])
+def test_re2_runs_plain_patterns(pattern, flags):
+    pytest.importorskip("re2")
+    compiled = re.compile(pattern, flags)
+    backend = get_regex_backend(REGEX_BACKEND_RE2)
+    assert backend.runs(compiled)
+    for text in ("ХУЙ", "xyй", "блять", "бля", "сука\n", "ничего"):
+        expected = compiled.search(text)
+        actual = backend.compile(compiled).search(text)
+        assert (expected.span() if expected else None) == (actual.span() if actual else None)
+
+
+def test_re2_fallback_returns_re_pattern():
+    pytest.importorskip("re2")
+    compiled = re.compile(r"\bхуй")
+    backend = get_regex_backend(REGEX_BACKEND_RE2)
+    assert backend.compile(compiled) is compiled
+    assert not backend.runs(compiled)
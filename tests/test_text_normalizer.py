@@ -0,0 +1,80 @@
+"""
+Нормализация текста: канонический вид и позиции символов в исходном тексте.
+"""
+import pytest
+
+from app.application.services.text_normalizer import fold_char, normalize_text
+
+SAMPLES = [
+    "Привет, мир",
+    "сууука",
+    "су\u00adка",  # soft hyphen внутри слова
+    "с\u200bу\u200bк\u200bа",  # zero-width space
+    "х у й",
+    "f.u.c.k you",
+    "Ｆｕｃｋ",  # полноширинные символы (NFKC)
+    "ﬁnal",  # лигатура раскладывается на два символа
+    "БЛ\u0301ЯДЬ",  # комбинируемое ударение
+    "ну\tи\nвсё",
+    "п р и в е т   м и р",
+    "ааа бб в",
+    "ß straße",  # casefold удлиняет текст
+    "😀 смайлик 😀😀",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_offsets_point_to_source_chars(text):
+    normalized = normalize_text(text, with_offsets=True)
+    assert normalized.text == normalize_text(text).text
+    assert len(normalized.offsets) == len(normalized.text)
+    assert list(normalized.offsets) == sorted(normalized.offsets)
+    for index, char in enumerate(normalized.text):
+        source = text[normalized.offsets[index]]
+        # Каждый канонический символ получен из того символа, на который указывает offset
+        assert char in fold_char(source)
+
+
+@pytest.mark.parametrize("text, canonical, offsets", [
+    ("сууука", "сука", (0, 1, 4, 5)),
+    ("су\u00adка", "сука", (0, 1, 3, 4)),
+    ("б л я!", "бля!", (0, 2, 4, 5)),
+    ("ﬁ", "fи", (0, 0)),
+    ("a\tb", "а b", (0, 1, 2)),
+])
+def test_known_offsets(text, canonical, offsets):
+    normalized = normalize_text(text, with_offsets=True)
+    assert normalized.text == canonical
+    assert normalized.offsets == offsets
+
+
+def test_original_span_covers_match():
+    text = "Ну ты с\u200bу\u200bк\u200bа, конечно"
+    normalized = normalize_text(text, with_offsets=True)
+    start = normalized.text.index("сука")
+    span = normalized.original_span(start, start + len("сука"))
+    assert text[span[0]:span[1]] == "с\u200bу\u200bк\u200bа"
+
+
+def test_original_span_of_empty_range():
+    normalized = normalize_text("абв", with_offsets=True)
+    assert normalized.original_span(1, 1) == (1, 1)
+    assert normalized.original_span(3, 3) == (3, 3)
+    assert normalize_text("", with_offsets=True).original_span(0, 0) == (0, 0)
+
+
+def test_original_span_requires_offsets():
+    with pytest.raises(ValueError):
+        normalize_text("абв").original_span(0, 1)
+
+
+@pytest.mark.parametrize("text, canonical", [
+    ("xyй", "хуй"),  # латинские двойники склеиваются
+    ("ИДИ0Т", "идиот"),
+    ("ёжик", "ежик"),
+    ("уе6 ебла4н пи1здц", "уе6 ебла4н пи1здц"),  # цифры, лишь похожие на буквы, остаются
+    ("йод", "йод"),
+    ("ї і", "ї і"),
+])
+def test_only_visual_homoglyphs_are_folded(text, canonical):
+    assert normalize_text(text).text == canonical
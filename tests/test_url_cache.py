@@ -0,0 +1,141 @@
+"""
+Кэш страниц по URL: отрицательный кэш, перепроверка по ETag (304) и объединение загрузок.
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.application.services import content_service
+from app.application.services.url_cache import UrlCache
+from app.application.services.url_limits import UrlFetchLimits
+from app.infrastructure.http_client import close_http_session
+
+PAGE = "<html><head><title>Новость</title></head><body><p>Текст новости по ссылке.</p></body></html>"
+
+
+class Site:
+    """Тестовый сайт: считает запросы и отвечает 304 на If-None-Match с актуальным ETag"""
+
+    def __init__(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_get("/page", self.page)
+        app.router.add_get("/broken", self.broken)
+        app.router.add_get("/slow", self.slow)
+        self.server = TestServer(app)
+
+    async def page(self, request):
+        self.requests.append((request.path, request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def broken(self, request):
+        self.requests.append((request.path, None))
+        return web.Response(status=500)
+
+    async def slow(self, request):
+        self.requests.append((request.path, None))
+        await asyncio.sleep(0.2)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = UrlCache(max_bytes=1024 * 1024, ttl=3600, negative_ttl=300)
+    monkeypatch.setattr(content_service, "url_cache", cache)
+    monkeypatch.setattr(content_service, "url_fetch_limits", UrlFetchLimits(10, 10, 3, 60))
+    return cache
+
+
+def run_with_site(scenario):
+    async def wrapper():
+        site = Site()
+        await site.server.start_server()
+        try:
+            await scenario(site)
+        finally:
+            await close_http_session()
+            await site.server.close()
+    asyncio.run(wrapper())
+
+
+def expire(cache: UrlCache, url: str):
+    entry, _ = cache.lookup(url)
+    entry.expires_at = 0
+
+
+def test_fresh_page_is_served_from_cache(cache):
+    async def scenario(site):
+        first = await content_service.extract_text_from_url(site.url("/page"))
+        second = await content_service.extract_text_from_url(site.url("/page#comments"))
+        assert "Текст новости" in first
+        assert second == first
+        assert site.requests == [("/page", None)]
+
+    run_with_site(scenario)
+
+
+def test_stale_page_is_revalidated_with_304(cache):
+    async def scenario(site):
+        url = site.url("/page")
+        text = await content_service.extract_text_from_url(url)
+        expire(cache, url)
+
+        assert await content_service.extract_text_from_url(url) == text
+        assert site.requests == [("/page", None), ("/page", '"v1"')]
+        assert cache.revalidations == 1
+        # 304 продлил запись: следующий вызов не ходит в сеть
+        assert cache.lookup(url)[1] is True
+        assert await content_service.extract_text_from_url(url) == text
+        assert len(site.requests) == 2
+
+    run_with_site(scenario)
+
+
+def test_failed_page_is_negatively_cached(cache):
+    async def scenario(site):
+        url = site.url("/broken")
+        assert await content_service.extract_text_from_url(url) is None
+        assert await content_service.extract_text_from_url(url) is None
+        assert len(site.requests) == 1
+
+        # После negative_ttl запись удаляется и страница запрашивается снова
+        expire(cache, url)
+        assert cache.lookup(url) == (None, False)
+        assert await content_service.extract_text_from_url(url) is None
+        assert len(site.requests) == 2
+
+    run_with_site(scenario)
+
+
+def test_concurrent_requests_share_one_download(cache):
+    async def scenario(site):
+        url = site.url("/slow")
+        texts = await asyncio.gather(*(content_service.extract_text_from_url(url) for _ in range(5)))
+        assert len(set(texts)) == 1 and texts[0]
+        assert len(site.requests) == 1
+
+    run_with_site(scenario)
+
+
+def test_negative_entry_is_not_revalidated():
+    cache = UrlCache(max_bytes=1024 * 1024, ttl=3600, negative_ttl=300)
+    cache.store_failure("https://example.com/a")
+    entry, fresh = cache.lookup("https://example.com/a")
+    assert fresh and entry.text is None and not entry.revalidatable
+
+
+def test_lru_eviction_by_size():
+    cache = UrlCache(max_bytes=2 * 1000 + 200 * 2 + 10, ttl=3600, negative_ttl=300)
+    cache.store("https://example.com/1", "a" * 500)
+    cache.store("https://example.com/2", "b" * 500)
+    cache.lookup("https://example.com/1")  # /1 использован последним
+    cache.store("https://example.com/3", "c" * 500)
+    assert cache.lookup("https://example.com/2") == (None, False)
+    assert cache.lookup("https://example.com/1")[0] is not None